@@ -0,0 +1,135 @@
+#!/usr/bin/python
+
+"""
+Micro-benchmark for textnorm against the normalization it replaced.
+
+Builds a workload shaped like the extractor's calls (short lemmas and
+dependency labels, longer dependency paths, a few percent containing UTF-8
+punctuation, most of them repeated), checks that every engine agrees with
+the old re.sub / str.replace chains, and reports calls per second for:
+
+    legacy      the per-pattern chains
+    single-pass Normalizer.normalize(), no cache
+    cached      Normalizer.__call__(), bounded cache
+
+Usage:
+    python bench_normalize.py [--calls N] [--distinct N] [--seed N]
+"""
+import argparse
+import random
+import re
+import time
+
+from textnorm import Normalizer, UTF_SUBSTITUTIONS, DEFAULT_CACHE_SIZE
+
+# the table gene_relations.normalize() applies with chained str.replace;
+# benchmarked to show that a regex scan does not pay off for it
+PG_SUBSTITUTIONS = [
+    ("'", '_'),
+    ('{', '-_-'),
+    ('}', '-__-'),
+    ('"', '-___-'),
+    (', ,', ',__'),
+]
+
+
+# the old chain spelled its patterns as regex escapes, e.g. '\\xe2\\x80\\x94'
+LEGACY_UTF_PATTERNS = [("".join("\\x%02x" % ord(c) for c in pattern), replacement)
+                       for pattern, replacement in UTF_SUBSTITUTIONS]
+
+
+def legacy_normalize_utf(word):
+    for pattern, replacement in LEGACY_UTF_PATTERNS:
+        word = re.sub(pattern, replacement, word)
+
+    return word
+
+
+def legacy_normalize(word):
+    return word.encode("ascii", "ignore").replace("'", '_').replace('{', '-_-').replace('}','-__-').replace('"', '-___-').replace(', ,', ',__')
+
+
+ASCII_PIECES = ["bind", "interact", "protein", "complex", "nsubj", "dobj", "prep_with",
+                "nn", "amod", "--", "->", "<-", "|", "SAMEPATH", "'", "{", "}", ", ,", "\""]
+UTF_PIECES = [pattern for pattern, replacement in UTF_SUBSTITUTIONS]
+
+
+def make_workload(calls, distinct, utf_rate, rng):
+    """Return (utf_inputs, ascii_inputs): `calls` strings drawn from `distinct` ones."""
+    utf_distinct = []
+    ascii_distinct = []
+    for i in xrange(distinct):
+        parts = [rng.choice(ASCII_PIECES) for _ in xrange(rng.randint(1, 12))]
+        ascii_distinct.append("".join(parts))
+
+        if rng.random() < utf_rate:
+            for _ in xrange(rng.randint(1, 3)):
+                parts.insert(rng.randint(0, len(parts)), rng.choice(UTF_PIECES))
+        utf_distinct.append("".join(parts))
+
+    # Zipf-like reuse: a few strings (common lemmas, labels) dominate
+    picks = [int(distinct * rng.random() ** 3) for _ in xrange(calls)]
+    return [utf_distinct[i] for i in picks], [ascii_distinct[i] for i in picks]
+
+
+def fuzz(normalizer, reference, pieces, rounds, rng):
+    """Random concatenations of table entries and their byte fragments."""
+    fragments = pieces + [p[:1] for p in pieces] + [p[1:] for p in pieces] + ["a", ","]
+    for _ in xrange(rounds):
+        text = "".join(rng.choice(fragments) for _ in xrange(rng.randint(0, 10)))
+        if normalizer.normalize(text) != reference(text):
+            raise AssertionError("mismatch on %r" % text)
+
+
+def timed(label, func, inputs):
+    start = time.time()
+    for text in inputs:
+        func(text)
+    elapsed = time.time() - start
+
+    print "  %-12s %8.3fs %12.0f calls/s" % (label, elapsed, len(inputs) / elapsed)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--distinct", type=int, default=20000)
+    parser.add_argument("--utf-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    utf_inputs, ascii_inputs = make_workload(args.calls, args.distinct, args.utf_rate, rng)
+
+    utf = Normalizer(UTF_SUBSTITUTIONS, DEFAULT_CACHE_SIZE)
+    pg = Normalizer(PG_SUBSTITUTIONS, DEFAULT_CACHE_SIZE)
+
+    fuzz(utf, legacy_normalize_utf, UTF_PIECES, 20000, rng)
+    fuzz(pg, lambda text: legacy_normalize(text), [p for p, r in PG_SUBSTITUTIONS], 20000, rng)
+    for text in set(utf_inputs):
+        assert utf(text) == legacy_normalize_utf(text)
+    for text in set(ascii_inputs):
+        assert pg(text) == legacy_normalize(text)
+    utf.cache.clear()
+    pg.cache.clear()
+
+    print "%d calls over %d distinct inputs, outputs verified" % (args.calls, args.distinct)
+
+    print "normalize_utf:"
+    base = timed("legacy", legacy_normalize_utf, utf_inputs)
+    timed("single-pass", utf.normalize, utf_inputs)
+    cached = timed("cached", utf, utf_inputs)
+    print "  speedup %.1fx, cache hit rate %.1f%%" % (
+        base / cached, 100.0 * utf.cache.hits / (utf.cache.hits + utf.cache.misses))
+
+    print "normalize:"
+    base = timed("legacy", legacy_normalize, ascii_inputs)
+    timed("single-pass", lambda text: pg.normalize(text.encode("ascii", "ignore")), ascii_inputs)
+    cached = timed("cached", lambda text: pg(text.encode("ascii", "ignore")), ascii_inputs)
+    print "  speedup %.1fx, cache hit rate %.1f%%" % (
+        base / cached, 100.0 * pg.cache.hits / (pg.cache.hits + pg.cache.misses))
+
+
+if __name__ == "__main__":
+    main()
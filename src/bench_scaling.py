@@ -0,0 +1,295 @@
+#!/usr/bin/python
+
+"""
+Corpus-scaling benchmark for the extractor, replacing the hand-collected
+runs in notebooks/deepdive_performance_testing.
+
+Generates synthetic CoNLL-style documents from the statistics of sample
+.nlp files (by default the one bundled in notebooks/conll_format): every
+document draws its sentence count from the samples and its sentences from
+the sample sentences, keeping their words, tags and dependency trees, and
+nouns become gene symbols from the dictionary at the rate the samples have
+them. Corpora are built for the sizes of the old runs (3k to 123k
+documents, times --scale); a corpus of n documents is the first n
+documents of every larger one, and documents only depend on --seed.
+
+Runs gene_relations.py --nlp over each corpus and writes JSON with
+docs/sec, pairs/sec, peak RSS of the largest process, output bytes, the
+run's stats summary (see run_stats.py) and the startup time (a run over no
+documents), for comparing versions with --compare. Needs no network access,
+only the dictionaries.
+
+Usage:
+    python bench_scaling.py [options] > results.json
+    python bench_scaling.py --compare OLD.json NEW.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import gene_relations
+import nlp_reader
+
+SIZES = ["3k", "7k", "15k", "30k", "60k", "123k"]
+
+# generated documents are stored in blocks of this many documents (times
+# --scale), so that each corpus is a list of block directories
+BLOCK_DOCS = 1000
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+EXTRACTOR = os.path.join(SRC_DIR, "gene_relations.py")
+DEFAULT_SAMPLES = [os.path.join(SRC_DIR, "..", "notebooks", "conll_format")]
+
+
+def size_blocks(size):
+    """'15k' -> 15 blocks"""
+    return int(size.rstrip("k")) * 1000 // BLOCK_DOCS
+
+
+def is_noun(pos):
+    return pos.startswith("NN")
+
+
+class CorpusProfile(object):
+    """Sentences, document lengths and gene density of the sample documents."""
+
+    def __init__(self, docs, genes):
+        self.sentences = []
+        self.doc_sentences = []
+        self.tokens = 0
+        self.nouns = 0
+        self.gene_mentions = 0
+
+        for doc in docs:
+            self.doc_sentences.append(len(doc.sents))
+            for sent in doc.sents:
+                self.sentences.append(sent)
+                self.tokens += len(sent)
+                for form, pos in zip(sent.forms, sent.poses):
+                    self.nouns += is_noun(pos)
+                    self.gene_mentions += form in genes
+
+        if not self.sentences:
+            raise ValueError("no sample sentences")
+
+    def gene_rate(self):
+        """Gene mentions per noun."""
+        return float(self.gene_mentions) / max(self.nouns, 1)
+
+    def summary(self):
+        return {
+            "documents": len(self.doc_sentences),
+            "sentences": len(self.sentences),
+            "tokens": self.tokens,
+            "nouns": self.nouns,
+            "gene_mentions": self.gene_mentions,
+        }
+
+
+class DocumentGenerator(object):
+
+    def __init__(self, profile, symbols, gene_rate, seed):
+        self.profile = profile
+        self.symbols = symbols
+        self.gene_rate = gene_rate
+        self.seed = seed
+
+    def write_document(self, path, rng):
+        profile = self.profile
+        with open(path, "w") as f:
+            for sentid in xrange(1, rng.choice(profile.doc_sentences) + 1):
+                sent = rng.choice(profile.sentences)
+                sent_field = "SENT_%d" % sentid
+                for i in xrange(len(sent)):
+                    form, lemma = sent.forms[i], sent.lemmas[i]
+                    if is_noun(sent.poses[i]) and rng.random() < self.gene_rate:
+                        form = lemma = rng.choice(self.symbols)
+
+                    f.write("\t".join([str(i + 1), form, sent.poses[i], sent.ners[i], lemma,
+                                       sent.dep_labels[i], str(sent.dep_pars[i] + 1),
+                                       sent_field, "[synthetic]"]) + "\n")
+                f.write("\n")
+
+    def write_block(self, directory, block, docs):
+        """Write block number block, docs documents, into directory (kept if it exists)."""
+        if os.path.isdir(directory):
+            return
+
+        tmp = directory + ".tmp"
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        for n in xrange(docs):
+            docid = block * docs + n
+            rng = random.Random((self.seed << 32) + docid)
+            self.write_document(os.path.join(tmp, "synthetic.%07d.pdf.nlp" % docid), rng)
+        os.rename(tmp, directory)
+
+
+def extractor_command(inputs, stats_path, args):
+    return [sys.executable, EXTRACTOR, "--nlp", "-j", str(args.processes),
+            "--stats", stats_path, "--stats-interval", "0"] + inputs
+
+
+def run_extractor(inputs, workdir, args):
+    """(wall seconds, output bytes, peak RSS in KB, final stats summary)"""
+    stats_path = os.path.join(workdir, "stats.json")
+    start = time.time()
+    proc = subprocess.Popen(extractor_command(inputs, stats_path, args),
+                            stdout=subprocess.PIPE, stderr=open(os.devnull, "w"))
+    output_bytes = 0
+    while True:
+        data = proc.stdout.read(1 << 20)
+        if not data:
+            break
+        output_bytes += len(data)
+
+    # wait4 reports the largest RSS of the extractor and its workers
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.time() - start
+    proc.returncode = status
+    if status != 0:
+        raise RuntimeError("extractor failed with status %d" % status)
+
+    with open(stats_path) as f:
+        summary = json.loads(f.readlines()[-1])
+
+    return wall, output_bytes, usage.ru_maxrss, summary
+
+
+def measure_startup(workdir, args):
+    empty = os.path.join(workdir, "empty")
+    if not os.path.isdir(empty):
+        os.makedirs(empty)
+
+    return min(run_extractor([empty], workdir, args)[0] for _ in xrange(args.startup_runs))
+
+
+def benchmark(generator, workdir, args):
+    block_docs = max(1, int(round(BLOCK_DOCS * args.scale)))
+    # corpora generated with other settings are kept apart
+    corpus = os.path.join(workdir, "corpus-seed%d-block%d-rate%g" % (
+        generator.seed, block_docs, generator.gene_rate))
+    blocks = []
+    runs = []
+
+    for size in args.sizes:
+        while len(blocks) < size_blocks(size):
+            directory = os.path.join(corpus, "block%04d" % len(blocks))
+            generator.write_block(directory, len(blocks), block_docs)
+            blocks.append(directory)
+
+        wall, output_bytes, peak_rss, summary = run_extractor(blocks[:size_blocks(size)], workdir, args)
+        counters = summary["counters"]
+        run = {
+            "size": size,
+            "documents": counters.get("documents", 0),
+            "pairs": counters.get("pairs", 0),
+            "candidates": counters.get("candidates", 0),
+            "wall_seconds": round(wall, 3),
+            "docs_per_sec": round(counters.get("documents", 0) / wall, 3),
+            "pairs_per_sec": round(counters.get("pairs", 0) / wall, 3),
+            "peak_rss_kb": peak_rss,
+            "output_bytes": output_bytes,
+            "stats": summary,
+        }
+        gene_relations.log("%s: %d documents in %.1fs, %.1f docs/s, %.1f pairs/s, %d KB peak RSS"
+                           % (size, run["documents"], wall, run["docs_per_sec"],
+                              run["pairs_per_sec"], peak_rss))
+        runs.append(run)
+
+    return runs
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    old_runs = dict((run["size"], run) for run in old["runs"])
+    print "%-6s %12s %12s %8s %12s %8s" % ("size", "old docs/s", "new docs/s", "ratio",
+                                            "new RSS KB", "ratio")
+    for run in new["runs"]:
+        before = old_runs.get(run["size"])
+        if before is None:
+            continue
+        print "%-6s %12.1f %12.1f %8.2f %12d %8.2f" % (
+            run["size"], before["docs_per_sec"], run["docs_per_sec"],
+            run["docs_per_sec"] / max(before["docs_per_sec"], 1e-9),
+            run["peak_rss_kb"], float(run["peak_rss_kb"]) / max(before["peak_rss_kb"], 1))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+        help="compare two results files instead of running")
+    parser.add_argument("--samples", nargs="+", default=DEFAULT_SAMPLES,
+        help=".nlp files or directories the synthetic documents are modeled on")
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=SIZES)
+    parser.add_argument("--scale", type=float, default=1.0,
+        help="fraction of each corpus size to generate (e.g. 0.01 for a quick run)")
+    parser.add_argument("--gene-rate", type=float, default=None,
+        help="gene mentions per noun (default: the rate in the samples)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--processes", type=int, default=1,
+        help="extraction processes, passed on to gene_relations.py")
+    parser.add_argument("--startup-runs", type=int, default=3,
+        help="runs over no documents to take the startup time from (the fastest)")
+    parser.add_argument("--workdir", default=None,
+        help="where to generate the corpora, which are reused by later runs "
+             "(default: a temporary directory, removed)")
+
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    gene_relations.load_dict()
+    genes = gene_relations.dict_gene_symbols_all
+    symbols = sorted(s for s in genes if s not in gene_relations.EXCLUDED_GENES)
+
+    profile = CorpusProfile(nlp_reader.iter_documents(args.samples), genes)
+    gene_rate = profile.gene_rate() if args.gene_rate is None else args.gene_rate
+    if not gene_rate or not symbols:
+        gene_relations.log("no gene mentions to generate: the runs will find no pairs")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_scaling.")
+    try:
+        startup = measure_startup(workdir, args)
+        runs = benchmark(DocumentGenerator(profile, symbols, gene_rate, args.seed), workdir, args)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir)
+
+    results = {
+        "extractor_version": gene_relations.extractor_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.sysconf("SC_NPROCESSORS_ONLN"),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scale": args.scale,
+        "seed": args.seed,
+        "processes": args.processes,
+        "gene_rate": gene_rate,
+        "sample": profile.summary(),
+        "startup_seconds": round(startup, 3),
+        "runs": runs,
+    }
+    json.dump(results, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
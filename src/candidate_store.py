@@ -0,0 +1,151 @@
+"""
+On-disk store of extracted candidates, so that labels can be recomputed
+without re-running feature extraction.
+
+A store is a stream of marshal records: a header
+
+    (MAGIC, FORMAT_VERSION, field names)
+
+followed by one tuple per candidate, in field order. Records are
+independent, so worker processes encode them with encode() and the parent
+appends them. Like dict_snapshot, a store is written to a temporary file
+and only renamed into place when it is complete.
+
+Next to the store, <store>.idx maps every gene symbol and every docid to
+the byte offsets of the records that mention it, so that a dictionary
+update can re-read just the candidates it affects (see dict_delta.py).
+"""
+from array import array
+import marshal
+import os
+
+MAGIC = "gene_relations candidates"
+INDEX_MAGIC = "gene_relations candidate index"
+FORMAT_VERSION = 1
+
+OFFSET_TYPE = "L"
+
+
+class CandidateStoreError(Exception):
+    pass
+
+
+def encode(records):
+    """One marshal string per record."""
+    return [marshal.dumps(record) for record in records]
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+def _check_header(path, header, magic, fields):
+    if not isinstance(header, tuple) or len(header) != 3 or header[0] != magic:
+        raise CandidateStoreError("%s is not a candidate store" % path)
+
+    if header[1] != FORMAT_VERSION or tuple(header[2]) != tuple(fields):
+        raise CandidateStoreError("%s was written by another version (format %r, fields %r)"
+                                  % (path, header[1], header[2]))
+
+
+def _load_header(path, f):
+    try:
+        return marshal.load(f)
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+class CandidateWriter(object):
+    """
+    Appends encoded records to a store; keys are the (docid, symbols) each
+    record is indexed under.
+    """
+
+    def __init__(self, path, fields):
+        self.path = path
+        self.fields = tuple(fields)
+        self._tmp = path + ".tmp"
+        self._out = open(self._tmp, "wb")
+        marshal.dump((MAGIC, FORMAT_VERSION, self.fields), self._out)
+        self._offset = self._out.tell()
+        self._symbols = {}
+        self._docids = {}
+
+    def _add(self, index, key):
+        offsets = index.get(key)
+        if offsets is None:
+            offsets = index[key] = array(OFFSET_TYPE)
+        offsets.append(self._offset)
+
+    def write_records(self, encoded, keys):
+        for data, (docid, symbols) in zip(encoded, keys):
+            self._add(self._docids, docid)
+            for symbol in set(symbols):
+                self._add(self._symbols, symbol)
+
+            self._out.write(data)
+            self._offset += len(data)
+
+    def close(self):
+        self._out.close()
+
+        index = {
+            "symbols": dict((k, v.tostring()) for k, v in self._symbols.iteritems()),
+            "docids": dict((k, v.tostring()) for k, v in self._docids.iteritems()),
+        }
+        tmp = index_path(self._tmp)
+        with open(tmp, "wb") as f:
+            marshal.dump((INDEX_MAGIC, FORMAT_VERSION, self.fields), f)
+            marshal.dump(index, f)
+
+        os.rename(tmp, index_path(self.path))
+        os.rename(self._tmp, self.path)
+
+
+class CandidateIndex(object):
+    """The symbol and docid index of a store."""
+
+    def __init__(self, symbols, docids):
+        self.symbols = symbols
+        self.docids = docids
+
+    def _offsets(self, index, key):
+        offsets = array(OFFSET_TYPE)
+        offsets.fromstring(index.get(key, ""))
+        return offsets
+
+    def symbol_offsets(self, symbol):
+        return self._offsets(self.symbols, symbol)
+
+    def docid_offsets(self, docid):
+        return self._offsets(self.docids, docid)
+
+
+def read_index(path, fields):
+    with open(index_path(path), "rb") as f:
+        _check_header(index_path(path), _load_header(path, f), INDEX_MAGIC, fields)
+        index = marshal.load(f)
+
+    return CandidateIndex(index["symbols"], index["docids"])
+
+
+def read_records(path, fields):
+    """Yield the records of a store, checking it was written with fields."""
+    with open(path, "rb") as f:
+        _check_header(path, _load_header(path, f), MAGIC, fields)
+
+        while True:
+            try:
+                yield marshal.load(f)
+            except EOFError:
+                return
+
+
+def read_records_at(path, fields, offsets):
+    """Yield the records at the given offsets, in store order."""
+    with open(path, "rb") as f:
+        _check_header(path, _load_header(path, f), MAGIC, fields)
+
+        for offset in sorted(set(offsets)):
+            f.seek(offset)
+            yield marshal.load(f)
@@ -0,0 +1,144 @@
+"""
+Transparent gzip / zstd compressed input and output streams.
+
+Inputs are recognized by their magic bytes, not their names, so a
+compressed stream can also come in on stdin; anything else is read as is.
+Decompression and compression run in gzip / pigz / zstd processes next to
+the extractor, which keeps them off the GIL and lets them use spare cores:
+output is compressed by pigz (falling back to single-threaded gzip) or
+zstd -T with the given number of threads.
+"""
+import distutils.spawn
+import io
+import multiprocessing
+import shutil
+import subprocess
+import sys
+import threading
+
+MAGIC = {
+    "gzip": "\x1f\x8b",
+    "zstd": "\x28\xb5\x2f\xfd",
+}
+
+#commands tried in order for each codec
+COMMANDS = {
+    "gzip": ["pigz", "gzip"],
+    "zstd": ["zstd"],
+}
+
+CODECS = sorted(COMMANDS)
+
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+
+READ_BUFFER_SIZE = 1 << 20
+
+
+class CompressionError(Exception):
+    pass
+
+
+def find_command(codec):
+    for name in COMMANDS[codec]:
+        if distutils.spawn.find_executable(name):
+            return name
+
+    raise CompressionError("no %s command found (tried %s)" % (codec, ", ".join(COMMANDS[codec])))
+
+
+def compress_command(codec, level=None, threads=0):
+    """The command line compressing stdin to stdout (threads=0: one per core)."""
+    command = find_command(codec)
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    args = [command, "-c", "-%d" % level]
+    if command == "zstd":
+        args += ["-q", "-T%d" % threads]
+        if level > 19:
+            args.append("--ultra")
+    elif command == "pigz":
+        args += ["-p", str(threads or multiprocessing.cpu_count())]
+
+    return args
+
+
+def detect(head):
+    """The codec the first bytes of a stream belong to, or None."""
+    for codec, magic in MAGIC.iteritems():
+        if head.startswith(magic):
+            return codec
+
+    return None
+
+
+def _feed(src, dst):
+    try:
+        shutil.copyfileobj(src, dst, READ_BUFFER_SIZE)
+    except IOError:
+        # the decompressor exited first; its status is checked by the reader
+        pass
+    finally:
+        dst.close()
+
+
+def _decompressed_lines(proc, name):
+    for line in proc.stdout:
+        yield line
+
+    proc.stdout.close()
+    if proc.wait() != 0:
+        raise CompressionError("decompressing %s failed with status %d" % (name, proc.returncode))
+
+
+def open_input(path):
+    """The lines of path ('-': stdin), decompressed if it is gzip or zstd compressed."""
+    if path == "-":
+        f = io.open(sys.stdin.fileno(), "rb", READ_BUFFER_SIZE, closefd=False)
+    else:
+        f = io.open(path, "rb", READ_BUFFER_SIZE)
+
+    codec = detect(f.peek(max(len(m) for m in MAGIC.itervalues())))
+    if codec is None:
+        return f
+
+    command = [find_command(codec), "-dc"]
+    if path != "-":
+        f.close()
+        with open(path, "rb") as raw:
+            proc = subprocess.Popen(command, stdin=raw, stdout=subprocess.PIPE, bufsize=-1)
+    else:
+        # the peeked bytes are in f's buffer, not left on the descriptor
+        proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=-1)
+        feeder = threading.Thread(target=_feed, args=(f, proc.stdin))
+        feeder.daemon = True
+        feeder.start()
+
+    return _decompressed_lines(proc, path)
+
+
+def input_lines(paths):
+    """The lines of paths in turn (stdin if there are none), like fileinput.input()."""
+    for path in paths or ["-"]:
+        for line in open_input(path):
+            yield line
+
+
+class CompressedOutput(object):
+    """A file-like stream compressing what is written to it into out."""
+
+    def __init__(self, out, codec, level=None, threads=0):
+        out.flush()
+        self.proc = subprocess.Popen(compress_command(codec, level, threads),
+                                     stdin=subprocess.PIPE, stdout=out, bufsize=-1)
+
+    def write(self, data):
+        self.proc.stdin.write(data)
+
+    def flush(self):
+        self.proc.stdin.flush()
+
+    def close(self):
+        """Finish the compressed stream, once everything written is flushed."""
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise CompressionError("compressing the output failed with status %d"
+                                   % self.proc.returncode)
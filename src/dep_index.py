@@ -0,0 +1,236 @@
+"""
+Lowest-common-ancestor index over the dependency parse of one sentence.
+
+extract() needs the dependency path between every gene pair and between
+each gene and every verb lying between a pair, which used to mean walking
+both ancestor chains for every query. DepIndex computes depths and an
+Euler tour with a sparse table once per sentence, so LCA and path-length
+queries are O(1). The path strings it builds are memoized per (start, end)
+pair.
+"""
+
+MAX_STEPS = 100
+
+
+class DepIndex(object):
+    """
+    parents: head index of each token, -1 for a root
+    labels: dependency label of each token
+    lemmas: lemma of each token
+    """
+
+    def __init__(self, parents, labels, lemmas):
+        self.parents = parents
+        self.labels = labels
+        self.lemmas = lemmas
+        self._lower = [l.lower() for l in lemmas]
+        self._paths = {}
+
+        n = len(parents)
+        # virtual node standing for the -1 parent shared by all roots
+        self.root = n
+        self.depth = self._depths()
+        self._build_lca()
+
+    def _depths(self):
+        """
+        Hops from each token to the virtual root, or None for tokens whose
+        chain never reaches a root (cycles, heads outside the sentence).
+        """
+        n = len(self.parents)
+        depth = [None] * n
+        state = [0] * n         # 0 = unseen, 1 = on the current chain, 2 = done
+
+        for start in xrange(n):
+            chain = []
+            node = start
+            while 0 <= node < n and state[node] == 0:
+                state[node] = 1
+                chain.append(node)
+                node = self.parents[node]
+
+            if node == -1:
+                d = 0
+            elif 0 <= node < n and state[node] == 2:
+                d = depth[node]
+            else:
+                d = None
+
+            for node in reversed(chain):
+                if d is not None:
+                    d += 1
+                depth[node] = d
+                state[node] = 2
+
+        return depth
+
+    def _build_lca(self):
+        n = len(self.parents)
+        children = [[] for _ in xrange(n + 1)]
+        for i in xrange(n):
+            if self.depth[i] is not None:
+                p = self.parents[i]
+                children[self.root if p == -1 else p].append(i)
+
+        depth = self.depth + [0]
+        euler = [self.root]
+        first = [None] * (n + 1)
+        first[self.root] = 0
+
+        stack = [(self.root, iter(children[self.root]))]
+        while stack:
+            child = next(stack[-1][1], None)
+            if child is None:
+                stack.pop()
+                if stack:
+                    euler.append(stack[-1][0])
+            else:
+                first[child] = len(euler)
+                euler.append(child)
+                stack.append((child, iter(children[child])))
+
+        # table[k][i]: shallowest node of euler[i:i + 2**k]
+        table = [euler]
+        k = 1
+        while (1 << k) <= len(euler):
+            prev = table[-1]
+            half = 1 << (k - 1)
+            row = []
+            for i in xrange(len(euler) - (1 << k) + 1):
+                a = prev[i]
+                b = prev[i + half]
+                row.append(a if depth[a] <= depth[b] else b)
+            table.append(row)
+            k += 1
+
+        self._first = first
+        self._table = table
+        self._full_depth = depth
+
+    def is_regular(self, node):
+        return self.depth[node] is not None
+
+    def lca(self, a, b):
+        """Lowest common ancestor of two regular tokens (self.root if none)."""
+        l = self._first[a]
+        r = self._first[b]
+        if l > r:
+            l, r = r, l
+
+        k = (r - l + 1).bit_length() - 1
+        x = self._table[k][l]
+        y = self._table[k][r - (1 << k) + 1]
+        return x if self._full_depth[x] <= self._full_depth[y] else y
+
+    def distance(self, a, b):
+        """Number of dependency edges between two regular tokens."""
+        return self.depth[a] + self.depth[b] - 2 * self._full_depth[self.lca(a, b)]
+
+    def path(self, start1, start2):
+        """Dependency path string between two tokens, memoized."""
+        key = (start1, start2)
+        if key not in self._paths:
+            if self.is_regular(start1) and self.is_regular(start2):
+                self._paths[key] = self._lca_path(start1, start2)
+            else:
+                self._paths[key] = self._walk_path(start1, start2)
+
+        return self._paths[key]
+
+    def _segments(self, start, common):
+        """(label, parent word) for each hop from start up to common."""
+        segments = []
+        node = start
+        i = 0
+        while node != common:
+            p = self.parents[node]
+            if p == common or p == -1:
+                segments.append((self.labels[node], "|"))
+            elif i == 0:
+                segments.append((self.labels[node], ""))
+            else:
+                segments.append((self.labels[node], self._lower[p]))
+
+            node = self.root if p == -1 else p
+            i += 1
+
+        return segments
+
+    def _lca_path(self, start1, start2):
+        common = self.lca(start1, start2)
+
+        left_path = "".join("--" + label + "->" + w for label, w in self._segments(start1, common))
+        right_path = "".join(w + "<-" + label + "--" for label, w in reversed(self._segments(start2, common)))
+
+        if common == start1 or common == start2:
+            return left_path + "SAMEPATH" + right_path
+
+        if common == self.root:
+            # the tree walk reports the -1 parent as the common root, and
+            # lemma[-1] is the last lemma of the sentence
+            return left_path + self._lower[-1] + right_path
+
+        return left_path + self._lower[common] + right_path
+
+    def _walk_path(self, start1, start2):
+        """Walk both ancestor chains; used for tokens outside a proper tree."""
+        n = len(self.parents)
+
+        def get_path(node):
+            path = []
+            steps = 0
+            while steps < MAX_STEPS and 0 <= node < n:
+                path.append((node, self.parents[node], self.labels[node]))
+                node = self.parents[node]
+                steps += 1
+
+            path.append((node, -1, "ROOT"))
+            return path
+
+        def find_common_root(pathA, pathB):
+            pos = 1
+            while (pos <= len(pathA) and pos <= len(pathB)
+                and pathA[-pos][0] == pathB[-pos][0]):
+                pos += 1
+
+            return pathA[-pos+1][0] if pos > 1 else None
+
+        path1 = get_path(start1)
+        path2 = get_path(start2)
+        commonroot = find_common_root(path1, path2)
+
+        left_path = ""
+        for i, (current, parent, label) in enumerate(path1):
+            if current == commonroot:
+                break
+
+            if parent == commonroot or parent == -1:
+                left_path = left_path + "--" + label + "->" + "|"
+            else:
+                w = self._lower[parent]
+                if i == 0:
+                    w = ""
+
+                left_path = left_path + "--" + label + "->" + w
+
+        right_path = ""
+        for i, (current, parent, label) in enumerate(path2):
+            if current == commonroot:
+                break
+
+            if parent == commonroot or parent == -1:
+                right_path = "|" + "<-" + label + "--" + right_path
+            else:
+                w = self._lower[parent]
+                if i == 0:
+                    w = ""
+
+                right_path = w + "<-" + label + "--" + right_path
+
+        if commonroot is None:
+            return left_path + "NONEROOT" + right_path
+
+        if commonroot == start1 or commonroot == start2:
+            return left_path + "SAMEPATH" + right_path
+
+        return left_path + self._lower[commonroot] + right_path
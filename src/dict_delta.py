@@ -0,0 +1,132 @@
+#!/usr/bin/python
+
+"""
+Re-emit only the candidates a dictionary update affects.
+
+Compares the dictionaries label() reads in an old snapshot with the ones
+loaded now (the current snapshot or sources), collects the gene symbols and
+docids whose entries changed, and looks them up in the indexes of candidate
+stores written by gene_relations.py --save-candidates. Only those
+candidates are relabeled and written out; their rows replace the existing
+rows with the same (mid1, mid2).
+
+Changes to the dictionaries that decide which candidates exist
+(gene_relations.EXTRACT_DICTS) cannot be handled this way and are reported:
+new gene symbols need a new extraction.
+
+Usage:
+    python dict_delta.py [options] OLD_SNAPSHOT STORE [STORE ...] > rows
+"""
+import argparse
+import sys
+
+import candidate_store
+import dict_snapshot
+import gene_relations
+from gene_relations import Candidate, log
+
+
+def diff_relation(old, new):
+    """(changed keys, values added to or removed from them)"""
+    keys = set()
+    values = set()
+    for key in set(old) | set(new):
+        before = set(old.get(key) or ())
+        after = set(new.get(key) or ())
+        if before != after:
+            keys.add(key)
+            values.update(before ^ after)
+
+    return keys, values
+
+
+def affected(kind, old, new):
+    """(symbols, docids) a change to one dictionary affects."""
+    if kind in ("symbols", "docids"):
+        changed = set(old) ^ set(new)
+        return (changed, set()) if kind == "symbols" else (set(), changed)
+
+    keys, values = diff_relation(old, new)
+    if kind == "pair":
+        return keys | values, set()
+    if kind == "symbol_key":
+        return keys, set()
+
+    return values, set()
+
+
+def delta(old_dicts, new_dicts):
+    symbols = set()
+    docids = set()
+    for name, kind in sorted(gene_relations.LABEL_DICTS.items()):
+        s, d = affected(kind, old_dicts[name], new_dicts[name])
+        if s or d:
+            log("%s: %d symbols, %d documents affected" % (name, len(s), len(d)))
+        symbols |= s
+        docids |= d
+
+    return symbols, docids
+
+
+def extraction_changes(old_dicts, new_dicts):
+    for name in gene_relations.EXTRACT_DICTS:
+        changed = set(old_dicts[name]) ^ set(new_dicts[name])
+        if changed:
+            log("%s changed for %d symbols: re-extract to pick these up" % (name, len(changed)))
+
+
+def affected_offsets(index, symbols, docids):
+    offsets = set()
+    for symbol in symbols:
+        offsets.update(index.symbol_offsets(symbol))
+
+    if docids:
+        # gold standard ids are docids without the .pdf suffix
+        for docid in index.docids:
+            if docid.split(".pdf")[0] in docids:
+                offsets.update(index.docid_offsets(docid))
+
+    return offsets
+
+
+def iter_affected(stores, symbols, docids):
+    for path in stores:
+        index = candidate_store.read_index(path, Candidate.FIELDS)
+        offsets = affected_offsets(index, symbols, docids)
+        log("%s: %d candidates affected" % (path, len(offsets)))
+        for record in candidate_store.read_records_at(path, Candidate.FIELDS, offsets):
+            yield record
+
+
+def current_dicts(names):
+    return dict((name, getattr(gene_relations, name)) for name in names)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("old_snapshot",
+        help="dictionary snapshot the stores were labeled with")
+    parser.add_argument("stores", nargs="+",
+        help="candidate stores written by gene_relations.py --save-candidates")
+    gene_relations.add_output_args(parser)
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+
+    names = list(gene_relations.LABEL_DICTS) + gene_relations.EXTRACT_DICTS
+
+    snap = dict_snapshot.open_snapshot(args.old_snapshot)
+    _, old_dicts = gene_relations.snapshot_dicts(snap, names)
+
+    gene_relations.load_dict(args.snapshot)
+    new_dicts = current_dicts(names)
+
+    extraction_changes(old_dicts, new_dicts)
+    symbols, docids = delta(old_dicts, new_dicts)
+
+    items = gene_relations.batched_records(iter_affected(args.stores, symbols, docids), args.batch_size)
+    gene_relations.run(items, gene_relations.open_outputs(args), gene_relations.read_candidates, args)
+    snap.close()
@@ -0,0 +1,233 @@
+#!/usr/bin/python
+
+"""
+Precompiled snapshot of the gene-gene extractor dictionaries.
+
+Parsing the raw dictionary files (genes.tsv, BIOGRID, chea, words, ...)
+dominates extractor startup, and every process that DeepDive fans out pays
+it again. The build step parses the sources once and writes every
+dictionary into a single versioned file, which extractor processes then
+memory-map and decode section by section.
+
+Arrays in a section (array.array elements of a tuple) are stored raw and
+come back as read-only NumPy views of the mapping, so the compact
+dictionaries cost no heap and every process on the machine shares one
+copy of them in the page cache. Without NumPy they are copied into arrays.
+
+File layout:
+    8 bytes     magic
+    4 bytes     format version (little-endian uint32)
+    4 bytes     header length (little-endian uint32)
+    header      JSON: dictionary version, source fingerprints, section table,
+                padded to a multiple of 8 bytes
+    payload     per section, a marshal blob and its arrays, each 8-aligned
+
+Usage:
+    python dict_snapshot.py build [snapshot_path]
+    python dict_snapshot.py info [snapshot_path]
+"""
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = "GRDSNAP\0"
+FORMAT_VERSION = 5
+
+_PREAMBLE = struct.Struct("<8sII")
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, truncated or incompatible."""
+    pass
+
+
+def fingerprint(paths):
+    """Return (path, size, mtime) for each source file, in the given order."""
+    sources = []
+    for path in paths:
+        st = os.stat(path)
+        sources.append([path, st.st_size, int(st.st_mtime)])
+
+    return sources
+
+
+def dict_version(sources):
+    """Version string identifying one set of dictionary source files."""
+    return hashlib.sha1(json.dumps(sources, sort_keys=True)).hexdigest()
+
+
+def write_snapshot(path, sections, sources):
+    """
+    Write a snapshot file.
+
+    sections: list of (name, object) pairs, each object marshal-serializable
+        or a tuple of such objects and arrays
+    sources: fingerprint() of the files the sections were built from
+    """
+    blobs = []
+    table = {}
+    offset = 0
+
+    def append(blob):
+        pad = -offset % 8
+        blobs.append("\0" * pad + blob)
+        return offset + pad, offset + pad + len(blob)
+
+    for name, obj in sections:
+        arrays = []
+        if isinstance(obj, tuple):
+            elements = list(obj)
+            for index, element in enumerate(elements):
+                if isinstance(element, array):
+                    arrays.append((index, element))
+                    elements[index] = None
+            obj = tuple(elements)
+
+        start, offset = append(marshal.dumps(obj))
+        table[name] = [start, offset - start, []]
+        for index, a in arrays:
+            start, offset = append(a.tostring())
+            table[name][2].append([index, a.typecode, start, len(a)])
+
+    header = json.dumps({
+        "version": dict_version(sources),
+        "sources": sources,
+        "sections": table
+    })
+    header += " " * (-(_PREAMBLE.size + len(header)) % 8)
+
+    # write next to the target and rename, so running extractors never
+    # map a half-written file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+
+    os.rename(tmp_path, path)
+
+
+class Snapshot(object):
+    """Read-only view of a snapshot file, mapped into memory."""
+
+    def __init__(self, path):
+        self.path = path
+
+        try:
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, ValueError) as e:
+            raise SnapshotError("cannot map {0}: {1}".format(path, e))
+
+        if len(self._mm) < _PREAMBLE.size:
+            raise SnapshotError("{0} is truncated".format(path))
+
+        magic, version, header_len = _PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise SnapshotError("{0} is not a dictionary snapshot".format(path))
+
+        if version != FORMAT_VERSION:
+            raise SnapshotError("{0} has format version {1}, expected {2}".format(
+                path, version, FORMAT_VERSION))
+
+        header = json.loads(self._mm[_PREAMBLE.size:_PREAMBLE.size + header_len])
+        # JSON strings load as unicode; the version is hex and goes into
+        # byte-string cache keys
+        self.version = str(header["version"])
+        self.sources = header["sources"]
+        self._sections = header["sections"]
+        self._payload = _PREAMBLE.size + header_len
+
+    def names(self):
+        return self._sections.keys()
+
+    def section_size(self, name):
+        offset, length, arrays = self._sections[name]
+        return length + sum(count * array(typecode).itemsize for _, typecode, _, count in arrays)
+
+    def is_stale(self):
+        """True if any source file changed since the snapshot was built."""
+        try:
+            current = fingerprint([path for path, size, mtime in self.sources])
+        except OSError:
+            return True
+
+        return current != self.sources
+
+    def section(self, name):
+        """
+        Decode and return one section. Its arrays are views of the mapping,
+        valid until close(): char arrays come back as buffers, the others
+        as NumPy arrays (or array copies without NumPy).
+        """
+        if name not in self._sections:
+            raise SnapshotError("{0} has no section {1}".format(self.path, name))
+
+        offset, length, arrays = self._sections[name]
+        start = self._payload + offset
+        obj = marshal.loads(self._mm[start:start + length])
+        if not arrays:
+            return obj
+
+        elements = list(obj)
+        for index, typecode, offset, count in arrays:
+            elements[index] = self._array(typecode, self._payload + offset, count)
+
+        return tuple(elements)
+
+    def _array(self, typecode, start, count):
+        if typecode == "c":
+            return buffer(self._mm, start, count)
+
+        if numpy is not None:
+            return numpy.frombuffer(self._mm, numpy.dtype(typecode), count, start)
+
+        a = array(typecode)
+        a.fromstring(self._mm[start:start + count * a.itemsize])
+        return a
+
+    def close(self):
+        """Unmap the file. The arrays of decoded sections must not be used after this."""
+        self._mm.close()
+
+
+def open_snapshot(path):
+    return Snapshot(path)
+
+
+def main(argv):
+    import gene_relations
+
+    if len(argv) < 2 or argv[1] not in ("build", "info"):
+        sys.stderr.write(__doc__)
+        return 1
+
+    path = argv[2] if len(argv) > 2 else gene_relations.BASE_FOLDER + gene_relations.DICT_SNAPSHOT
+
+    if argv[1] == "build":
+        gene_relations.build_dict_snapshot(path)
+
+    snap = open_snapshot(path)
+
+    print "snapshot:", snap.path
+    print "version:", snap.version
+    print "stale:", snap.is_stale()
+    for name in sorted(snap.names()):
+        print "  {0}: {1} bytes".format(name, snap.section_size(name))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,335 @@
+#!/usr/bin/python
+
+"""
+Streaming evaluation of DeepDive inference_bucketed*.csv outputs.
+
+Replaces loading whole CSVs into pandas
+(notebooks/genegene_evaluation): each file is read row by row, in bounded
+memory whatever its size, and summarized into
+
+    calibration   per expectation decile [0, .1], (.1, .2], ... (.9, 1]: the
+                  number of variables and of is_correct t / f rows, as in
+                  DeepDive's calibration_results view
+    histogram     expectation counts in 100 bins
+    precision     for each threshold, the rows with expectation >= threshold,
+                  and the precision of those
+                  - labeled: against their is_correct training labels
+                  - gold_standard: in the DIP/MINT gold-standard documents
+                    (plos_journals_dip_mint_pmids.txt; not the 10k sample,
+                    which is held out from training too), counting a
+                    prediction correct when the pair is a known interaction
+                    in dict_interact
+
+Across files (e.g. runs over corpora of different sizes) it compares the
+sets of distinct mention pairs predicted above --overlap-threshold. These
+sets are kept as hashes the width of a C long (64 bits on LP64), sorted into runs of at most --run-size
+hashes that are spilled to temporary files (under $TMPDIR), and the
+overlaps are counted exactly by merging the runs, so memory stays bounded
+by the run size.
+
+Usage:
+    python evaluate.py [options] inference_bucketed_3k.csv ... > evaluation.json
+"""
+import argparse
+import csv
+import hashlib
+import heapq
+import json
+import math
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+import gene_relations
+
+BUCKETS = 10
+HISTOGRAM_BINS = 100
+DEFAULT_THRESHOLDS = [0.5, 0.7, 0.8, 0.9, 0.95]
+DEFAULT_RUN_SIZE = 1 << 20
+READ_BLOCK = 1 << 16
+#array type of pair hashes
+HASH_TYPE = "l"
+
+#column names tried for the two mentions, in order
+MENTION_COLUMNS = [("mention1", "mention2"), ("word1", "word2")]
+
+
+class EvaluationError(Exception):
+    pass
+
+
+def bucket_of(expectation, buckets):
+    """Bucket of (k/buckets, (k+1)/buckets], with 0 in the first bucket."""
+    # rounding keeps e.g. 0.3 * 10 = 3.0000000000000004 out of the next bucket
+    k = int(math.ceil(round(expectation * buckets, 9))) - 1
+    return min(max(k, 0), buckets - 1)
+
+
+def pair_hash(m1, m2):
+    """Order-independent hash of a mention pair, a HASH_TYPE value."""
+    key = "\t".join(sorted([m1, m2]))
+    return struct.unpack(HASH_TYPE, hashlib.md5(key).digest()[:struct.calcsize(HASH_TYPE)])[0]
+
+
+def _read_run(f):
+    f.seek(0)
+    while True:
+        block = array(HASH_TYPE)
+        try:
+            block.fromfile(f, READ_BLOCK)
+        except EOFError:
+            # the items that were there are read all the same
+            pass
+
+        for h in block:
+            yield h
+
+        if len(block) < READ_BLOCK:
+            return
+
+
+class PairHashes(object):
+    """
+    A set of 64-bit hashes in bounded memory: added hashes are buffered,
+    and every run_size of them sorted, deduplicated and spilled to a
+    temporary file. After finish(), iterating merges the runs and yields
+    every distinct hash once, in order, and len() is their number.
+    """
+
+    def __init__(self, run_size=DEFAULT_RUN_SIZE):
+        self.run_size = run_size
+        self._buffer = array(HASH_TYPE)
+        self._runs = []
+        self._count = None
+
+    def add(self, h):
+        self._buffer.append(h)
+        if len(self._buffer) >= self.run_size:
+            self._spill()
+
+    def _spill(self):
+        f = tempfile.TemporaryFile(prefix="evaluate.")
+        array(HASH_TYPE, sorted(set(self._buffer))).tofile(f)
+        self._runs.append(f)
+        self._buffer = array(HASH_TYPE)
+
+    def finish(self):
+        if self._runs and self._buffer:
+            self._spill()
+        else:
+            # everything fits in one run: keep it in memory
+            self._buffer = array(HASH_TYPE, sorted(set(self._buffer)))
+
+        self._count = sum(1 for _ in self)
+
+    def __iter__(self):
+        if not self._runs:
+            return iter(self._buffer)
+
+        return self._merged()
+
+    def _merged(self):
+        last = None
+        for h in heapq.merge(*[_read_run(f) for f in self._runs]):
+            if h != last:
+                last = h
+                yield h
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        for f in self._runs:
+            f.close()
+        self._runs = []
+
+
+def common_count(a, b):
+    """The number of values in both of two sorted, distinct sequences."""
+    a = iter(a)
+    b = iter(b)
+    x = next(a, None)
+    y = next(b, None)
+    common = 0
+    while x is not None and y is not None:
+        if x < y:
+            x = next(a, None)
+        elif x > y:
+            y = next(b, None)
+        else:
+            common += 1
+            x = next(a, None)
+            y = next(b, None)
+
+    return common
+
+
+def precision(correct, total):
+    return round(float(correct) / total, 6) if total else None
+
+
+class FileEvaluation(object):
+    """Counts over the rows of one inference CSV."""
+
+    def __init__(self, label, thresholds, overlap_threshold, run_size=DEFAULT_RUN_SIZE):
+        self.label = label
+        self.thresholds = thresholds
+        self.overlap_threshold = overlap_threshold
+        self.rows = 0
+        self.buckets = [[0, 0, 0] for _ in xrange(BUCKETS)]
+        self.histogram = [0] * HISTOGRAM_BINS
+        # per threshold: [rows, labeled t, labeled f, gold standard rows, known]
+        self.above = [[0, 0, 0, 0, 0] for _ in thresholds]
+        self.pairs = PairHashes(run_size)
+
+    def add(self, expectation, is_correct, in_gold_standard, known, pair):
+        self.rows += 1
+        bucket = self.buckets[bucket_of(expectation, BUCKETS)]
+        bucket[0] += 1
+        if is_correct == "t":
+            bucket[1] += 1
+        elif is_correct == "f":
+            bucket[2] += 1
+
+        self.histogram[bucket_of(expectation, HISTOGRAM_BINS)] += 1
+
+        for threshold, counts in zip(self.thresholds, self.above):
+            if expectation < threshold:
+                continue
+            counts[0] += 1
+            if is_correct == "t":
+                counts[1] += 1
+            elif is_correct == "f":
+                counts[2] += 1
+            if in_gold_standard:
+                counts[3] += 1
+                counts[4] += known
+
+        if expectation >= self.overlap_threshold:
+            self.pairs.add(pair)
+
+    def summary(self):
+        return {
+            "label": self.label,
+            "rows": self.rows,
+            "calibration": [
+                {"bucket": k, "num_variables": n, "num_correct": t, "num_incorrect": f}
+                for k, (n, t, f) in enumerate(self.buckets)],
+            "histogram": self.histogram,
+            "precision": [
+                {"threshold": threshold, "rows": rows,
+                 "labeled": {"correct": t, "incorrect": f, "precision": precision(t, t + f)},
+                 "gold_standard": {"rows": gs, "known": known, "precision": precision(known, gs)}}
+                for threshold, (rows, t, f, gs, known) in zip(self.thresholds, self.above)],
+            "distinct_pairs": len(self.pairs),
+        }
+
+
+def file_label(path):
+    """inference_bucketed_123k.csv -> 123k"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    prefix = "inference_bucketed_"
+    return name[len(prefix):] if name.startswith(prefix) and len(name) > len(prefix) else name
+
+
+def mention_columns(header):
+    for columns in MENTION_COLUMNS:
+        if all(c in header for c in columns):
+            return [header.index(c) for c in columns]
+
+    raise EvaluationError("no mention columns (%s) in the header"
+                          % " or ".join("/".join(c) for c in MENTION_COLUMNS))
+
+
+def evaluate_file(path, gold_docids, thresholds, overlap_threshold, delimiter=",",
+                  run_size=DEFAULT_RUN_SIZE):
+    """Evaluate one file; gold_docids are gene_relations.read_dip_mint_docids()."""
+    evaluation = FileEvaluation(file_label(path), thresholds, overlap_threshold, run_size)
+    interacts = gene_relations.dict_interact.interacts
+
+    with open(path, "rb") as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader)
+        try:
+            docid_col = header.index("docid")
+            correct_col = header.index("is_correct")
+            expectation_col = header.index("expectation")
+        except ValueError as e:
+            raise EvaluationError("%s: %s" % (path, e))
+        m1_col, m2_col = mention_columns(header)
+
+        for row in reader:
+            if len(row) != len(header):
+                continue
+
+            m1, m2 = row[m1_col], row[m2_col]
+            gs = row[docid_col].split(".pdf")[0] in gold_docids
+            evaluation.add(float(row[expectation_col]), row[correct_col], gs,
+                           gs and interacts(m1, m2), pair_hash(m1, m2))
+
+    evaluation.pairs.finish()
+    return evaluation
+
+
+def compare(evaluations):
+    """Overlap of the high-confidence pairs of every two files."""
+    comparisons = []
+    for i, a in enumerate(evaluations):
+        for b in evaluations[i + 1:]:
+            common = common_count(a.pairs, b.pairs)
+            union = len(a.pairs) + len(b.pairs) - common
+            comparisons.append({
+                "a": a.label, "b": b.label,
+                "pairs_a": len(a.pairs), "pairs_b": len(b.pairs), "common": common,
+                "jaccard": round(float(common) / union, 6) if union else None,
+            })
+
+    return comparisons
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("files", nargs="+", help="inference_bucketed*.csv files")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=DEFAULT_THRESHOLDS,
+        help="expectation thresholds to report precision at")
+    parser.add_argument("--overlap-threshold", type=float, default=0.9,
+        help="expectation above which pairs are compared across files")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--run-size", type=int, default=DEFAULT_RUN_SIZE,
+        help="pair hashes kept in memory per file before spilling a sorted run to disk")
+    parser.add_argument("--snapshot", default=None,
+        help="dictionary snapshot to load (default: %s)" % gene_relations.DICT_SNAPSHOT)
+
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    csv.field_size_limit(sys.maxsize)
+
+    gene_relations.load_dict(args.snapshot)
+    gold_docids = gene_relations.read_dip_mint_docids()
+
+    evaluations = []
+    for path in args.files:
+        gene_relations.log("evaluating %s" % path)
+        evaluations.append(evaluate_file(path, gold_docids, sorted(args.thresholds),
+                                         args.overlap_threshold, args.delimiter, args.run_size))
+
+    results = {
+        "dict_version": gene_relations.loaded_dict_version,
+        "overlap_threshold": args.overlap_threshold,
+        "files": [e.summary() for e in evaluations],
+        "comparisons": compare(evaluations),
+    }
+    json.dump(results, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write("\n")
+
+    for evaluation in evaluations:
+        evaluation.pairs.close()
+
+
+if __name__ == "__main__":
+    main()
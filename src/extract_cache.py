@@ -0,0 +1,114 @@
+"""
+Persistent cache of extracted candidates, one entry per document.
+
+An entry is keyed by a hash of the document's content together with a
+version string covering the extractor code and the dictionaries, so
+editing the extractor or updating a dictionary invalidates every entry
+without any bookkeeping. A rerun over a grown corpus extracts only the new
+or changed documents and replays the stored candidates of the rest.
+
+Entries are zlib-compressed marshal blobs under <directory>/<xx>/<key>,
+written to a temporary file and renamed, so concurrent worker processes
+never see partial entries. Reading an entry touches its mtime; evict()
+removes least recently used entries until the cache fits max_bytes.
+"""
+import hashlib
+import marshal
+import os
+import zlib
+
+FORMAT_VERSION = 1
+
+DEFAULT_MAX_BYTES = 10 << 30
+
+
+def source_path(module):
+    path = module.__file__
+    if path.endswith((".pyc", ".pyo")):
+        path = path[:-1]
+
+    return path
+
+
+def code_version(modules):
+    """Hash of the source files of the modules that shape the output."""
+    h = hashlib.sha1()
+    for module in modules:
+        with open(source_path(module), "rb") as f:
+            h.update(f.read())
+
+    return h.hexdigest()
+
+
+class ExtractCache(object):
+
+    def __init__(self, directory, version, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.version = "%d:%s" % (FORMAT_VERSION, version)
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, content):
+        return hashlib.sha1(self.version + "\0" + content).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+
+        try:
+            return marshal.loads(zlib.decompress(data))
+        except (zlib.error, ValueError, EOFError, TypeError):
+            return None
+
+    def put(self, key, value):
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # another worker created it first
+                pass
+
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "wb") as f:
+            f.write(zlib.compress(marshal.dumps(value), 1))
+        os.rename(tmp, path)
+
+    def entries(self):
+        """(mtime, size, path) of every entry."""
+        for root, dirs, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits; return bytes freed."""
+        entries = sorted(self.entries())
+        total = sum(size for mtime, size, path in entries)
+        freed = 0
+        for mtime, size, path in entries:
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            freed += size
+
+        return freed
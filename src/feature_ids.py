@@ -0,0 +1,119 @@
+"""
+Stable integer IDs for feature strings.
+
+Every output row used to carry the full text of each of its features, and
+the same few hundred thousand strings were repeated across millions of rows.
+In feature-ID mode each feature is replaced by a 63-bit ID taken from its
+MD5 digest, so rows carry bigint[] arrays, and the ID -> string table is
+written once to a side file.
+
+Hashing makes IDs independent of the order features are met in, so worker
+processes assign them without coordinating and IDs agree across runs and
+shards. The parent checks each new ID against the strings it has already
+seen and stops with FeatureIdCollision rather than let two features share
+an ID.
+"""
+import hashlib
+import os
+import struct
+
+from lru import LRUCache
+
+DEFAULT_CACHE_SIZE = 1 << 18
+
+ID_MASK = (1 << 63) - 1
+
+
+class FeatureIdCollision(Exception):
+    pass
+
+
+def feature_id(feature):
+    """The first 63 bits of the feature's MD5 digest."""
+    if isinstance(feature, unicode):
+        feature = feature.encode("utf-8")
+
+    return struct.unpack("!q", hashlib.md5(feature).digest()[:8])[0] & ID_MASK
+
+
+class FeatureHasher(object):
+    """
+    Replaces feature lists with ID lists, keeping the (id, feature) entries
+    it has produced since the last drain() for a FeatureTable.
+    """
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache = LRUCache(cache_size)
+        self._new = []
+        self._last_list = None
+        self._last_ids = None
+
+    def ids(self, features):
+        # labeled and unlabeled rows of a candidate share one feature list
+        if features is self._last_list:
+            return self._last_ids
+
+        ids = []
+        for feature in features:
+            fid = self.cache.get(feature)
+            if fid is None:
+                fid = feature_id(feature)
+                self.cache.put(feature, fid)
+                self._new.append((fid, feature))
+            ids.append(fid)
+
+        self._last_list = features
+        self._last_ids = ids
+        return ids
+
+    def encode_rows(self, rows, column):
+        for row in rows:
+            row = list(row)
+            row[column] = self.ids(row[column])
+            yield row
+
+    def drain(self):
+        new = self._new
+        self._new = []
+        return new
+
+
+class FeatureTable(object):
+    """
+    The ID -> feature side file, one "id<TAB>feature" line per ID. An
+    existing file is read and extended, so IDs are checked across runs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._features = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    fid, feature = line.rstrip("\n").split("\t", 1)
+                    self._check(int(fid), feature)
+
+        self._out = open(path, "a")
+
+    def __len__(self):
+        return len(self._features)
+
+    def _check(self, fid, feature):
+        """Record the entry; return True if the ID is new."""
+        known = self._features.get(fid)
+        if known is None:
+            self._features[fid] = feature
+            return True
+
+        if known != feature:
+            raise FeatureIdCollision("features %r and %r both hash to %d" % (known, feature, fid))
+
+        return False
+
+    def add(self, entries):
+        for fid, feature in entries:
+            if self._check(fid, feature):
+                self._out.write("%d\t%s\n" % (fid, feature))
+
+    def close(self):
+        self._out.close()
@@ -16,8 +16,58 @@ from itertools import combinations
 import sys
 from helper.easierlife import *
 import csv
+import hashlib
+import os
 import re
-import random
+import struct
+
+import candidate_store
+import compression
+import dict_snapshot
+import extract_cache
+import feature_ids
+import lru
+import nlp_reader
+import output_sink
+import pair_counts
+import pipeline
+import resource_sampler
+import run_stats
+import sharding
+import symbols
+from dep_index import DepIndex
+from sentence_arrays import PairSpans, mask_and, mask_not
+from textnorm import utf_normalizer
+
+#dictionary sources, relative to BASE_FOLDER
+GENE_DICT = "/dicts/genes_pruned.tsv"
+GENE_DICT_ALL = "/dicts/genes.tsv"
+NEG_INT_DICT = "/dicts/negatome_combined_stringent_names.txt"
+DRUG_DICT = "/dicts/drugs.tsv"
+DICT_DIALECT = "excel-tab"
+SNOWBALL_DICT = "/dicts/genegene_snowball.txt"
+SUPERVSION_EXCLUDE_DICT = "/dicts/genegene_exclusion_distant_supervision.txt"
+TF_DICT = "/dicts/chea-background.csv"
+PLOS2PMID_BIOGRID_DICT = "/dicts/plos_journals_BioGRID_pmids.txt"
+BIOGRID_DICT = "/dicts/BIOGRID-ALL-3.2.112.tab.txt"
+COMPOUND_ROLES_DICT = "/dicts/compounds_bio_roles.txt"
+ACRONYM_DICT = "/dicts/med_acronyms_pruned.txt"
+ENGLISH_DICT = "/dicts/words"
+DOMAIN_DICT = "/dicts/smart_domain_list.txt"
+
+#GS filter
+INPUT_FILE_GS_SKIP = "/data/plos_journals_dip_mint_pmids.txt"
+INPUT_FILE_10K_SKIP = "/data/plos_docids_sample_10000.txt"
+
+DICT_SOURCES = [
+    INPUT_FILE_GS_SKIP, INPUT_FILE_10K_SKIP, GENE_DICT_ALL, GENE_DICT,
+    NEG_INT_DICT, SNOWBALL_DICT, SUPERVSION_EXCLUDE_DICT, PLOS2PMID_BIOGRID_DICT,
+    BIOGRID_DICT, TF_DICT, COMPOUND_ROLES_DICT, DRUG_DICT, ACRONYM_DICT,
+    ENGLISH_DICT, DOMAIN_DICT
+]
+
+#compiled form of all of the above, see dict_snapshot.py
+DICT_SNAPSHOT = "/dicts/gene_relations.snap"
 
 #extractor dictionaries
 dict_gene_symbols_all = {}
@@ -40,119 +90,162 @@ dict_y2h = {}
 dict_pmid2plos = {}
 dict_gs_docids = set()
 
+DICT_NAMES = [
+    "dict_gene_symbols_all", "dict_gene_pruned", "dict_interact", "dict_no_interact",
+    "dict_pmid_gene", "dict_gene_pmid", "dict_drug_names", "dict_compound_bio_roles",
+    "dict_geneid2name", "dict_geneid2official", "dict_name2geneid", "dict_snowball",
+    "dict_exclude_dist_sup", "dict_english", "dict_abbv", "dict_domains", "dict_y2h",
+    "dict_pmid2plos", "dict_gs_docids"
+]
+
+#{str: {str: 1}} and {str: 1} dictionaries, kept interned in compact
+#array-backed form once loaded (see symbols.py)
+COMPACT_RELATIONS = [
+    "dict_no_interact", "dict_exclude_dist_sup",
+    "dict_name2geneid", "dict_geneid2name", "dict_pmid_gene", "dict_gene_pmid"
+]
+COMPACT_SETS = ["dict_gene_symbols_all", "dict_gene_pruned", "dict_english", "dict_abbv", "dict_domains"]
+#interactions between alias groups, parsed into symbols.GraphBuilders and
+#kept as symbols.InteractionGraphs
+COMPACT_GRAPHS = ["dict_interact", "dict_y2h"]
+COMPACT_DICTS = COMPACT_RELATIONS + COMPACT_SETS + COMPACT_GRAPHS
+symbol_table = None
+#version of the dictionaries load_dict() bound, see dict_snapshot.dict_version
+loaded_dict_version = None
+
+#counters and timers of this process, see run_stats.py; the writer stage
+#of a run merges them into totals
+stats = run_stats.RunStats()
+totals = run_stats.RunStats()
+
+
+@stats.timed("load_dict")
+def load_dict(snapshot=None):
 
-def dep_path(deptree, sent, lemma, start1, start2):
     """
-    Input: dependency tree, sentence, lemma, and start word postions
-    Return: Dependency path between two words
+    Name: load_dict
+    Input: path of a dictionary snapshot (optional)
+    Return: None
 
-    Simplified version of Sentence class dependency path code
+    Store all relevant dictionaries for the gene-gene extractor.
+    Uses the compiled snapshot when it exists and is up to date with the
+    source files, and falls back to parsing the sources otherwise.
     """
-    def get_path(node):
-        """Given a starting node, walk the dependency tree and return the path walked."""
-        MAX_STEPS = 100
-        path = []
 
-        steps = 100
-        while steps < MAX_STEPS and node in deptree:
-            path.append({
-                "current": node,
-                "parent": deptree[node]["parent"],
-                "label": deptree[node]["label"]
-            })
+    global loaded_dict_version
 
-            node = deptree[node]["parent"]
-            steps += 1
+    if snapshot is None:
+        snapshot = BASE_FOLDER + DICT_SNAPSHOT
 
-        path.append({
-            "current": node,
-            "parent": -1,
-            "label": "ROOT"
-        })
+    if os.path.exists(snapshot):
+        try:
+            snap = dict_snapshot.open_snapshot(snapshot)
+        except dict_snapshot.SnapshotError as e:
+            log("Ignoring dictionary snapshot: %s" % e)
+        else:
+            if not snap.is_stale():
+                #left mapped: the compact dictionaries are views of it
+                read_dict_snapshot(snap)
+                loaded_dict_version = snap.version
+                return
 
-        return path
+            log("Dictionary snapshot %s is stale, parsing sources" % snapshot)
+            snap.close()
 
-    def find_common_root(pathA, pathB):
-        pos = 1
-        while (pos <= len(pathA) and pos <= len(pathB)
-            and pathA[-pos]["current"] == pathB[-pos]["current"]):
-            pos += 1
+    sources = dict_snapshot.fingerprint([BASE_FOLDER + f for f in DICT_SOURCES])
+    parse_dict()
+    loaded_dict_version = dict_snapshot.dict_version(sources)
 
-        return pathA[-pos+1]["current"] if pos > 1 else None
 
+def build_dict_snapshot(path):
+    """Parse the dictionary sources and compile them into a snapshot at path."""
+    sources = dict_snapshot.fingerprint([BASE_FOLDER + f for f in DICT_SOURCES])
+    parse_dict()
+    write_dict_snapshot(path, sources)
 
-    if len(deptree) > 0:
-        path1 = get_path(start1)
-        path2 = get_path(start2)
 
-        commonroot = find_common_root(path1, path2)
+def write_dict_snapshot(path, sources):
+    """Write the dictionaries as they are bound now to a snapshot at path."""
+    sections = [("symbols", symbol_table.state())]
+    for name in DICT_NAMES:
+        if name in COMPACT_DICTS:
+            sections.append((name, globals()[name].state()))
+        else:
+            sections.append((name, globals()[name]))
 
-        left_path = ""
-        for i in range(0, len(path1)):
-            if path1[i]["current"] == commonroot:
-                break
+    dict_snapshot.write_snapshot(path, sections, sources)
 
-            if path1[i]["parent"] == commonroot or path1[i]["parent"]==-1:
-                left_path = left_path + ("--" + path1[i]["label"] + "->" + '|')
-            else:
-                w = lemma[path1[i]["parent"]].lower()
-                if i == 0:
-                    w = ""
 
-                left_path = left_path + ("--" + path1[i]["label"] + "->" + w)
+def snapshot_dicts(snap, names=DICT_NAMES):
+    """Decode dictionaries from an open snapshot: (symbol table, {name: dictionary})."""
+    table = symbols.SymbolTable.from_state(snap.section("symbols"))
+    dicts = {}
+    for name in names:
+        if name in COMPACT_DICTS:
+            dicts[name] = symbols.from_state(table, snap.section(name))
+        else:
+            dicts[name] = snap.section(name)
 
-        right_path = ""
-        for i in range(0, len(path2)):
-            if path2[i]["current"] == commonroot:
-                break
+    return table, dicts
 
-            if path2[i]["parent"] == commonroot or path2[i]["parent"]==-1:
-                right_path = ('|' + "<-" + path2[i]["label"] + "--") + right_path
-            else:
-                w = lemma[path2[i]["parent"]].lower()
-                if i == 0:
-                    w = ""
 
-                right_path = (w + "<-" + path2[i]["label"] + "--" ) + right_path
+def read_dict_snapshot(snap):
+    """Bind the extractor dictionaries to the contents of an open snapshot."""
+    global symbol_table
 
+    symbol_table, dicts = snapshot_dicts(snap)
+    for name in DICT_NAMES:
+        globals()[name] = dicts[name]
 
-        if commonroot is None:
-            return left_path + "NONEROOT" + right_path
 
-        if commonroot == start1 or commonroot == start2:
-            return left_path + "SAMEPATH" + right_path
+def reset_dict():
+    """Rebind every extractor dictionary to a fresh, empty one."""
+    for name in DICT_NAMES:
+        if name in ("dict_compound_bio_roles", "dict_gs_docids"):
+            globals()[name] = set()
+        elif name in COMPACT_GRAPHS:
+            globals()[name] = symbols.GraphBuilder()
+        else:
+            globals()[name] = {}
 
-        return left_path + lemma[commonroot].lower() + right_path
 
+def compact_dict():
+    """Intern the nested dictionaries into their compact, array-backed form."""
+    global symbol_table
 
-def load_dict():
+    strings = set()
+    for name in COMPACT_DICTS:
+        symbols.collect(globals()[name], strings)
 
-    """
-    Name: load_dict
-    Input: None
-    Return: None
+    symbol_table = symbols.SymbolTable.build(strings)
 
-    Store all relevant dictionaries for the gene-gene extractor
-    """
+    for name in COMPACT_RELATIONS:
+        globals()[name] = symbols.Relation.build(symbol_table, globals()[name])
+
+    for name in COMPACT_SETS:
+        globals()[name] = symbols.IdSet.build(symbol_table, globals()[name])
 
+    for name in COMPACT_GRAPHS:
+        globals()[name] = symbols.InteractionGraph.build(symbol_table, globals()[name])
+
+
+def read_dip_mint_docids():
+    """Docids of the DIP/MINT gold-standard documents, as in_gold_standard() compares them."""
+    docids = set()
+    for x in [x.strip().split("\t")[0] for x in open(BASE_FOLDER + INPUT_FILE_GS_SKIP).readlines()]:
+        docids.add(x.rstrip().split(".pdf")[0].lower())
+
+    return docids
+
+
+def parse_dict():
+    """Build the extractor dictionaries from the raw source files."""
+
+    reset_dict()
     csv.field_size_limit(sys.maxsize)
-    GENE_DICT = "/dicts/genes_pruned.tsv"
-    GENE_DICT_ALL = "/dicts/genes.tsv"
-    NEG_INT_DICT = "/dicts/negatome_combined_stringent_names.txt"
-    DRUG_DICT = "/dicts/drugs.tsv"
-    DICT_DIALECT = "excel-tab"
-    SNOWBALL_DICT = "/dicts/genegene_snowball.txt"
-    SUPERVSION_EXCLUDE_DICT = "/dicts/genegene_exclusion_distant_supervision.txt"
-    TF_DICT = "/dicts/chea-background.csv"
-    PLOS2PMID_BIOGRID_DICT = "/dicts/plos_journals_BioGRID_pmids.txt"
-
-    #GS filter
-    INPUT_FILE_GS_SKIP = "/data/plos_journals_dip_mint_pmids.txt"
-    INPUT_FILE_10K_SKIP = "/data/plos_docids_sample_10000.txt"
 
     #gold standard docids
-    for x in [x.strip().split("\t")[0] for x in open(BASE_FOLDER + INPUT_FILE_GS_SKIP).readlines()]:
-        dict_gs_docids.add(x.rstrip().split(".pdf")[0].lower())
+    dict_gs_docids.update(read_dip_mint_docids())
 
     for x in [x.strip() for x in open(BASE_FOLDER + INPUT_FILE_10K_SKIP).readlines()]:
         dict_gs_docids.add(x.rstrip().split(".pdf")[0].lower())
@@ -218,18 +311,7 @@ def load_dict():
 
     for l in open(BASE_FOLDER + SNOWBALL_DICT):
         ss = l.rstrip().split('\t')
-        w1 = ss[0]
-        w2 = ss[1]
-
-        if w1 not in dict_interact:
-            dict_interact[w1] = {}
-
-        dict_interact[w1][w2] = 1
-
-        if w2 not in dict_interact:
-            dict_interact[w2] = {}
-
-        dict_interact[w2][w1] = 1
+        dict_interact.add_pair(ss[0], ss[1])
 
     for l in open(BASE_FOLDER + SUPERVSION_EXCLUDE_DICT):
         ss = l.rstrip().split("\t")
@@ -250,7 +332,7 @@ def load_dict():
         pmid = ss[1].rstrip()
         dict_pmid2plos[pmid] = plos
 
-    for l in open(BASE_FOLDER + "/dicts/BIOGRID-ALL-3.2.112.tab.txt"):
+    for l in open(BASE_FOLDER + BIOGRID_DICT):
         ss = l.split('\t')
         pmids = ss[8]
 
@@ -273,33 +355,21 @@ def load_dict():
             g1 = ss[2]
             g2 = ss[3]
             if g1 not in skip_genes and g2 not in skip_genes:
-                if g1 not in dict_interact:
-                    dict_interact[g1] = {}
-                dict_interact[g1][g2] = 1
-                if g2 not in dict_interact:
-                    dict_interact[g2] = {}
-                dict_interact[g2][g1] = 1
+                dict_interact.add_pair(g1, g2)
 
-            #alias
-            alt_list_1 = ss[4].split("|")
-            alt_list_2 = ss[5].split("|")
-
-            for a1 in alt_list_1:
-                for a2 in alt_list_2:
-
-                    if a1 not in skip_genes and a2 not in skip_genes:
-                        if a1 not in dict_interact:
-                            dict_interact[a1] = {}
-                        if a2 not in dict_interact:
-                            dict_interact[a2] = {}
-                        dict_interact[a1][a2] = 1
-                        dict_interact[a2][a1] = 1
-                        
-                        if pmids.rstrip() in dict_pmid2plos:
-                            plos_pmid = dict_pmid2plos[pmids.rstrip()]
-                            if plos_pmid in dict_pmid_gene:
-                                dict_pmid_gene[plos_pmid][a1] = 1
-                                dict_pmid_gene[plos_pmid][a2] = 1
+            #alias: every alias of one interactor interacts with every alias
+            #of the other, stored once between the two alias groups
+            alt_list_1 = [a for a in ss[4].split("|") if a not in skip_genes]
+            alt_list_2 = [a for a in ss[5].split("|") if a not in skip_genes]
+
+            if alt_list_1 and alt_list_2:
+                dict_interact.add_edge(alt_list_1, alt_list_2)
+
+                if pmids.rstrip() in dict_pmid2plos:
+                    plos_pmid = dict_pmid2plos[pmids.rstrip()]
+                    if plos_pmid in dict_pmid_gene:
+                        for a in alt_list_1 + alt_list_2:
+                            dict_pmid_gene[plos_pmid][a] = 1
 
             if pmids.rstrip() in dict_pmid2plos:
                 plos_pmid = dict_pmid2plos[pmids.rstrip()] 
@@ -307,41 +377,17 @@ def load_dict():
                     dict_pmid_gene[plos_pmid][g1] = 1
                     dict_pmid_gene[plos_pmid][g2] = 1
         else:
-            g1 = ss[2]
-            g2 = ss[3]
-            if g1 not in dict_y2h:
-                dict_y2h[g1] = {}
-            dict_y2h[g1][g2] = 1
-            if g2 not in dict_y2h:
-                dict_y2h[g2] = {}
-            dict_y2h[g2][g1] = 1
+            dict_y2h.add_pair(ss[2], ss[3])
 
             #alias
-            alt_list_1 = ss[4].split("|")
-            alt_list_2 = ss[5].split("|")
-
-            for a1 in alt_list_1:
-                for a2 in alt_list_2:
-
-                    if a1 not in dict_y2h:
-                        dict_y2h[a1] = {}
-                    if a2 not in dict_y2h:
-                        dict_y2h[a2] = {}
-                    dict_y2h[a1][a2] = 1
-                    dict_y2h[a2][a1] = 1
+            dict_y2h.add_edge(ss[4].split("|"), ss[5].split("|"))
 
 
     with open(BASE_FOLDER + TF_DICT, "r") as f:
         reader = csv.reader(f)
         for row in reader:
             if row[7] == "human":
-                if row[1] not in dict_interact:
-                    dict_interact[row[1]] = {}
-                dict_interact[row[1]][row[3]] = 1
-
-                if row[3] not in dict_interact:
-                    dict_interact[row[3]] = {}
-                dict_interact[row[3]][row[1]] = 1
+                dict_interact.add_pair(row[1], row[3])
 
     for pmid in dict_pmid_gene:
         for gene in dict_pmid_gene[pmid]:
@@ -349,7 +395,7 @@ def load_dict():
                 dict_gene_pmid[gene] = {}
             dict_gene_pmid[gene][pmid] = 1
 
-    for l in open(BASE_FOLDER + "dicts/compounds_bio_roles.txt"):
+    for l in open(BASE_FOLDER + COMPOUND_ROLES_DICT):
         for w in l.split(";"):
             dict_compound_bio_roles.add(w.rstrip().lower())
 
@@ -363,18 +409,20 @@ def load_dict():
                     if line[1].lower != "nitric oxide":
                         dict_drug_names[line[1].lower()] = line[1]
 
-    for l in open(BASE_FOLDER + "/dicts/med_acronyms_pruned.txt"):
+    for l in open(BASE_FOLDER + ACRONYM_DICT):
         word = l.rstrip().split("\t")[0]
         dict_abbv[word] = 1
 
-    for l in open(BASE_FOLDER + "/dicts/words"):
+    for l in open(BASE_FOLDER + ENGLISH_DICT):
         dict_english[l.rstrip().lower()] = 1
 
-    with open(BASE_FOLDER + "/dicts/smart_domain_list.txt") as f:
+    with open(BASE_FOLDER + DOMAIN_DICT) as f:
         reader = csv.reader(f, delimiter='\t')
         for row in reader:
             dict_domains[row[0].rstrip()] = 1
 
+    compact_dict()
+
 
 def normalize(word):
     """
@@ -384,6 +432,8 @@ def normalize(word):
 
     Normalization for word characters
     """ 
+    # five short patterns: chained str.replace beats a regex scan here,
+    # see bench_normalize.py
     return word.encode("ascii", "ignore").replace("'", '_').replace('{', '-_-').replace('}','-__-').replace('"', '-___-').replace(', ,', ',__')
 
 
@@ -394,517 +444,1395 @@ def normalize_utf(word):
     Return: normalized word
 
     Replaces common UTF codes with appropriate characters
+    (see textnorm.UTF_SUBSTITUTIONS)
     """
+    return utf_normalizer(word)
 
-    word = re.sub('\\xe2\\x80\\x94', '-', word)
-    word = re.sub('\\xef\\xac\\x81', 'fi', word)
-    word = re.sub('\\xc2\\xb0', "DEGREE", word)
-    word = re.sub('\\xe2\\x80\\x99', "\'", word)
-    word = re.sub('\\xef\\xac\\x82', "fl", word)
-    word = re.sub('\\xc2\\xa3', 'POUND', word)
-    word = re.sub('\\xe2\\x80\\x98', "\'", word)
-    word = re.sub('\\xe2\\x80\\x9c', "\"", word)
-    word = re.sub('\\xe2\\x80\\x9d', "\"", word)
-    word = re.sub('\\xe2\\x80\\x93', "-", word)
-    word = re.sub('\\xe2\\x80\\x94', "--", word)
-    word = re.sub('\\xe2\\x80\\xa6', "...", word)
-    word = re.sub('\\xc2\\x82', ',', word)       # High code comma
-    word = re.sub('\\xc2\\x84', ',,', word)       # High code double comma
-    word = re.sub('\\xc2\\x85', '...', word)     # Tripple dot
-    word = re.sub('\\xc2\\x88', '^', word)       # High carat
-    word = re.sub('\\xc2\\x91', '\'', word)    # Forward single quote
-    word = re.sub('\\xc2\\x92', '\'', word)    # Reverse single quote
-    word = re.sub('\\xc2\\x93', '\"', word)    # Forward double quote
-    word = re.sub('\\xc2\\x94', '\"', word)    # Reverse double quote
-    word = re.sub('\\xc2\\x95', '_', word)
-    word = re.sub('\\xc2\\x96', '-', word)       # High hyphen
-    word = re.sub('\\xc2\\x97', '--', word)      # Double hyphen
-    word = re.sub('\\xc2\\x99', '_', word)
-    word = re.sub('\\xc2\\xa0', '_', word)
-    word = re.sub('\\xc2\\xa6', '|', word)       # Split vertical bar
-    word = re.sub('\\xc2\\xab', '<<', word)      # Double less than
-    word = re.sub('\\xc2\\xbb', '>>', word)      # Double greater than
-    word = re.sub('\\xc2\\xbc', '1/4', word)     # one quarter
-    word = re.sub('\\xc2\\xbd', '1/2', word)     # one half
-    word = re.sub('\\xc2\\xbe', '3/4', word)     # three quarters
-    word = re.sub('\\xca\\xbf', '\'', word)    # c-single quote
-    word = re.sub('\\xcc\\xa8', '', word)        # modifier - under curve
-    word = re.sub('\\xcc\\xb1', '', word)         # modifier - under line
-    word = re.sub('\\xc2\\xa7', 'CODE', word)
-
-    return word
 
-def extract(doc):
-    """
-    Name: extract
-    Input: Document object
-    Return: relation and features for genegene database table
+EXCLUDED_GENES = set([
+    "ECM", "EMT", "AML", "CLL", "ALL", "spatial", "PDF", "ANOVA", "MED",
+    "gamma", "San", "RSS", "2F1", "ROS", "zeta", "ADP", "ALS", "GEF", "GAP"
+])
+NEGATION_WORDS = set(["no", "not", "neither", "nor"])
+BAD_CHAR = set(["\'", "}", "{", "\"", "-", ",", "[", "]"]) #think about adding parens
+#lemmas between the mentions that rule a pair out as a candidate
+CLAUSE_BREAK_WORDS = ["while", "whereas", "but", "where", "however"]
+DOMAIN_WORDS = set(["domains", "motif", "motifs", "domain", "site", "sites", "region", "regions", "sequence", "sequences", "elements"])
+
 
-    Extractor code to generate truth label and features
+class TokenFlags(object):
+    """
+    Per-token attributes of one sentence, computed once when the sentence
+    is first seen so that every candidate pair in it reads list entries
+    instead of repeating the dictionary and string tests.
     """
 
-    def get_short_sentences(doc):
-        MAX_WORDS_IN_SENTENCE = 50
-        for sentence in doc.sents:
-            if len(sent.words) <= MAX_WORDS_IN_SENTENCE:
-                yield sentence
+    def __init__(self, sent):
+        words = sent.words
 
-    def get_genes(sentence):
-        EXCLUDED_GENES = set([
-            "ECM", "EMT", "AML", "CLL", "ALL", "spatial", "PDF", "ANOVA", "MED",
-            "gamma", "San", "RSS", "2F1", "ROS", "zeta", "ADP", "ALS", "GEF", "GAP"
-        ])
+        word_ids = [symbol_table.id_of(w.word) for w in words]
+        lemma_ids = [symbol_table.id_of(w.lemma) for w in words]
 
-        # could probably make this a set of unique word.words, but need to verify
-        genes = []
-        for word in sentence.words:
-            if word.word in dict_gene_symbols_all and word.word not in EXCLUDED_GENES:
-                genes.append(word)
+        #word / lemma is in the pruned gene dictionary
+        self.is_pruned_gene = [dict_gene_pruned.contains_id(i) for i in word_ids]
+        self.is_pruned_lemma = [dict_gene_pruned.contains_id(i) for i in lemma_ids]
+        #lemma is any gene symbol (used for gene listings)
+        self.is_gene_lemma = [dict_gene_symbols_all.contains_id(i) for i in lemma_ids]
 
-        return genes
+        self.is_verb = ["VB" in w.pos for w in words]
+        self.is_negation = [w.lemma in NEGATION_WORDS for w in words]
+        self.is_clause_break = [w.lemma in CLAUSE_BREAK_WORDS for w in words]
+        self.has_comma = ["," in w.lemma for w in words]
+        self.is_bad_char = [w.lemma in BAD_CHAR for w in words]
+        self.is_plural_noun = [w.pos == "NNS" or w.pos == "NNPS" for w in words]
+        self.is_domain_word = [w.word in DOMAIN_WORDS for w in words]
 
-    def get_gene_pairs(genes):
-        def remove_underscores(s):
-            return s.replace("_", "")
+        #braces and commas in the surface word rule a verb out of the verb paths
+        self.is_brace_or_comma = [w.word == "{" or w.word == "}" or "," in w.word for w in words]
 
-        for geneA, geneB in combinations(genes, 2):
-            if remove_underscores(geneA) != remove_underscores(geneB):
-                yield (geneA, geneB)
+        #lemma can stand alone in a window feature
+        self.is_window_lemma = [not bad and not comma for bad, comma in zip(self.is_bad_char, self.has_comma)]
 
-#-------------------------------------------------------------------------------
 
-    for sent in get_short_sentences(doc):
-        lemma = []
-        deptree = {}
+#candidate generation counters, in stage order
+CANDIDATE_STAGES = ["sentences", "rejected_long_sentence", "pairs", "rejected_same_symbol",
+                    "rejected_clause_break", "candidates"]
 
-        for word in sent.words:
-            deptree[word.insent_id] = {"label":word.dep_label, "parent":word.dep_par}
-            lemma.append(word.lemma)
 
-        genes = get_genes(sent)
-        for w1, w2 in get_gene_pairs(genes):
-            minindex = min(w1.insent_id, w2.insent_id)
-            maxindex = max(w1.insent_id, w2.insent_id)
+def format_candidate_stats(stats):
+    return " ".join("%s=%d" % (stage, stats[stage]) for stage in CANDIDATE_STAGES)
 
-            features = []
 
-            ############## FEATURE EXTRACTION ####################################
+class Candidate(object):
+    """
+    A gene pair mention with its features and what label() needs to label
+    it. FIELDS is also the layout of the records candidate_store persists.
+    """
+    FIELDS = ("docid", "mid1", "mid2", "word1", "word2", "features", "sentence",
+              "ner1", "ner2", "ws", "high_quality_verb", "found_domain", "flag_family",
+              "abbreviations")
+    __slots__ = FIELDS
+
+    def __init__(self, *values):
+        for name, value in zip(self.FIELDS, values):
+            setattr(self, name, value)
+
+    def record(self):
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+
+#sentences whose candidates are kept for repeats (boilerplate, headers,
+#figure legends), None to disable; set by --sentence-cache
+DEFAULT_SENTENCE_CACHE_SIZE = 20000
+sentence_cache = None
 
-            # ##### FEATURE: WORD SEQUENCE BETWEEN MENTIONS AND VERB PATHS #####
-            ws = []
+
+def sentence_key(sent):
+    """
+    Digest of the columns a sentence's candidates are computed from: words,
+    lemmas, POS and NER tags and dependencies. Sentences with the same key
+    yield the same candidates, up to their mention ids.
+    """
+    words = sent.words
+    text = "\n".join(["\t".join([w.word for w in words]),
+                      "\t".join([w.lemma for w in words]),
+                      "\t".join([w.pos for w in words]),
+                      "\t".join([w.ner for w in words]),
+                      "\t".join([w.dep_label for w in words]),
+                      "\t".join(["%d" % w.dep_par for w in words])])
+    if isinstance(text, unicode):
+        text = text.encode("utf-8")
+
+    return hashlib.md5(text).digest()
+
+
+class FeatureContext(object):
+    """
+    A candidate pair as the feature families see it: the sentence and its
+    TokenFlags, the mentions and their positions, and the positions and
+    lemmas of the words between them. dep_path(a, b) is the sentence's
+    dependency path function.
+    """
+
+    def __init__(self, sent, flags, spans, k, w1, w2, dep_path):
+        self.sent = sent
+        self.words = sent.words
+        self.flags = flags
+        self.w1 = w1
+        self.w2 = w2
+        self.minindex = min(w1.insent_id, w2.insent_id)
+        self.maxindex = max(w1.insent_id, w2.insent_id)
+        self.ws_idx = spans.positions("words", k)
+        self.ws = [self.words[i].lemma for i in self.ws_idx]
+        self.verb_idx = spans.positions("verbs", k)
+        self.dep_path = dep_path
+        self._verbs = None
+
+    def verbs(self):
+        """
+        (lemmas of the verbs between the mentions, positions of the negated
+        ones), where a verb preceded by a negation word only counts as
+        negated more than two words before the second mention.
+        """
+        if self._verbs is None:
+            flags = self.flags
             verbs_between = []
-            minl_w1 = 100
-            minp_w1 = None
-            minw_w1 = None
-            mini_w1 = None
-            minl_w2 = 100
-            minp_w2 = None
-            minw_w2 = None
-            mini_w2 = None
-            neg_found = 0
-
-            for i in range(minindex+1, maxindex):
-                if "," not in sent.words[i].lemma:
-                    ws.append(sent.words[i].lemma)
-                if re.search('VB\w*', sent.words[i].pos): # and sent.words[i].lemma != "be":
-                    if sent.words[i].word != "{" and sent.words[i].word != "}" and "," not in sent.words[i].word:
-                        p_w1 = sent.get_word_dep_path(minindex, sent.words[i].insent_id)
-                        p_w2 = sent.get_word_dep_path(sent.words[i].insent_id, maxindex)
-
-                        if len(p_w1) < minl_w1:
-                            minl_w1 = len(p_w1)
-                            minp_w1 = p_w1
-                            minw_w1 = sent.words[i].lemma
-                            mini_w1 = sent.words[i].insent_id
-
-                        if len(p_w2) < minl_w2:
-                            minl_w2 = len(p_w2)
-                            minp_w2 = p_w2
-                            minw_w2 = sent.words[i].lemma
-                            mini_w2 = sent.words[i].insent_id
-
-                        if i > 0:
-                            if sent.words[i-1].lemma in ["no", "not", "neither", "nor"]:
-                                if i < maxindex - 2:
-                                    neg_found = 1
-                                    features.append("NEG_VERB_BETWEEN_with[%s]" % sent.words[i-1].word + "-" + sent.words[i].lemma)
-                            else:
-                                if sent.words[i] != "{" and sent.words[i] != "}":
-                                    verbs_between.append(sent.words[i].lemma)
+            negated = []
+            for i in self.verb_idx: # and sent.words[i].lemma != "be"
+                if i > 0:
+                    if flags.is_negation[i-1]:
+                        if i < self.maxindex - 2:
+                            negated.append(i)
+                    else:
+                        verbs_between.append(self.words[i].lemma)
+            self._verbs = (verbs_between, negated)
 
-            ## Do not include as candidates ##
-            if "while" in ws or "whereas" in ws or "but" in ws or "where" in ws or "however" in ws:
-                continue
+        return self._verbs
 
-            ##### FEATURE: HIGH QUALITY PREP INTERACTION PATTERNS #####
-            high_quality_verb = False
-            if len(verbs_between) == 1 and neg_found == 0:
-                features.append("SINGLE_VERB_BETWEEN_with[%s]" % verbs_between[0])
-                if verbs_between[0] in ["interact", "associate", "bind", "regulate", "phosporylate", "phosphorylated"]:
-                    high_quality_verb = True
-            else:
-                for verb in verbs_between:
-                    features.append("VERB_BETWEEN_with[%s]" % verb)
 
-            if len(ws) == 1 and ws[0] == "and" and minindex > 1:
-                if minindex > 2:
-                    if sent.words[minindex - 3].lemma not in ["no", "not", "neither", "nor"] and \
-                    sent.words[minindex - 1].lemma in ["of", "between"] and sent.words[minindex - 2].word in ["interaction", "binding"]:
-                        high_quality_verb = True
-                elif sent.words[minindex - 1].lemma in ["of", "between"] and sent.words[minindex - 2].word in ["interaction", "binding"]:
-                    high_quality_verb = True
+HIGH_QUALITY_VERBS = ["interact", "associate", "bind", "regulate", "phosporylate", "phosphorylated"]
+PREP_PATTERN_LEMMAS = ["association", "interaction", "complex", "activation", "bind", "binding"]
+FAMILY_WORDS = ["family", "superfamily"]
 
-            if len(ws) == 1 and ws[0] == "-" and maxindex < len(sent.words) - 1:
-                if sent.words[maxindex + 1].lemma == "complex":
-                    high_quality_verb = True
 
-            if len(ws) == 1 and ws[0] == "and" and maxindex < len(sent.words) - 1:
-                if sent.words[maxindex + 1].word in ["interaction", "interactions"]:
-                    high_quality_verb = True
+def prep_pattern(ctx):
+    """The PREP_PATTERN feature of a pair ("interaction of A with B"), or None."""
+    words = ctx.words
+    minindex = ctx.minindex
+    ws = ctx.ws
+    if minindex > 1:
+        if words[minindex - 2].lemma.lower() in PREP_PATTERN_LEMMAS:
+            if words[minindex - 1].word.lower() in ["of", "between"] and ("with" in ws or "and" in ws or "to" in ws) and len(ws) ==1:
+                return "PREP_PATTERN[{0}_{1}_{2}]".format(words[minindex-2].lemma.lower(), words[minindex-1].word.lower(), words[minindex+1].word.lower())
 
+    return None
 
 
-            ##### FEATURE: WORDS BETWEEN MENTIONS #####
-            if len(ws) < 7 and len(ws) > 0 and "{" not in ws and "}" not in ws and "\"" not in ws and "/" not in ws and "\\" not in ws and "," not in ws:
-                 if " ".join(ws) not in ["_ and _", "and", "or",  "_ or _"]:
-                     features.append("WORDS_BETWEEN_with[%s]" % " ".join(ws))
+def candidate_attributes(ctx):
+    """
+    (high_quality_verb, found_domain, flag_family): what label() reads of a
+    pair besides its features, whichever feature families are enabled.
+    """
+    words = ctx.words
+    flags = ctx.flags
+    minindex = ctx.minindex
+    maxindex = ctx.maxindex
+    ws = ctx.ws
 
+    ##### HIGH QUALITY INTERACTION PATTERNS #####
+    high_quality_verb = False
+    verbs_between, negated = ctx.verbs()
+    if len(verbs_between) == 1 and not negated:
+        if verbs_between[0] in HIGH_QUALITY_VERBS:
+            high_quality_verb = True
+
+    if len(ws) == 1 and ws[0] == "and" and minindex > 1:
+        if minindex > 2:
+            if not flags.is_negation[minindex - 3] and \
+            words[minindex - 1].lemma in ["of", "between"] and words[minindex - 2].word in ["interaction", "binding"]:
+                high_quality_verb = True
+        elif words[minindex - 1].lemma in ["of", "between"] and words[minindex - 2].word in ["interaction", "binding"]:
+            high_quality_verb = True
+
+    if len(ws) == 1 and ws[0] == "-" and maxindex < len(words) - 1:
+        if words[maxindex + 1].lemma == "complex":
+            high_quality_verb = True
+
+    if len(ws) == 1 and ws[0] == "and" and maxindex < len(words) - 1:
+        if words[maxindex + 1].word in ["interaction", "interactions"]:
+            high_quality_verb = True
+
+    if prep_pattern(ctx) is not None:
+        high_quality_verb = True
+
+    ##### A MENTION FOLLOWED BY A DOMAIN WORD #####
+    found_domain = 0
+    if minindex > 0 and flags.is_domain_word[minindex + 1]:
+        found_domain = 1
+    if maxindex < len(words) - 1 and flags.is_domain_word[maxindex + 1]:
+        found_domain = 1
 
-            ##### FEATURE: 3-GRAM WORD SEQUENCE #####
-            bad_char = ["\'", "}", "{", "\"", "-", ",", "[", "]"] #think about adding parens
-            if len(ws) > 4 and len(ws) < 15:
-                for i in range(2,len(ws)):
-                    if ws[i-2] not in bad_char and ws[i - 1] not in bad_char and ws[i] not in bad_char:
-                        if "," not in ws[i-2] and "," not in ws[i-1] and "," not in ws:
-                            features.append("WS_3_GRAM_with[" + ws[i - 2] + "-" + ws[i - 1] + "-" + ws[i]+"]")
+    ##### A MENTION FOLLOWED BY "FAMILY" #####
+    flag_family = 0
+    if maxindex < len(words) - 1:
+        if flags.is_window_lemma[maxindex + 1] and not flags.is_pruned_gene[maxindex + 1]:
+            if words[maxindex + 1].lemma in FAMILY_WORDS:
+                flag_family = 1
+
+    if len(ws) > 4:
+        if flags.is_window_lemma[minindex + 1] and not flags.is_pruned_gene[minindex + 1]:
+            if words[minindex + 1].lemma in FAMILY_WORDS:
+                flag_family = 1
+
+    return high_quality_verb, found_domain, flag_family
+
+
+#(name, function(ctx, features)) of every feature family, in the order
+#their features are emitted
+FEATURE_FAMILIES = []
+
+#names of the families extract_candidates() runs, None for all; set by
+#--features and --disable-features
+enabled_families = None
+
+
+def feature_family(name):
+    """Register a function(ctx, features) that appends a family's features."""
+    def register(func):
+        FEATURE_FAMILIES.append((name, func))
+        return func
+
+    return register
+
+
+def enabled_feature_families():
+    return [(name, func) for name, func in FEATURE_FAMILIES
+            if enabled_families is None or name in enabled_families]
+
+
+def disabled_feature_families():
+    return [name for name, func in FEATURE_FAMILIES
+            if enabled_families is not None and name not in enabled_families]
+
+
+@feature_family("negated_verbs")
+def negated_verb_features(ctx, features):
+    words = ctx.words
+    for i in ctx.verbs()[1]:
+        features.append("NEG_VERB_BETWEEN_with[%s]" % words[i-1].word + "-" + words[i].lemma)
+
+
+@feature_family("verbs_between")
+def verbs_between_features(ctx, features):
+    verbs_between, negated = ctx.verbs()
+    if len(verbs_between) == 1 and not negated:
+        features.append("SINGLE_VERB_BETWEEN_with[%s]" % verbs_between[0])
+    else:
+        for verb in verbs_between:
+            features.append("VERB_BETWEEN_with[%s]" % verb)
+
+
+@feature_family("words_between")
+def words_between_features(ctx, features):
+    ws = ctx.ws
+    if len(ws) < 7 and len(ws) > 0 and "{" not in ws and "}" not in ws and "\"" not in ws and "/" not in ws and "\\" not in ws and "," not in ws:
+         if " ".join(ws) not in ["_ and _", "and", "or",  "_ or _"]:
+             features.append("WORDS_BETWEEN_with[%s]" % " ".join(ws))
+
+
+@feature_family("ws_3_gram")
+def ws_3_gram_features(ctx, features):
+    ws = ctx.ws
+    ws_idx = ctx.ws_idx
+    is_bad_char = ctx.flags.is_bad_char
+    # ws never holds lemmas with commas, so only bad characters are checked
+    if len(ws) > 4 and len(ws) < 15:
+        for i in range(2,len(ws)):
+            if not is_bad_char[ws_idx[i-2]] and not is_bad_char[ws_idx[i-1]] and not is_bad_char[ws_idx[i]]:
+                features.append("WS_3_GRAM_with[" + ws[i - 2] + "-" + ws[i - 1] + "-" + ws[i]+"]")
 
-            ##### FEATURE: PREPOSITIONAL PATTERNS #####
-            if minindex > 1:
-                if sent.words[minindex - 2].lemma.lower() in ["association", "interaction", "complex", "activation", "bind", "binding"]:
-                    if sent.words[minindex - 1].word.lower() in ["of", "between"] and ("with" in ws or "and" in ws or "to" in ws) and len(ws) ==1:
-                        features.append("PREP_PATTERN[{0}_{1}_{2}]".format(sent.words[minindex-2].lemma.lower(), sent.words[minindex-1].word.lower(), sent.words[minindex+1].word.lower()))
-                        high_quality_verb = True
 
+@feature_family("prep_pattern")
+def prep_pattern_features(ctx, features):
+    feature = prep_pattern(ctx)
+    if feature is not None:
+        features.append(feature)
 
-            ##### FEATURE: NEGATED GENES #####
-            if sent.words[maxindex-1].lemma in ["no", "not", "neither", "nor"]:
-                features.append("NEG_SECOND_GENE[%s]" % sent.words[maxindex - 1].lemma)
 
-            if minindex > 0:
-                if sent.words[minindex-1].lemma in ["no", "not", "neither", "nor"]:
-                    features.append("NEG_FIRST_GENE[%s]" % sent.words[minindex - 1].lemma)
+@feature_family("negation")
+def negation_features(ctx, features):
+    words = ctx.words
+    is_negation = ctx.flags.is_negation
+    if is_negation[ctx.maxindex-1]:
+        features.append("NEG_SECOND_GENE[%s]" % words[ctx.maxindex - 1].lemma)
 
+    if ctx.minindex > 0:
+        if is_negation[ctx.minindex-1]:
+            features.append("NEG_FIRST_GENE[%s]" % words[ctx.minindex - 1].lemma)
 
-            if mini_w2 == mini_w1 and mini_w1 != None and len(minp_w1) < 100: # and "," not in minw_w1:
-                feature2 = 'DEP_PAR_VERB_CONNECT_with[' + minw_w1 + ']'
-                features.append(feature2)
 
-            ##### FEATURE: DEPENDENCY PATH #####
-            p = dep_path(deptree, sent, lemma, w1.insent_id, w2.insent_id)
+@feature_family("verb_paths")
+def verb_path_features(ctx, features):
+    """A verb that is the nearest, by dependency path, to both mentions."""
+    words = ctx.words
+    dep_path = ctx.dep_path
+    minl_w1 = 100
+    minp_w1 = None
+    minw_w1 = None
+    mini_w1 = None
+    minl_w2 = 100
+    mini_w2 = None
 
-            word1_parent_idx = w1.dep_par
-            word1_parent_path = w1.dep_label
+    for i in ctx.verb_idx:
+        p_w1 = dep_path(ctx.minindex, words[i].insent_id)
+        p_w2 = dep_path(words[i].insent_id, ctx.maxindex)
 
-            if len(p) < 100:
-                try:
-                    word1_parent_path = normalize_utf(word1_parent_path)
-                    p = normalize_utf(p)
-                    p.decode('ascii')
-                    norm_p = re.sub(",", "_", normalize(p))
+        if len(p_w1) < minl_w1:
+            minl_w1 = len(p_w1)
+            minp_w1 = p_w1
+            minw_w1 = words[i].lemma
+            mini_w1 = words[i].insent_id
 
-                    if word1_parent_idx == -1:
-                        features.append("ROOT_'" + norm_p + "'")
+        if len(p_w2) < minl_w2:
+            minl_w2 = len(p_w2)
+            mini_w2 = words[i].insent_id
 
-                    else:
-                        par_word = sent.words[word1_parent_idx]
-                        par_word_lemma = normalize_utf(par_word.lemma)
-
-                        if "," not in par_word_lemma:
-                            feature = 'DEP_PAR[' + normalize(par_word_lemma) + '--' + word1_parent_path + '--' + norm_p + ']'
-                            features.append(feature)
-                except UnicodeDecodeError:
-                    pass
-
-            ##### FEATURE: WINDOW FEATURES #####
-            bad_char = ["\'", "}", "{", "\"", "-", ",", "[", "]"]
-            flag_family = 0
-
-            if minindex > 0:
-                if sent.words[minindex - 1].lemma not in bad_char and "," not in sent.words[minindex - 1].lemma:
-                    if sent.words[minindex-1].lemma in dict_gene_pruned:
-                        features.append('WINDOW_LEFT_M1_1_with[GENE]')
-                    else:
-                        features.append('WINDOW_LEFT_M1_1_with[%s]' % sent.words[minindex-1].lemma)
-
-            if minindex > 1:
-                
-                if sent.words[minindex-2].word in dict_gene_pruned:
-                    left_phrase = "GENE"+"-"+sent.words[minindex-1].lemma
-                else:
-                    left_phrase = sent.words[minindex-2].lemma+"-"+sent.words[minindex-1].lemma
-                
-                if sent.words[minindex - 2].lemma not in bad_char and sent.words[minindex - 1].lemma not in bad_char and "," not in left_phrase:
-                    features.append('WINDOW_LEFT_M1_PHRASE_with[%s]' % left_phrase)
-                    
-                elif sent.words[minindex - 2].lemma not in bad_char and "," not in sent.words[minindex - 2].lemma:
-                    if sent.words[minindex-2].word in dict_gene_pruned:
-                        features.append('WINDOW_LEFT_M1_2_with[GENE]')
-                    else:
-                        features.append('WINDOW_LEFT_M1_2_with[%s]' % sent.words[minindex-2].lemma)
+    if mini_w2 == mini_w1 and mini_w1 != None and len(minp_w1) < 100: # and "," not in minw_w1:
+        feature2 = 'DEP_PAR_VERB_CONNECT_with[' + minw_w1 + ']'
+        features.append(feature2)
 
-            if maxindex < len(sent.words) - 1:
-                if sent.words[maxindex + 1].lemma not in bad_char and "," not in sent.words[maxindex + 1].lemma:
-                    if sent.words[maxindex+1].word in dict_gene_pruned:
-                        features.append('WINDOW_RIGHT_M2_1_with[GENE]')
-                    else:
-                        if sent.words[maxindex+1].lemma in ["family", "superfamily"]: flag_family = 1
-                        features.append('WINDOW_RIGHT_M2_1_with[%s]' % sent.words[maxindex+1].lemma)
 
-            if maxindex < len(sent.words) - 2:
-                if sent.words[maxindex + 2].word in dict_gene_pruned:
-                    right_phrase = "GENE"+"-"+sent.words[maxindex+1].lemma
-                else:
-                    right_phrase = sent.words[maxindex+2].lemma+"-"+sent.words[maxindex+1].lemma
+@feature_family("dep_path")
+def dep_path_features(ctx, features):
+    w1 = ctx.w1
+    p = ctx.dep_path(w1.insent_id, ctx.w2.insent_id)
+
+    word1_parent_idx = w1.dep_par
+    word1_parent_path = w1.dep_label
+
+    if len(p) < 100:
+        try:
+            word1_parent_path = normalize_utf(word1_parent_path)
+            p = normalize_utf(p)
+            p.decode('ascii')
+            norm_p = normalize(p).replace(",", "_")
 
+            if word1_parent_idx == -1:
+                features.append("ROOT_'" + norm_p + "'")
 
-                if sent.words[maxindex + 2].lemma not in bad_char and sent.words[maxindex + 1].lemma not in bad_char and "," not in right_phrase:
-                    features.append('WINDOW_RIGHT_M2_PHRASE_with[%s]' % right_phrase)
-                elif sent.words[maxindex + 2].lemma not in bad_char and "," not in sent.words[maxindex + 2].lemma:
-                    if sent.words[maxindex + 2].word in dict_gene_pruned:
-                        features.append('WINDOW_RIGHT_M2_2_with[GENE]')
-                    else:
-                        features.append('WINDOW_RIGHT_M2_2_with[%s]' % sent.words[maxindex+2].lemma)
+            else:
+                par_word = ctx.words[word1_parent_idx]
+                par_word_lemma = normalize_utf(par_word.lemma)
+
+                if "," not in par_word_lemma:
+                    feature = 'DEP_PAR[' + normalize(par_word_lemma) + '--' + word1_parent_path + '--' + norm_p + ']'
+                    features.append(feature)
+        except UnicodeDecodeError:
+            pass
+
+
+@feature_family("window")
+def window_features(ctx, features):
+    words = ctx.words
+    flags = ctx.flags
+    minindex = ctx.minindex
+    maxindex = ctx.maxindex
+
+    if minindex > 0:
+        if flags.is_window_lemma[minindex - 1]:
+            if flags.is_pruned_lemma[minindex - 1]:
+                features.append('WINDOW_LEFT_M1_1_with[GENE]')
+            else:
+                features.append('WINDOW_LEFT_M1_1_with[%s]' % words[minindex-1].lemma)
 
+    if minindex > 1:
 
-            if len(ws) > 4:
-                if sent.words[minindex + 1].lemma not in bad_char and "," not in sent.words[minindex + 1].lemma:
-                    if sent.words[minindex + 1].word in dict_gene_pruned:
-                        features.append('WINDOW_RIGHT_M1_1_with[GENE]')
-                    else:
-                        if sent.words[minindex+1].lemma in ["family", "superfamily"]: flag_family = 1
-                        features.append('WINDOW_RIGHT_M1_1_with[%s]' % sent.words[minindex+1].lemma)
+        if flags.is_pruned_gene[minindex - 2]:
+            left_phrase = "GENE"+"-"+words[minindex-1].lemma
+        else:
+            left_phrase = words[minindex-2].lemma+"-"+words[minindex-1].lemma
 
-                if sent.words[minindex+2].word in dict_gene_pruned:
-                    m1_right_phrase = "GENE"+"-"+sent.words[minindex+1].lemma
-                else:
-                    m1_right_phrase = sent.words[minindex+2].lemma+"-"+sent.words[minindex+1].lemma
+        if not flags.is_bad_char[minindex - 2] and not flags.is_bad_char[minindex - 1] and "," not in left_phrase:
+            features.append('WINDOW_LEFT_M1_PHRASE_with[%s]' % left_phrase)
 
+        elif flags.is_window_lemma[minindex - 2]:
+            if flags.is_pruned_gene[minindex - 2]:
+                features.append('WINDOW_LEFT_M1_2_with[GENE]')
+            else:
+                features.append('WINDOW_LEFT_M1_2_with[%s]' % words[minindex-2].lemma)
 
-                if sent.words[minindex + 2].lemma not in bad_char and sent.words[minindex + 1].lemma not in bad_char and "," not in m1_right_phrase:
-                    features.append('WINDOW_RIGHT_M1_PHRASE_with[%s]' % m1_right_phrase)
-                elif sent.words[minindex + 2].lemma not in bad_char and "," not in sent.words[minindex + 2].lemma:
-                    if sent.words[minindex+2].word in dict_gene_pruned:
-                        features.append('WINDOW_RIGHT_M1_2_with[GENE]')
-                    else:
-                        features.append('WINDOW_RIGHT_M1_2_with[%s]' % sent.words[minindex+2].lemma)
+    if maxindex < len(words) - 1:
+        if flags.is_window_lemma[maxindex + 1]:
+            if flags.is_pruned_gene[maxindex + 1]:
+                features.append('WINDOW_RIGHT_M2_1_with[GENE]')
+            else:
+                features.append('WINDOW_RIGHT_M2_1_with[%s]' % words[maxindex+1].lemma)
 
-                if sent.words[maxindex - 1].lemma not in bad_char and "," not in sent.words[maxindex - 1].lemma:
-                    if sent.words[maxindex - 1].word in dict_gene_pruned:
-                        features.append('WINDOW_LEFT_M2_1_with[GENE]')
-                    else:
-                        features.append('WINDOW_LEFT_M2_1_with[%s]' % sent.words[maxindex-1].lemma)
-
-                if sent.words[maxindex-2].word in dict_gene_pruned:
-                    m2_left_phrase = "GENE"+"-"+sent.words[maxindex-1].lemma
-                else:
-                    m2_left_phrase = sent.words[maxindex-2].lemma+"-"+sent.words[maxindex-1].lemma
-
-                if sent.words[maxindex - 2].lemma not in bad_char and sent.words[maxindex - 1].lemma not in bad_char and "," not in m2_left_phrase: 
-                    features.append('WINDOW_LEFT_M2_PHRASE_with[%s]' % m2_left_phrase)
-                elif sent.words[maxindex - 2].lemma not in bad_char and "," not in sent.words[maxindex - 2].lemma:
-                    if sent.words[maxindex-2].word in dict_gene_pruned:
-                        features.append('WINDOW_LEFT_M2_2_with[GENE]')
-                    else:
-                        features.append('WINDOW_LEFT_M2_2_with[%s]' % sent.words[maxindex-2].lemma)
-
-
-            ##### FEATURE: DOMAIN #####
-            domain_words = ["domains", "motif", "motifs", "domain", "site", "sites", "region", "regions", "sequence", "sequences", "elements"]
-            found_domain = 0
-            if minindex > 0:
-                if sent.words[minindex + 1].word in domain_words:
-                    found_domain = 1
-                    features.append('GENE_FOLLOWED_BY_DOMAIN_WORD')
-
-
-            if maxindex < len(sent.words) - 1 and found_domain == 0:
-                if sent.words[maxindex + 1].word in domain_words:
-                    features.append('GENE_FOLLOWED_BY_DOMAIN_WORD')
-                    found_domain = 1
-
-
-            ##### FEATURE: PLURAL GENES #####
-            found_plural = 0
-            if minindex > 0:
-                if sent.words[minindex + 1].pos == "NNS" or sent.words[minindex + 1].pos == "NNPS": 
-                    found_plural = 1
-                    features.append('GENE_M1_FOLLOWED_BY_PLURAL_NOUN_with[%s]' % sent.words[minindex + 1].word)
-
-
-            if maxindex < len(sent.words) - 1 and found_plural == 0:
-                if sent.words[maxindex + 1].pos == "NNS" or sent.words[maxindex + 1].pos == "NNPS": 
-                    found_plural = 1
-                    features.append('GENE_M2_FOLLOWED_BY_PLURAL_NOUN)_with[%s]' % sent.words[maxindex + 1].word)
-
-
-            ##### FEATURE: GENE LISTING #####
-            if len(ws) > 0:
-                count = 0
-                flag_not_list = 0
-                for w in ws:
-
-                    #should be comma
-                    if count % 4 == 0:
-                        if w != '_':
-                            flag_not_list = 1
-                    elif count % 4 == 1:
-                        if w != ",":
-                            flag_not_list = 1
-                    elif count %4 == 2:
-                        if w != "_":
-                            flag_not_list = 1
-                    #should be a gene
-                    else:
-                        if w not in dict_gene_symbols_all:
-                            flag_not_list = 1
-                    count = count + 1
+    if maxindex < len(words) - 2:
+        if flags.is_pruned_gene[maxindex + 2]:
+            right_phrase = "GENE"+"-"+words[maxindex+1].lemma
+        else:
+            right_phrase = words[maxindex+2].lemma+"-"+words[maxindex+1].lemma
+
+        if not flags.is_bad_char[maxindex + 2] and not flags.is_bad_char[maxindex + 1] and "," not in right_phrase:
+            features.append('WINDOW_RIGHT_M2_PHRASE_with[%s]' % right_phrase)
+        elif flags.is_window_lemma[maxindex + 2]:
+            if flags.is_pruned_gene[maxindex + 2]:
+                features.append('WINDOW_RIGHT_M2_2_with[GENE]')
+            else:
+                features.append('WINDOW_RIGHT_M2_2_with[%s]' % words[maxindex+2].lemma)
+
+
+    if len(ctx.ws) > 4:
+        if flags.is_window_lemma[minindex + 1]:
+            if flags.is_pruned_gene[minindex + 1]:
+                features.append('WINDOW_RIGHT_M1_1_with[GENE]')
+            else:
+                features.append('WINDOW_RIGHT_M1_1_with[%s]' % words[minindex+1].lemma)
+
+        if flags.is_pruned_gene[minindex + 2]:
+            m1_right_phrase = "GENE"+"-"+words[minindex+1].lemma
+        else:
+            m1_right_phrase = words[minindex+2].lemma+"-"+words[minindex+1].lemma
+
+
+        if not flags.is_bad_char[minindex + 2] and not flags.is_bad_char[minindex + 1] and "," not in m1_right_phrase:
+            features.append('WINDOW_RIGHT_M1_PHRASE_with[%s]' % m1_right_phrase)
+        elif flags.is_window_lemma[minindex + 2]:
+            if flags.is_pruned_gene[minindex + 2]:
+                features.append('WINDOW_RIGHT_M1_2_with[GENE]')
+            else:
+                features.append('WINDOW_RIGHT_M1_2_with[%s]' % words[minindex+2].lemma)
+
+        if flags.is_window_lemma[maxindex - 1]:
+            if flags.is_pruned_gene[maxindex - 1]:
+                features.append('WINDOW_LEFT_M2_1_with[GENE]')
+            else:
+                features.append('WINDOW_LEFT_M2_1_with[%s]' % words[maxindex-1].lemma)
+
+        if flags.is_pruned_gene[maxindex - 2]:
+            m2_left_phrase = "GENE"+"-"+words[maxindex-1].lemma
+        else:
+            m2_left_phrase = words[maxindex-2].lemma+"-"+words[maxindex-1].lemma
+
+        if not flags.is_bad_char[maxindex - 2] and not flags.is_bad_char[maxindex - 1] and "," not in m2_left_phrase:
+            features.append('WINDOW_LEFT_M2_PHRASE_with[%s]' % m2_left_phrase)
+        elif flags.is_window_lemma[maxindex - 2]:
+            if flags.is_pruned_gene[maxindex - 2]:
+                features.append('WINDOW_LEFT_M2_2_with[GENE]')
+            else:
+                features.append('WINDOW_LEFT_M2_2_with[%s]' % words[maxindex-2].lemma)
+
+
+@feature_family("domain")
+def domain_features(ctx, features):
+    is_domain_word = ctx.flags.is_domain_word
+    found_domain = 0
+    if ctx.minindex > 0:
+        if is_domain_word[ctx.minindex + 1]:
+            found_domain = 1
+            features.append('GENE_FOLLOWED_BY_DOMAIN_WORD')
+
+
+    if ctx.maxindex < len(ctx.words) - 1 and found_domain == 0:
+        if is_domain_word[ctx.maxindex + 1]:
+            features.append('GENE_FOLLOWED_BY_DOMAIN_WORD')
+
+
+@feature_family("plural")
+def plural_features(ctx, features):
+    words = ctx.words
+    is_plural_noun = ctx.flags.is_plural_noun
+    found_plural = 0
+    if ctx.minindex > 0:
+        if is_plural_noun[ctx.minindex + 1]:
+            found_plural = 1
+            features.append('GENE_M1_FOLLOWED_BY_PLURAL_NOUN_with[%s]' % words[ctx.minindex + 1].word)
+
+
+    if ctx.maxindex < len(words) - 1 and found_plural == 0:
+        if is_plural_noun[ctx.maxindex + 1]:
+            features.append('GENE_M2_FOLLOWED_BY_PLURAL_NOUN)_with[%s]' % words[ctx.maxindex + 1].word)
+
+
+@feature_family("gene_listing")
+def gene_listing_features(ctx, features):
+    ws = ctx.ws
+    is_gene_lemma = ctx.flags.is_gene_lemma
+    if len(ws) > 0:
+        count = 0
+        flag_not_list = 0
+        for w, idx in zip(ws, ctx.ws_idx):
 
-                if ws[-1] != '_':
+            #should be comma
+            if count % 4 == 0:
+                if w != '_':
                     flag_not_list = 1
+            elif count % 4 == 1:
+                if w != ",":
+                    flag_not_list = 1
+            elif count %4 == 2:
+                if w != "_":
+                    flag_not_list = 1
+            #should be a gene
+            else:
+                if not is_gene_lemma[idx]:
+                    flag_not_list = 1
+            count = count + 1
 
-                if flag_not_list == 0:
-                    features.append('GENE_LISTING')
+        if ws[-1] != '_':
+            flag_not_list = 1
 
-            if len(ws) > 0:
-                count = 0
-                flag_not_list = 0
-                for w in ws:
+        if flag_not_list == 0:
+            features.append('GENE_LISTING')
 
-                    #should be comma
-                    if count % 2 == 0:
-                        if w != ',':
-                            flag_not_list = 1
+    if len(ws) > 0:
+        count = 0
+        flag_not_list = 0
+        for w, idx in zip(ws, ctx.ws_idx):
 
-                    #should be a gene
-                    else:
-                        if w not in dict_gene_symbols_all:
-                            flag_not_list = 1
-                    count = count + 1
+            #should be comma
+            if count % 2 == 0:
+                if w != ',':
+                    flag_not_list = 1
 
-                if ws[-1] != ',':
+            #should be a gene
+            else:
+                if not is_gene_lemma[idx]:
                     flag_not_list = 1
+            count = count + 1
+
+        if ws[-1] != ',':
+            flag_not_list = 1
 
-                if flag_not_list == 0:
-                    features.append('GENE_LISTING')
+        if flag_not_list == 0:
+            features.append('GENE_LISTING')
 
-            #### GENERATE FEATURE ARRAY FOR POSTGRESQL #####
-            feature = "{" + ','.join(features) + '}'
 
-            mid1 = doc.docid + '_' + '%d' % sent.sentid + '_' + '%d' % w1.insent_id
-            mid2 = doc.docid + '_' + '%d' % sent.sentid + '_' + '%d' % w2.insent_id
+def sentence_length(sent):
+    """The number of tokens of a sentence, without building the Tokens of a .nlp one."""
+    if isinstance(sent, nlp_reader.Sentence):
+        return len(sent)
 
-            ############## DISTANT SUPERVISION ###################
+    return len(sent.words)
+
+
+def extract_candidates(doc):
+    """
+    Name: extract_candidates
+    Input: Document object
+    Return: generator of Candidates
+
+    Extractor code to generate candidates and their features; labels are
+    assigned separately by label()
+    """
+
+    def get_genes(sentence):
+        # could probably make this a set of unique word.words, but need to verify
+        if isinstance(sentence, nlp_reader.Sentence):
+            # from the FORM column: sentences without a pair of mentions
+            # never build their Tokens
+            found = [i for i, form in enumerate(sentence.forms)
+                     if form not in EXCLUDED_GENES and form in dict_gene_symbols_all]
+            if len(found) < 2:
+                return []
+            words = sentence.words
+            return [words[i] for i in found]
+
+        return [word for word in sentence.words
+                if word.word not in EXCLUDED_GENES and word.word in dict_gene_symbols_all]
+
+    def get_gene_pairs(genes):
+        normalize_symbol = pair_counts.normalize_symbol
+        for geneA, geneB in combinations(genes, 2):
+            if normalize_symbol(geneA.word) != normalize_symbol(geneB.word):
+                yield (geneA, geneB)
+
+    def get_pair_spans(flags, pairs):
+        """Words, verbs and clause breaks between the mentions of every pair."""
+        kept = mask_not(flags.has_comma)
+        marks = {
+            "words": kept,
+            "verbs": mask_and(flags.is_verb, mask_not(flags.is_brace_or_comma)),
+            "breaks": mask_and(flags.is_clause_break, kept),
+        }
+        lo = [min(w1.insent_id, w2.insent_id) for w1, w2 in pairs]
+        hi = [max(w1.insent_id, w2.insent_id) for w1, w2 in pairs]
+        return PairSpans(lo, hi, marks)
+
+    def get_candidates(doc):
+        """
+        Candidate generation, cheapest stage first: sentence length, gene
+        mentions, distinct symbols, no clause break between the mentions.
+        Only sentences with surviving candidates go on to feature extraction
+        and its dependency-path work. Rejections per stage are counted in
+        stats.
+
+        Yields (sentence, flags, spans, [(k, w1, w2), ...], key), where k is
+        the pair's index in spans and key the sentence's sentence_cache key
+        (None without a cache). For a sentence found in sentence_cache it
+        yields (sentence, None, None, cached sentence pairs, None) instead.
+        """
+        MAX_WORDS_IN_SENTENCE = 50
+        counts = stats.counters
+
+        for sent in doc.sents:
+            counts["sentences"] += 1
+            if sentence_length(sent) > MAX_WORDS_IN_SENTENCE:
+                counts["rejected_long_sentence"] += 1
+                continue
+
+            genes = get_genes(sent)
+            npairs = len(genes) * (len(genes) - 1) // 2
+            counts["pairs"] += npairs
+
+            pairs = list(get_gene_pairs(genes))
+            counts["rejected_same_symbol"] += npairs - len(pairs)
+            if not pairs:
+                continue
+
+            key = None
+            if sentence_cache is not None:
+                key = sentence_key(sent)
+                cached = sentence_cache.get(key)
+                if cached is not None:
+                    counts["sentence_cache_hits"] += 1
+                    counts["sentence_cache_candidates"] += len(cached)
+                    counts["rejected_clause_break"] += len(pairs) - len(cached)
+                    counts["candidates"] += len(cached)
+                    if cached:
+                        yield sent, None, None, cached, None
+                    continue
+                counts["sentence_cache_misses"] += 1
+
+            flags = TokenFlags(sent)
+            spans = get_pair_spans(flags, pairs)
+            breaks = spans.count("breaks")
+
+            ## Do not include as candidates ##
+            candidates = [(k, w1, w2) for k, (w1, w2) in enumerate(pairs) if not breaks[k]]
+            counts["rejected_clause_break"] += len(pairs) - len(candidates)
+            if not candidates:
+                if key is not None:
+                    sentence_cache.put(key, [])
+                continue
+
+            counts["candidates"] += len(candidates)
+            yield sent, flags, spans, candidates, key
+
+    def make_candidate(sent, pair):
+        """The Candidate of a sentence pair in this document."""
+        sent_prefix = doc.docid + '_' + '%d' % sent.sentid + '_'
+        mid1 = sent_prefix + '%d' % pair[0]
+        mid2 = sent_prefix + '%d' % pair[1]
+        return Candidate(doc.docid, mid1, mid2, *pair[2:])
+
+    def dep_path(a, b):
+        """deps.path() of the current sentence, timed."""
+        start = clock()
+        path = deps.path(a, b)
+        timers["dep_path"] += clock() - start
+        return path
+
+#-------------------------------------------------------------------------------
+
+    clock = run_stats.clock
+    counts = stats.counters
+    timers = stats.timers
+    lap = stats.lap
+    # stats names of the enabled families, which count the features they emit
+    families = [("features." + name, family) for name, family in enabled_feature_families()]
+    stats.count("documents")
+
+    for sent, flags, spans, candidates, key in stats.timed_iter("gene_detection", get_candidates(doc)):
+        if flags is None:
+            # seen before: only the mention ids differ
+            for pair in candidates:
+                yield make_candidate(sent, pair)
+            continue
+
+        sent_pairs = []
+        deps = DepIndex([word.dep_par for word in sent.words],
+                        [word.dep_label for word in sent.words],
+                        [word.lemma for word in sent.words])
+
+        for k, w1, w2 in candidates:
+            t = clock()
+            ctx = FeatureContext(sent, flags, spans, k, w1, w2, dep_path)
+            high_quality_verb, found_domain, flag_family = candidate_attributes(ctx)
+            t = lap("candidate_attributes", t)
+
+            ############## FEATURE EXTRACTION ####################################
+            features = []
+            for name, family in families:
+                emitted = len(features)
+                family(ctx, features)
+                t = lap(name, t)
+                counts[name] += len(features) - emitted
 
             sent_text = sent.__repr__()
             if sent_text.endswith("\\"):
                 sent_text = sent_text[0:len(sent_text) - 1]
 
+            abbreviations = sent.words[0].word == "Abbreviations" and sent.words[1].word == "used"
+
+            # the candidate minus its docid-dependent mention ids, see make_candidate()
+            pair = (w1.insent_id, w2.insent_id, w1.word, w2.word, features, sent_text,
+                    w1.ner, w2.ner, ctx.ws, high_quality_verb, found_domain, flag_family,
+                    abbreviations)
+            sent_pairs.append(pair)
+            yield make_candidate(sent, pair)
+
+        if key is not None:
+            sentence_cache.put(key, sent_pairs)
+
+
+#dictionaries label() reads, and how their entries relate to candidates
+#(for dict_delta.py): "pair" {symbol: {symbol}}, "symbol_key" {symbol: {...}},
+#"symbol_value" {...: {symbol}}, "symbols" and "docids" plain sets
+LABEL_DICTS = {
+    "dict_exclude_dist_sup": "pair",
+    "dict_interact": "pair",
+    "dict_no_interact": "pair",
+    "dict_gene_pmid": "symbol_key",
+    "dict_pmid_gene": "symbol_value",
+    "dict_abbv": "symbols",
+    "dict_english": "symbols",
+    "dict_domains": "symbols",
+    "dict_gs_docids": "docids",
+}
+#dictionaries candidate generation and features read; changes need re-extraction
+EXTRACT_DICTS = ["dict_gene_symbols_all", "dict_gene_pruned"]
+
+INTERACTION_WORDS = ["binds", "interacts", "interacted", "bound", "complex", "associates",
+                     "associated", "bind", "interact"]
+VARIANT_WORDS = ["mutation", "mutations", "variant", "variants", "polymorphism", "polymorphisms"]
+
+#share of the remaining candidates sampled as negative examples, and the
+#seed of the draws
+NEGATIVE_SAMPLING_RATE = .08
+sampling_seed = 0
+
+
+def negative_draw(c):
+    """
+    Uniform draw in [0, 1) for the negative sampling of a candidate, taken
+    from a hash of its mention ids (which start with the docid) rather than
+    from global random state, so that a candidate gets the same draw in
+    every run, worker process and shard.
+    """
+    key = "%d:%s:%s" % (sampling_seed, c.mid1, c.mid2)
+    if isinstance(key, unicode):
+        key = key.encode("utf-8")
 
-            if w1.word in dict_exclude_dist_sup and w2.word in dict_exclude_dist_sup[w1.word]:
-                print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
+    digest = hashlib.md5(key).digest()
+    return (struct.unpack("!Q", digest[:8])[0] >> 11) / float(1 << 53)
 
-            elif sent.words[0].word == "Abbreviations" and sent.words[1].word == "used":
-                if doc.docid.split(".pdf")[0] not in dict_gs_docids:
-                    print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "false", feature, sent_text, "\\N"])
-                    print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                else:
-                    print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
 
-            elif w1.word not in dict_abbv and w1.word not in dict_english and w2.word not in dict_english and w2.word not in dict_abbv and w1.word not in dict_domains and w2.word not in dict_domains:
-                if w1.word in dict_interact and w2.word in dict_interact[w1.word] and "mutation" not in sent_text and "mutations" not in sent_text and "variant" not in sent_text and "variants" not in sent_text and "polymorphism" not in sent_text and "polymorphisms" not in sent_text:
+def in_gold_standard(docid):
+    """Whether a document is in the gold standard, held out from training."""
+    return docid.split(".pdf")[0] in dict_gs_docids
 
-                    if found_domain == 0 and flag_family == 0:
-                        if doc.docid.split(".pdf")[0] not in dict_gs_docids:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "true", feature, sent_text, "\\N"])
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                        else:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
 
-                    else:
-                        print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                
-                else:
-                    # Negative Example: Mention appear in KB in same doc, but no interaction extracted in KB
-                    appear_in_same_doc = False
-                    if re.search('^[A-Z]', w1.word) and re.search('^[A-Z]', w2.word):
-                        if w1.word in dict_gene_pmid:
-                            for pmid in dict_gene_pmid[w1.word]:
-                                if w2.word in dict_pmid_gene[pmid]:
-                                    appear_in_same_doc = True
-
-                    #check if not interact/bind phrase is in ws and not just the words
-                    no_interact_phrase = False
-                    for j, var in enumerate(ws):
-                        if var == 'not' and j + 1 < len(ws) - 1:
-                            if ws[j+1] == "interacts" or ws[j+1] == "interact" or ws[j+1] == "bind":
-                                no_interact_phrase = True
-
-                    if w1.word in dict_no_interact and ("binds" not in ws and "interacts" not in ws and "interacted" not in ws and "bound" not in ws and "complex" not in ws and "associates" not in ws and "associated" not in ws and "bind" not in ws and "interact" not in ws):
-                        if w2.word in dict_no_interact[w1.word] and not high_quality_verb: 
-                            if doc.docid.split(".pdf")[0] not in dict_gs_docids:
-                                print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "false", feature, sent_text, "\\N"])
-                                print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                            else:
-                                print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                        else:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                    elif w2.word in dict_no_interact and ("binds" not in ws and "interacts" not in ws and "interacted" not in ws and "bound" not in ws and "complex" not in ws and "associates" not in ws and "associated" not in ws and "bind" not in ws and "interact" not in ws):
-                        if w1.word in dict_no_interact[w2.word] and not high_quality_verb:
-                            if doc.docid.split(".pdf")[0] not in dict_gs_docids:
-                                print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "false", feature, sent_text, "\\N"])
-                                print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                            else:
-                                print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                        else:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                    elif appear_in_same_doc == True and ("binds" not in ws and "interacts" not in ws and "interacted" not in ws and "bound" not in ws and "complex" not in ws and "associates" not in ws and "associated" not in ws and "bind" not in ws and "interact" not in ws ) and not high_quality_verb:
-                        if doc.docid.split(".pdf")[0] not in dict_gs_docids:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "false", feature, sent_text, "\\N"])
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                        else:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                    elif no_interact_phrase == True and not high_quality_verb: #("binds" in ws or "interacts" in ws or "bind" in ws or "interact" in ws) and "not" in ws:
-                        if doc.docid.split(".pdf")[0] not in dict_gs_docids:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "false", feature, sent_text, "\\N"])
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                        else:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                    elif w1.ner == "Person" or w2.ner == "Person":
-                        if doc.docid.split(".pdf")[0] not in dict_gs_docids:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "false", feature, sent_text, "\\N"])
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                        else:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                    elif random.random() < .08 and not high_quality_verb:
-                        if doc.docid.split(".pdf")[0] not in dict_gs_docids:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "false", feature, sent_text, "\\N"])
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                        else:
-                            print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-                    else:
-                        print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
-            else:
-                print '\t'.join([doc.docid, mid1, mid2, w1.word, w2.word, "\\N", feature, sent_text, "\\N"])
+def label(c):
+    """
+    Name: label
+    Input: Candidate
+    Return: labels to emit the candidate's row with
+
+    Distant supervision. True / False make a training example and None the
+    unlabeled row every candidate gets; documents in the gold standard are
+    held out from training. Depends only on the candidate and the knowledge
+    base dictionaries, so relabel.py can rerun it on stored candidates.
+    """
+    w1 = c.word1
+    w2 = c.word2
+    ws = c.ws
+    sent_text = c.sentence
+    #looked up once for all the compact dictionaries; -1 if in none of them
+    id1 = symbol_table.id_of(w1)
+    id2 = symbol_table.id_of(w2)
+
+    if not in_gold_standard(c.docid):
+        example = lambda value: [value, None]
+    else:
+        example = lambda value: [None]
+
+    if dict_exclude_dist_sup.contains_ids(id1, id2):
+        return [None]
+
+    if c.abbreviations:
+        return example(False)
+
+    if dict_abbv.contains_id(id1) or dict_english.contains_id(id1) or dict_english.contains_id(id2) or \
+       dict_abbv.contains_id(id2) or dict_domains.contains_id(id1) or dict_domains.contains_id(id2):
+        return [None]
+
+    if dict_interact.interacts_ids(id1, id2) and not any(word in sent_text for word in VARIANT_WORDS):
+        if c.found_domain == 0 and c.flag_family == 0:
+            return example(True)
+
+        return [None]
+
+    # Negative Example: Mention appear in KB in same doc, but no interaction extracted in KB
+    appear_in_same_doc = False
+    if re.search('^[A-Z]', w1) and re.search('^[A-Z]', w2):
+        for pmid in dict_gene_pmid.row_ids(id1):
+            if dict_pmid_gene.contains_ids(pmid, id2):
+                appear_in_same_doc = True
+                break
 
+    #check if not interact/bind phrase is in ws and not just the words
+    no_interact_phrase = False
+    for j, var in enumerate(ws):
+        if var == 'not' and j + 1 < len(ws) - 1:
+            if ws[j+1] == "interacts" or ws[j+1] == "interact" or ws[j+1] == "bind":
+                no_interact_phrase = True
+
+    no_interaction_word = not any(word in ws for word in INTERACTION_WORDS)
+    high_quality_verb = c.high_quality_verb
+
+    if dict_no_interact.has_id(id1) and no_interaction_word:
+        if dict_no_interact.contains_ids(id1, id2) and not high_quality_verb:
+            return example(False)
+        return [None]
+
+    if dict_no_interact.has_id(id2) and no_interaction_word:
+        if dict_no_interact.contains_ids(id2, id1) and not high_quality_verb:
+            return example(False)
+        return [None]
+
+    if appear_in_same_doc == True and no_interaction_word and not high_quality_verb:
+        return example(False)
+
+    if no_interact_phrase == True and not high_quality_verb:
+        return example(False)
+
+    if c.ner1 == "Person" or c.ner2 == "Person":
+        return example(False)
+
+    if not high_quality_verb and negative_draw(c) < NEGATIVE_SAMPLING_RATE:
+        return example(False)
+
+    return [None]
+
+
+def candidate_rows(c):
+    """
+    Rows for the genegene database table, one per label:
+    [docid, mid1, mid2, word1, word2, is_correct, features, sentence, id]
+    with is_correct True / False / None (unlabeled) and id None;
+    output_sink formats them.
+    """
+    return [[c.docid, c.mid1, c.mid2, c.word1, c.word2, is_correct, c.features, c.sentence, None]
+            for is_correct in label(c)]
+
+
+def extract(doc):
+    """Rows for the genegene table, see candidate_rows()."""
+    for c in extract_candidates(doc):
+        for row in candidate_rows(c):
+            yield row
+
+
+def collect(items):
+    """List what a generator produces, up to its first failure."""
+    collected = []
+    try:
+        for item in items:
+            collected.append(item)
+    except Exception as e:
+        # keep whatever was emitted before the failure, as the
+        # print-as-you-go loop used to
+        stats.count("exceptions." + type(e).__name__)
+        stats.count("failed_documents")
+
+    return collected
+
+
+class RowReader(object):
+    """
+    deserialize() for input rows that keeps the last row's document, so
+    that a row whose docid was just taken (for its shard) is parsed once.
+    """
+
+    def __init__(self):
+        self._row = None
+        self._doc = None
+
+    def __call__(self, row):
+        if row is not self._row:
+            with stats.timer("deserialize"):
+                self._doc = deserialize(row.rstrip('\n'))
+            self._row = row
+
+        return self._doc
+
+
+read_row = RowReader()
+
+
+def extract_row(row):
+    """Deserialize one input row and return its candidates."""
+    return collect(extract_candidates(read_row(row)))
 
-if __name__ == '__main__':
-    log("START!")
 
-    load_dict()
+def extract_nlp_file(path):
+    """Parse one .nlp file and return its candidates."""
+    with stats.timer("deserialize"):
+        doc = nlp_reader.read_document(path)
+    return collect(extract_candidates(doc))
 
-    for row in fileinput.input():
-        doc = deserialize(row.rstrip('\n'))
+
+def row_docid(row):
+    return read_row(row).docid
+
+
+def row_content(row):
+    return row.rstrip('\n')
+
+
+def file_content(path):
+    """
+    What the candidates of a .nlp file depend on: its docid, which comes
+    from the file name, and its bytes.
+    """
+    with open(path, "rb") as f:
+        return nlp_reader.docid_of(path) + "\0" + f.read()
+
+
+#modules besides this one whose source shapes the candidates of a document
+CODE_MODULES = ["helper.easierlife", "dep_index", "nlp_reader", "sentence_arrays", "symbols", "textnorm"]
+
+
+def extractor_version():
+    """Version of the extractor code, of the loaded dictionaries and of the disabled feature families."""
+    modules = [sys.modules[__name__]] + [sys.modules[name] for name in CODE_MODULES]
+    version = extract_cache.code_version(modules) + ":" + loaded_dict_version
+    disabled = disabled_feature_families()
+    if disabled:
+        version += ":without:" + ",".join(disabled)
+
+    return version
+
+
+class CachedLoader(object):
+    """
+    A loader that looks documents up in an ExtractCache first, by the
+    content(item) of the input, and stores the candidates of misses.
+    """
+
+    def __init__(self, cache, loader, content):
+        self.cache = cache
+        self.loader = loader
+        self.content = content
+
+    def __call__(self, item):
+        key = self.cache.key(self.content(item))
+        records = self.cache.get(key)
+        if records is not None:
+            stats.count("cache_hits")
+            return read_candidates(records)
+
+        stats.count("cache_misses")
+        failed = stats.counters["failed_documents"]
+        candidates = self.loader(item)
+        # a document that failed partway has partial candidates; leave it
+        # to be extracted (and counted as failed) again next run
+        if stats.counters["failed_documents"] == failed:
+            self.cache.put(key, [c.record() for c in candidates])
+        return candidates
+
+
+class ShardLoader(object):
+    """
+    A loader that skips the inputs of documents in other shards;
+    docid(item) is the docid of an input.
+    """
+
+    def __init__(self, loader, docid, index, shards):
+        self.loader = loader
+        self.docid = docid
+        self.index = index
+        self.shards = shards
+
+    def __call__(self, item):
+        if sharding.shard_of(self.docid(item), self.shards) != self.index:
+            stats.count("other_shard_documents")
+            return []
+
+        return self.loader(item)
+
+
+def read_candidates(records):
+    """Loader for batches of candidate store records."""
+    return [Candidate(*record) for record in records]
+
+
+ROW_LABELS = {True: "rows_true", False: "rows_false", None: "rows_unlabeled"}
+
+
+def label_rows(candidates):
+    counts = stats.counters
+    for c in candidates:
+        for row in candidate_rows(c):
+            counts[ROW_LABELS[row[5]]] += 1
+            yield row
+
+
+FEATURES_COLUMN = 6
+
+feature_hasher = feature_ids.FeatureHasher()
+pair_counter = pair_counts.PairCounts()
+
+
+class Batch(object):
+    """
+    What one batch of inputs produced: the encoded rows and their count,
+    new feature IDs, encoded candidate records, the worker's RunStats and
+    its gene pair counts.
+    """
+
+    def __init__(self, chunk, rows, features, candidates, candidate_keys, stats, pair_counts):
+        self.chunk = chunk
+        self.rows = rows
+        self.features = features
+        self.candidates = candidates
+        self.candidate_keys = candidate_keys
+        self.stats = stats
+        self.pair_counts = pair_counts
+
+
+def extract_batch(items, loader=extract_row, output_format="tsv", use_feature_ids=False,
+                  keep_candidates=False, count_pairs=False):
+    """Worker entry point: extract a batch of inputs into a Batch."""
+    fmt = output_sink.FORMATS[output_format](int_arrays=use_feature_ids)
+    chunk = []
+    records = []
+    keys = []
+    for item in items:
+        candidates = loader(item)
+        if keep_candidates:
+            records.extend(c.record() for c in candidates)
+            keys.extend((c.docid, (c.word1, c.word2)) for c in candidates)
+
+        rows = collect(stats.timed_iter("label", label_rows(candidates)))
+
+        start = run_stats.clock()
+        if count_pairs:
+            pair_counter.add_rows(rows)
+            start = stats.lap("pair_counts", start)
+
+        if use_feature_ids:
+            rows = feature_hasher.encode_rows(rows, FEATURES_COLUMN)
+
+        for row in rows:
+            chunk.append(fmt.encode(row))
+        stats.lap("output", start)
+
+    return Batch("".join(chunk), len(chunk), feature_hasher.drain(),
+                 candidate_store.encode(records), keys, stats.drain(), pair_counter.drain())
+
+
+class Outputs(object):
+    """
+    Where a run writes: the row sink, and optionally the feature ID table
+    (feature-ID mode), a candidate store (for relabel.py), a StatsReport and
+    a pair_counts.PairCountTable. stream is the sink's output when it has to
+    be closed, e.g. a compression.CompressedOutput.
+    """
+
+    def __init__(self, sink, feature_table=None, candidates=None, report=None, stream=None,
+                 pair_counts=None):
+        self.sink = sink
+        self.feature_table = feature_table
+        self.candidates = candidates
+        self.report = report
+        self.stream = stream
+        self.pair_counts = pair_counts
+
+    def options(self):
+        """extract_batch() arguments that produce what this run writes."""
+        return dict(output_format=self.sink.format.name,
+                    use_feature_ids=self.feature_table is not None,
+                    keep_candidates=self.candidates is not None,
+                    count_pairs=self.pair_counts is not None)
+
+    def write(self, batch):
+        totals.update(batch.stats)
+        with totals.timer("output"):
+            self.sink.write_chunk(batch.chunk, batch.rows)
+            if self.feature_table is not None:
+                self.feature_table.add(batch.features)
+            if self.candidates is not None:
+                self.candidates.write_records(batch.candidates, batch.candidate_keys)
+            if self.pair_counts is not None:
+                self.pair_counts.update(batch.pair_counts)
+
+        if self.report is not None:
+            self.report.tick()
+
+    def close(self):
+        with totals.timer("output"):
+            self.sink.close()
+            if self.stream is not None:
+                self.stream.close()
+            if self.feature_table is not None:
+                self.feature_table.close()
+            if self.candidates is not None:
+                self.candidates.close()
+            if self.pair_counts is not None:
+                self.pair_counts.close()
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def batched_records(records, size):
+    """
+    Candidate records in batches of about size, like batched(), but never
+    splitting the records of a document (which come together) across two.
+    """
+    batch = []
+    for record in records:
+        # records start with their docid
+        if len(batch) >= size and record[0] != batch[-1][0]:
+            yield batch
+            batch = []
+        batch.append(record)
+
+    if batch:
+        yield batch
+
+
+def run_serial(items, writer, options, loader=extract_row, queue_size=pipeline.DEFAULT_QUEUE_SIZE):
+    for item in pipeline.read_ahead(items, queue_size):
+        writer.put(extract_batch([item], loader, **options))
+
+
+def run_parallel(items, writer, options, processes, batch_size, loader=extract_row,
+                 queue_size=pipeline.DEFAULT_QUEUE_SIZE):
+    """
+    Extract with a pool of forked workers (processes=None: one per core).
+
+    Must be called after load_dict(): the workers inherit the dictionaries
+    from this process copy-on-write instead of loading their own. Batches
+    come back in input order, so the output is the same stream run_serial()
+    would write, and at most two batches per worker are in flight. With
+    extract_nlp_file as the loader, workers are sent file names and parse
+    the documents themselves; they also encode their rows and candidates,
+    leaving the writer to write the chunks out. Workers start their stats
+    from zero and send them back with each batch.
+    """
+    import functools
+    import multiprocessing
+
+    pool = multiprocessing.Pool(processes, stats.reset)
+    try:
+        work = functools.partial(extract_batch, loader=loader, **options)
+        batches = batched(pipeline.read_ahead(items, queue_size), batch_size)
+        in_flight = 2 * (processes or multiprocessing.cpu_count())
+        for batch in pipeline.ordered_map(pool, work, batches, in_flight):
+            writer.put(batch)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def add_output_args(parser):
+    parser.add_argument("-j", "--processes", type=int, default=1,
+        help="number of extraction processes (0 = one per core)")
+    parser.add_argument("--batch-size", type=int, default=50,
+        help="inputs sent to a worker at a time")
+    parser.add_argument("--queue-size", type=int, default=pipeline.DEFAULT_QUEUE_SIZE,
+        help="inputs read ahead, and batches waiting to be written, at most")
+    parser.add_argument("--snapshot", default=None,
+        help="dictionary snapshot to load (default: %s)" % DICT_SNAPSHOT)
+    parser.add_argument("--format", choices=sorted(output_sink.FORMATS), default="tsv",
+        help="output format: tsv text, or pgbinary for COPY ... (FORMAT binary)")
+    parser.add_argument("--feature-ids", metavar="TABLE", default=None,
+        help="emit feature IDs (bigint[]) instead of strings, and write the "
+             "ID<TAB>feature table to TABLE (extended if it exists)")
+    parser.add_argument("--pair-counts", metavar="TABLE", default=None,
+        help="also count candidates, documents and labels per gene pair, and "
+             "write them to TABLE at the end (see pair_counts.py)")
+    parser.add_argument("--buffer-size", type=int, default=output_sink.DEFAULT_BUFFER_SIZE,
+        help="bytes of output collected before each write")
+    parser.add_argument("--compress", choices=compression.CODECS, default=None,
+        help="compress the output rows")
+    parser.add_argument("--compress-level", type=int, default=None,
+        help="compression level (default: %s)" % ", ".join(
+            "%d for %s" % (level, codec) for codec, level in sorted(compression.DEFAULT_LEVELS.items())))
+    parser.add_argument("--compress-threads", type=int, default=0,
+        help="compression threads (0 = one per core)")
+    parser.add_argument("--stats", metavar="FILE", default=None,
+        help="write the run's counters and timers to FILE as JSON lines "
+             "(default: stderr)")
+    parser.add_argument("--stats-interval", type=float, default=60,
+        help="seconds between stats summaries during the run (0: only at the end)")
+    parser.add_argument("--resources", metavar="FILE", default=None,
+        help="sample CPU, memory, I/O and output size with the run's progress "
+             "into FILE as JSON lines")
+    parser.add_argument("--resource-interval", type=float, default=resource_sampler.DEFAULT_INTERVAL,
+        help="seconds between resource samples")
+    parser.add_argument("--seed", type=int, default=0,
+        help="seed of the negative sampling draws")
+
+
+def open_outputs(args, candidates_path=None):
+    stream = None
+    if args.compress:
+        stream = compression.CompressedOutput(sys.stdout, args.compress, args.compress_level,
+                                              args.compress_threads)
+    fmt = output_sink.FORMATS[args.format](int_arrays=bool(args.feature_ids))
+    sink = output_sink.BufferedSink(stream or sys.stdout, fmt, args.buffer_size)
+
+    feature_table = None
+    if args.feature_ids:
+        feature_table = feature_ids.FeatureTable(args.feature_ids)
+
+    candidates = None
+    if candidates_path:
+        candidates = candidate_store.CandidateWriter(candidates_path, Candidate.FIELDS)
+
+    stats_out = open(args.stats, "w") if args.stats else sys.stderr
+    report = run_stats.StatsReport(totals, stats_out, args.stats_interval)
+
+    counts = None
+    if args.pair_counts:
+        counts = pair_counts.PairCountTable(args.pair_counts)
+
+    return Outputs(sink, feature_table, candidates, report, stream, counts)
+
+
+def start_sampler(args, outputs):
+    def progress():
+        counts = totals.counters
+        return {"documents": counts["documents"], "cache_hits": counts["cache_hits"],
+                "rows": outputs.sink.rows, "output_bytes": outputs.sink.bytes}
+
+    sampler = resource_sampler.ResourceSampler(open(args.resources, "w"),
+                                               args.resource_interval, progress)
+    sampler.start()
+    return sampler
+
+
+def run(items, outputs, loader, args, cache=None):
+    """
+    Extract items into outputs: inputs are read ahead on a reader thread
+    and batches written on a writer thread, around serial or parallel
+    extraction (see pipeline.py).
+    """
+    global sampling_seed
+    sampling_seed = args.seed
+
+    # e.g. load_dict() time, gathered before the run
+    totals.update(stats.drain())
+
+    sampler = None
+    if args.resources:
+        sampler = start_sampler(args, outputs)
+
+    writer = pipeline.Writer(outputs.write, args.queue_size)
+    if args.processes == 1:
+        run_serial(items, writer, outputs.options(), loader, args.queue_size)
+    else:
+        run_parallel(items, writer, outputs.options(), args.processes or None, args.batch_size,
+                     loader, args.queue_size)
+    writer.close()
+    outputs.close()
+    totals.update(stats.drain())
+
+    if sampler is not None:
+        sampler.stop()
+
+    counts = totals.counters
+    if counts["sentences"]:
+        log("candidates: " + format_candidate_stats(counts))
+    if counts["sentence_cache_hits"] or counts["sentence_cache_misses"]:
+        log("sentence cache: hits=%d misses=%d candidates=%d"
+            % (counts["sentence_cache_hits"], counts["sentence_cache_misses"],
+               counts["sentence_cache_candidates"]))
+
+    if cache is not None:
+        freed = cache.evict()
+        totals.count("cache_evicted_bytes", freed)
+        log("cache: hits=%d misses=%d evicted_bytes=%d"
+            % (counts["cache_hits"], counts["cache_misses"], freed))
+
+    if outputs.report is not None:
+        outputs.report.close()
+
+
+def parse_args(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gene-gene relation extractor")
+    parser.add_argument("files", nargs="*",
+        help="serialized documents, one per line, optionally gzip or zstd "
+             "compressed (default: stdin)")
+    parser.add_argument("--nlp", action="store_true",
+        help="files are .nlp documents, directories or glob patterns")
+    parser.add_argument("--save-candidates", metavar="STORE", default=None,
+        help="also write the candidates and their features to STORE, for relabel.py")
+    parser.add_argument("--cache", metavar="DIR", default=None,
+        help="reuse the candidates of documents extracted before with the same "
+             "code and dictionaries, and cache new ones in DIR")
+    parser.add_argument("--cache-size", type=int, default=extract_cache.DEFAULT_MAX_BYTES >> 20,
+        help="size the cache is evicted down to after the run, in MB")
+    parser.add_argument("--sentence-cache", type=int, default=DEFAULT_SENTENCE_CACHE_SIZE,
+        help="sentences whose candidates are reused when the same sentence "
+             "comes again, per process (0: none)")
+    families = [name for name, family in FEATURE_FAMILIES]
+    parser.add_argument("--features", metavar="FAMILY,...", default=None,
+        help="only extract these feature families, of: %s" % ",".join(families))
+    parser.add_argument("--disable-features", metavar="FAMILY,...", default=None,
+        help="feature families not to extract")
+    parser.add_argument("--shard", metavar="I/N", default=None,
+        help="only extract the documents of shard I of N (see sharding.py)")
+    add_output_args(parser)
+
+    args = parser.parse_args(argv)
+    for option in ["features", "disable_features"]:
+        names = getattr(args, option)
+        if names is not None:
+            names = names.split(",")
+            unknown = [name for name in names if name not in families]
+            if unknown:
+                parser.error("unknown feature families: %s" % ",".join(unknown))
+            setattr(args, option, names)
+
+    if args.shard is not None:
         try:
-            extract(doc)
-        except:
-            wrong = True
+            args.shard = sharding.parse_shard(args.shard)
+        except sharding.ShardError as e:
+            parser.error(str(e))
+
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+
+    log("START!")
+
+    load_dict(args.snapshot)
+
+    if args.sentence_cache:
+        sentence_cache = lru.LRUCache(args.sentence_cache)
+
+    if args.features or args.disable_features:
+        enabled_families = set(args.features or [name for name, family in FEATURE_FAMILIES])
+        enabled_families -= set(args.disable_features or [])
+        log("feature families disabled: " + " ".join(disabled_feature_families()))
+
+    if args.nlp:
+        items = nlp_reader.find_files(args.files)
+        loader = extract_nlp_file
+        content = file_content
+        docid = nlp_reader.docid_of
+    else:
+        items = compression.input_lines(args.files)
+        loader = extract_row
+        content = row_content
+        docid = row_docid
+
+    cache = None
+    if args.cache:
+        cache = extract_cache.ExtractCache(args.cache, extractor_version(), args.cache_size << 20)
+        loader = CachedLoader(cache, loader, content)
+
+    if args.shard:
+        index, shards = args.shard
+        loader = ShardLoader(loader, docid, index, shards)
+
+    run(items, open_outputs(args, args.save_candidates), loader, args, cache)
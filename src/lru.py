@@ -0,0 +1,50 @@
+"""
+Bounded memo cache for the extractor's hot paths.
+
+A textbook LRU needs a linked list or an OrderedDict, whose bookkeeping
+costs more than the string work being cached. This keeps two plain dicts
+instead: lookups that hit the older generation are promoted into the
+current one, and when the current generation fills up it becomes the old
+one and the previous old one is dropped. Entries used at least once per
+generation survive, the cache never holds more than `capacity` entries,
+and every operation is a dict operation.
+"""
+
+
+class LRUCache(object):
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._generation = max(1, capacity // 2)
+        self._new = {}
+        self._old = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._new) + len(self._old)
+
+    def get(self, key, default=None):
+        if key in self._new:
+            self.hits += 1
+            return self._new[key]
+
+        if key in self._old:
+            self.hits += 1
+            value = self._old[key]
+            self.put(key, value)
+            return value
+
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        if len(self._new) >= self._generation:
+            self._old = self._new
+            self._new = {}
+
+        self._new[key] = value
+
+    def clear(self):
+        self._new = {}
+        self._old = {}
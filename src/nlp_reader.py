@@ -0,0 +1,158 @@
+"""
+Streaming reader for per-document CoNLL-style .nlp files.
+
+Each line of a .nlp file is one token, with the tab-separated columns
+
+    ID  FORM  POSTAG  NERTAG  LEMMA  DEPREL  HEAD  SENTID  PROV
+
+and a blank line after every sentence (see
+notebooks/conll_format/journal.pbio.0000001.pdf.nlp). IDs and HEADs are
+1-based, and HEAD 0 marks a root. The file name minus ".nlp" is the docid.
+NER tags are CoreNLP's (PERSON, ...); those the extractor tests for are
+renamed to the spelling of the serialized rows (NER_TAGS).
+
+Documents are parsed straight into Sentence objects that keep one list per
+column, so the corpus no longer has to be converted into the serialized
+rows helper.easierlife.deserialize reads. Token objects with the attributes
+extract() expects (.word, .lemma, .pos, .ner, .dep_label, .dep_par,
+.insent_id) are only built when a sentence's .words is first used.
+"""
+import glob
+import os
+
+NLP_SUFFIX = ".nlp"
+
+ID, FORM, POSTAG, NERTAG, LEMMA, DEPREL, HEAD, SENTID, PROV = range(9)
+
+#CoreNLP NER tags -> the tags of the serialized rows, as label() compares them
+NER_TAGS = {"PERSON": "Person"}
+
+
+class Token(object):
+    __slots__ = ("insent_id", "word", "pos", "ner", "lemma", "dep_label", "dep_par")
+
+    def __init__(self, insent_id, word, pos, ner, lemma, dep_label, dep_par):
+        self.insent_id = insent_id
+        self.word = word
+        self.pos = pos
+        self.ner = ner
+        self.lemma = lemma
+        self.dep_label = dep_label
+        self.dep_par = dep_par
+
+
+class Sentence(object):
+    """One sentence stored column-wise; dep_pars are 0-based, -1 for roots."""
+
+    def __init__(self, sentid, forms, poses, ners, lemmas, dep_labels, dep_pars):
+        self.sentid = sentid
+        self.forms = forms
+        self.poses = poses
+        self.ners = ners
+        self.lemmas = lemmas
+        self.dep_labels = dep_labels
+        self.dep_pars = dep_pars
+        self._words = None
+
+    def __len__(self):
+        return len(self.forms)
+
+    @property
+    def words(self):
+        if self._words is None:
+            self._words = [Token(i, self.forms[i], self.poses[i], self.ners[i],
+                                 self.lemmas[i], self.dep_labels[i], self.dep_pars[i])
+                           for i in xrange(len(self.forms))]
+
+        return self._words
+
+    def __repr__(self):
+        return " ".join(self.forms)
+
+
+class Document(object):
+
+    def __init__(self, docid, sents):
+        self.docid = docid
+        self.sents = sents
+
+
+def parse_sentid(value):
+    """'SENT_12' -> 12"""
+    return int(value.rsplit("_", 1)[-1])
+
+
+def iter_sentences(lines):
+    """Parse .nlp lines into Sentences, one at a time."""
+    columns = None
+    sentid = None
+    sentid_field = None
+
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line:
+            if columns is not None:
+                yield Sentence(sentid, *columns)
+                columns = None
+            continue
+
+        fields = line.split("\t")
+        if columns is not None and fields[SENTID] != sentid_field:
+            # sentence boundary without a blank line
+            yield Sentence(sentid, *columns)
+            columns = None
+
+        if columns is None:
+            columns = ([], [], [], [], [], [])
+            sentid_field = fields[SENTID]
+            sentid = parse_sentid(sentid_field)
+
+        columns[0].append(fields[FORM])
+        columns[1].append(fields[POSTAG])
+        columns[2].append(NER_TAGS.get(fields[NERTAG], fields[NERTAG]))
+        columns[3].append(fields[LEMMA])
+        columns[4].append(fields[DEPREL])
+        columns[5].append(int(fields[HEAD]) - 1)
+
+    if columns is not None:
+        yield Sentence(sentid, *columns)
+
+
+def docid_of(path):
+    name = os.path.basename(path)
+    if name.endswith(NLP_SUFFIX):
+        name = name[:-len(NLP_SUFFIX)]
+
+    return name
+
+
+def read_document(path):
+    """Parse one .nlp file into a Document."""
+    with open(path) as f:
+        return Document(docid_of(path), list(iter_sentences(f)))
+
+
+def find_files(inputs):
+    """
+    Expand directories (searched recursively for *.nlp), glob patterns and
+    plain file names into a stream of .nlp paths, in a stable order.
+    """
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(NLP_SUFFIX):
+                        yield os.path.join(root, name)
+
+        elif os.path.exists(item):
+            yield item
+
+        else:
+            for path in sorted(glob.glob(item)):
+                yield path
+
+
+def iter_documents(inputs):
+    for path in find_files(inputs):
+        yield read_document(path)
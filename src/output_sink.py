@@ -0,0 +1,167 @@
+"""
+Output formats and a buffered writer for extractor rows.
+
+Rows are lists of Python values: str (or unicode) for text columns, True /
+False for booleans, int for bigints, a list of str for text[] columns, a
+list of ints for bigint[] columns and None for NULL. A format turns rows
+into bytes:
+
+    tsv       the text format the extractor has always printed: \\N for NULL,
+              true / false, and {a,b} array literals (values are not escaped)
+    pgbinary  PostgreSQL's binary COPY format, loaded with
+              COPY <table> FROM STDIN (FORMAT binary); arrays go in as
+              native text[] values (bigint[] with int_arrays, which must
+              match the column even for empty arrays) and NULLs as NULLs,
+              with no escaping
+
+Formats encode rows independently of each other, so worker processes can
+encode their own chunks and the parent only concatenates them between the
+format's header and trailer.
+"""
+import struct
+
+PGCOPY_SIGNATURE = "PGCOPY\n\xff\r\n\x00"
+TEXT_OID = 25
+INT8_OID = 20
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+class TSVFormat(object):
+    name = "tsv"
+    header = ""
+    trailer = ""
+
+    def __init__(self, int_arrays=False):
+        # array literals read the same for text[] and bigint[] columns;
+        # rows are emitted in labeled / unlabeled pairs that share one
+        # feature list, so remember the last literal built
+        self._last_list = None
+        self._last_literal = None
+
+    def value(self, v):
+        if v is None:
+            return "\\N"
+        if v is True:
+            return "true"
+        if v is False:
+            return "false"
+        if isinstance(v, list):
+            if v is not self._last_list:
+                self._last_list = v
+                self._last_literal = "{" + ",".join([str(x) for x in v]) + "}"
+            return self._last_literal
+        if isinstance(v, unicode):
+            return v.encode("utf-8")
+
+        return str(v)
+
+    def encode(self, row):
+        return "\t".join([self.value(v) for v in row]) + "\n"
+
+
+class PgBinaryFormat(object):
+    name = "pgbinary"
+    # signature, flags, header extension length
+    header = PGCOPY_SIGNATURE + struct.pack("!ii", 0, 0)
+    trailer = struct.pack("!h", -1)
+
+    def __init__(self, int_arrays=False):
+        if int_arrays:
+            self._element_oid, self._element = INT8_OID, self.bigint
+        else:
+            self._element_oid, self._element = TEXT_OID, self.text
+        self._last_list = None
+        self._last_array = None
+
+    def text(self, s):
+        if isinstance(s, unicode):
+            s = s.encode("utf-8")
+
+        return struct.pack("!i", len(s)) + s
+
+    def bigint(self, v):
+        return struct.pack("!iq", 8, v)
+
+    def array(self, values):
+        oid = self._element_oid
+        element = self._element
+
+        if not values:
+            # zero dimensions, no NULLs, element type
+            body = struct.pack("!iii", 0, 0, oid)
+        else:
+            # one dimension of len(values) elements, lower bound 1
+            body = struct.pack("!iiiii", 1, 0, oid, len(values), 1)
+            body += "".join([element(v) for v in values])
+
+        return struct.pack("!i", len(body)) + body
+
+    def value(self, v):
+        if v is None:
+            return struct.pack("!i", -1)
+        if v is True or v is False:
+            return struct.pack("!i?", 1, v)
+        if isinstance(v, list):
+            if v is not self._last_list:
+                self._last_list = v
+                self._last_array = self.array(v)
+            return self._last_array
+        if isinstance(v, (int, long)):
+            return self.bigint(v)
+
+        return self.text(v)
+
+    def encode(self, row):
+        return struct.pack("!h", len(row)) + "".join([self.value(v) for v in row])
+
+
+FORMATS = {
+    TSVFormat.name: TSVFormat,
+    PgBinaryFormat.name: PgBinaryFormat,
+}
+
+
+class BufferedSink(object):
+    """
+    Writes a format's header, encoded rows or pre-encoded chunks, and the
+    trailer to out, collecting writes into blocks of about buffer_size bytes.
+    """
+
+    def __init__(self, out, fmt, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.out = out
+        self.format = fmt
+        self.buffer_size = buffer_size
+        self.rows = 0
+        self.bytes = 0
+        self._pending = []
+        self._pending_size = 0
+        self.write_chunk(fmt.header)
+
+    def write_chunk(self, data, rows=0):
+        self.rows += rows
+        self._pending.append(data)
+        self._pending_size += len(data)
+        if self._pending_size >= self.buffer_size:
+            self.flush()
+
+    def write_row(self, row):
+        self.write_chunk(self.format.encode(row), 1)
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    def flush(self):
+        if self._pending:
+            data = "".join(self._pending)
+            self.out.write(data)
+            self.bytes += len(data)
+            self._pending = []
+            self._pending_size = 0
+
+        self.out.flush()
+
+    def close(self):
+        self.write_chunk(self.format.trailer)
+        self.flush()
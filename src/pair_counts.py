@@ -0,0 +1,135 @@
+#!/usr/bin/python
+
+"""
+Corpus-level co-occurrence counts per gene pair, kept during extraction.
+
+Replaces grouping the genegene table by gene pair in the database: for
+each unordered pair of normalized gene symbols (normalize_symbol()) it
+counts
+
+    candidates   candidates (unlabeled rows) of the pair
+    documents    documents containing a candidate of the pair
+    true, false  training rows labeled true / false
+
+and writes them as a TSV table, one "gene1<TAB>gene2<TAB>candidates
+<TAB>documents<TAB>true<TAB>false" line per pair with gene1 < gene2,
+sorted. All counts are sums, so the tables of worker processes or of
+shards (which extract disjoint documents) merge by adding them up.
+
+Run as a script, merges the tables of shards into one.
+
+Usage:
+    python pair_counts.py TABLE [TABLE ...] > merged
+"""
+import sys
+
+CANDIDATES, DOCUMENTS, TRUE, FALSE = range(4)
+
+
+def normalize_symbol(word):
+    """
+    A gene symbol without its underscores; gene_relations does not pair
+    mentions whose symbols are equal in this form, as one gene.
+    """
+    return word.replace("_", "")
+
+
+def pair_key(word1, word2):
+    """The unordered pair of two normalized symbols, as sorted UTF-8 strings."""
+    if isinstance(word1, unicode):
+        word1 = word1.encode("utf-8")
+    if isinstance(word2, unicode):
+        word2 = word2.encode("utf-8")
+    word1 = normalize_symbol(word1)
+    word2 = normalize_symbol(word2)
+
+    return (word1, word2) if word1 <= word2 else (word2, word1)
+
+
+class PairCounts(object):
+    """Counts per pair_key(): [candidates, documents, true, false]."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _entry(self, key):
+        entry = self.counts.get(key)
+        if entry is None:
+            entry = self.counts[key] = [0, 0, 0, 0]
+        return entry
+
+    def add_rows(self, rows):
+        """
+        Count genegene rows (see candidate_rows()). A document's rows must
+        all come in one call for its pairs to be counted once.
+        """
+        seen = set()
+        for row in rows:
+            key = pair_key(row[3], row[4])
+            entry = self._entry(key)
+            if row[5] is None:
+                entry[CANDIDATES] += 1
+            elif row[5]:
+                entry[TRUE] += 1
+            else:
+                entry[FALSE] += 1
+
+            if (row[0], key) not in seen:
+                seen.add((row[0], key))
+                entry[DOCUMENTS] += 1
+
+    def update(self, counts):
+        """Add a {pair: counts} dict, as drain() returns."""
+        for key, values in counts.iteritems():
+            entry = self._entry(key)
+            for i, value in enumerate(values):
+                entry[i] += value
+
+    def drain(self):
+        """The counts so far, as a dict, starting again from zero."""
+        counts = self.counts
+        self.counts = {}
+        return counts
+
+    def read(self, lines):
+        """Add the counts of a table."""
+        for line in lines:
+            fields = line.rstrip("\n").split("\t")
+            entry = self._entry((fields[0], fields[1]))
+            for i, value in enumerate(fields[2:]):
+                entry[i] += int(value)
+
+    def write(self, out):
+        for key in sorted(self.counts):
+            out.write("\t".join(list(key) + ["%d" % value for value in self.counts[key]]) + "\n")
+
+
+class PairCountTable(PairCounts):
+    """The counts of a run, written to path on close()."""
+
+    def __init__(self, path):
+        PairCounts.__init__(self)
+        self.path = path
+
+    def close(self):
+        with open(self.path, "w") as f:
+            self.write(f)
+
+
+def main():
+    import compression
+
+    if len(sys.argv) < 2:
+        sys.exit(__doc__.split("Usage:")[1].strip())
+
+    counts = PairCounts()
+    for path in sys.argv[1:]:
+        counts.read(compression.open_input(path))
+    counts.write(sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Pipeline stages for the extractor driver.
+
+A run is three stages joined by bounded queues: a reader thread that pulls
+inputs ahead of extraction (overlapping reads from slow storage with
+compute), the extraction stage (this process, or a pool of worker
+processes with a bounded number of batches in flight), and a writer
+thread that hands finished batches to the outputs. A full queue blocks
+the stage feeding it, so a slow writer or a slow extraction stage holds
+the reader back instead of letting inputs or results pile up in memory.
+
+Exceptions raised in the reader or writer threads are re-raised in the
+thread driving the pipeline.
+"""
+from collections import deque
+import Queue
+import sys
+import threading
+
+DEFAULT_QUEUE_SIZE = 64
+
+_DONE = object()
+
+
+class _Failure(object):
+
+    def __init__(self, exc_info):
+        self.exc_info = exc_info
+
+    def reraise(self):
+        raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+
+
+def _start(target, *args):
+    thread = threading.Thread(target=target, args=args)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def read_ahead(items, size=DEFAULT_QUEUE_SIZE):
+    """Iterate over items, read by a background thread up to size ahead."""
+    queue = Queue.Queue(size)
+
+    def read():
+        try:
+            for item in items:
+                queue.put(item)
+        except Exception:
+            queue.put(_Failure(sys.exc_info()))
+        queue.put(_DONE)
+
+    _start(read)
+    while True:
+        item = queue.get()
+        if item is _DONE:
+            return
+        if isinstance(item, _Failure):
+            item.reraise()
+        yield item
+
+
+class Writer(object):
+    """Calls write(item) on a background thread for every item put()."""
+
+    def __init__(self, write, size=DEFAULT_QUEUE_SIZE):
+        self.write = write
+        self._queue = Queue.Queue(size)
+        self._failure = None
+        self._thread = _start(self._run)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if self._failure is not None:
+                # drain, so that put() never blocks on a dead writer
+                continue
+            try:
+                self.write(item)
+            except Exception:
+                self._failure = _Failure(sys.exc_info())
+
+    def _check(self):
+        if self._failure is not None:
+            self._failure.reraise()
+
+    def put(self, item):
+        self._check()
+        self._queue.put(item)
+
+    def close(self):
+        """Wait until everything put() is written."""
+        self._queue.put(_DONE)
+        self._thread.join()
+        self._check()
+
+
+def ordered_map(pool, func, items, in_flight):
+    """
+    pool.imap(func, items), but with at most in_flight tasks submitted
+    ahead of the result being consumed.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(pool.apply_async(func, (item,)))
+        if len(pending) >= in_flight:
+            yield pending.popleft().get()
+
+    while pending:
+        yield pending.popleft().get()
@@ -0,0 +1,45 @@
+#!/usr/bin/python
+
+"""
+Relabel stored candidates with the current dictionaries.
+
+Reads candidate stores written by gene_relations.py --save-candidates and
+writes the genegene rows again, running only label() against the
+dictionaries loaded now. Feature extraction is not repeated, so a change
+to a knowledge base or a labeling rule costs one pass over the stores.
+
+Usage:
+    python relabel.py [options] STORE [STORE ...] > rows
+"""
+import argparse
+import sys
+
+import candidate_store
+import gene_relations
+from gene_relations import Candidate, log
+
+
+def iter_records(paths):
+    for path in paths:
+        for record in candidate_store.read_records(path, Candidate.FIELDS):
+            yield record
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("stores", nargs="+",
+        help="candidate stores written by gene_relations.py --save-candidates")
+    gene_relations.add_output_args(parser)
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+
+    log("RELABEL START!")
+
+    gene_relations.load_dict(args.snapshot)
+
+    items = gene_relations.batched_records(iter_records(args.stores), args.batch_size)
+    gene_relations.run(items, gene_relations.open_outputs(args), gene_relations.read_candidates, args)
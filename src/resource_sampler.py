@@ -0,0 +1,177 @@
+"""
+Background sampling of the extractor's own resource use.
+
+A ResourceSampler thread writes one JSON object per interval with the CPU
+seconds, resident memory and I/O bytes of this process and its worker
+processes, together with the run's progress (documents, rows and output
+bytes so far), so that resource curves line up with corpus position
+instead of being pieced together from top / free / df logs.
+
+On Linux the figures come from /proc: cpu_seconds counts this process,
+its live workers and the workers it has reaped; rss_kb and the I/O bytes
+add up this process and its live workers. The gzip / pigz / zstd
+processes that compress outputs and decompress inputs (see
+compression.py) are not workers, and their figures are reported apart as
+compressor_processes, compressor_cpu_seconds, compressor_rss_kb and
+compressor_<I/O field>; a compressor that has exited keeps the CPU time
+of the last sample it was seen in. Elsewhere cpu_seconds and max_rss_kb
+come from getrusage(), compressors included, and I/O is not reported.
+"""
+import json
+import os
+import resource
+import threading
+import time
+
+import compression
+
+PROC = "/proc"
+
+#command names of the child processes that are not workers
+COMPRESSOR_NAMES = frozenset(name for names in compression.COMMANDS.values() for name in names)
+
+DEFAULT_INTERVAL = 1.0
+
+
+def read_proc_stat(pid):
+    """(ppid, utime, stime, cutime, cstime, rss pages) of a process, or None."""
+    try:
+        with open(os.path.join(PROC, str(pid), "stat")) as f:
+            data = f.read()
+    except IOError:
+        return None
+
+    # the command name in parentheses may contain spaces
+    fields = data.rsplit(")", 1)[1].split()
+    return (int(fields[1]), int(fields[11]), int(fields[12]), int(fields[13]),
+            int(fields[14]), int(fields[21]))
+
+
+def read_proc_name(pid):
+    """The command name of a process, or None."""
+    try:
+        with open(os.path.join(PROC, str(pid), "comm")) as f:
+            return f.read().rstrip("\n")
+    except IOError:
+        return None
+
+
+def read_proc_io(pid):
+    """{read_bytes, write_bytes, rchar, wchar} of a process; empty if unreadable."""
+    io = {}
+    try:
+        with open(os.path.join(PROC, str(pid), "io")) as f:
+            for line in f:
+                name, value = line.split(":")
+                io[name] = int(value)
+    except IOError:
+        pass
+
+    return io
+
+
+def child_pids(pid):
+    children = []
+    for name in os.listdir(PROC):
+        if name.isdigit():
+            stat = read_proc_stat(name)
+            if stat is not None and stat[0] == pid:
+                children.append(int(name))
+
+    return children
+
+
+class ResourceSampler(threading.Thread):
+    """
+    Writes samples to out every interval seconds from start() until stop(),
+    which writes a last one. progress() returns the progress fields of a
+    sample.
+    """
+
+    IO_FIELDS = ["read_bytes", "write_bytes", "rchar", "wchar"]
+
+    def __init__(self, out, interval=DEFAULT_INTERVAL, progress=dict):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.out = out
+        self.interval = interval
+        self.progress = progress
+        self.pid = os.getpid()
+        self.use_proc = os.path.exists(os.path.join(PROC, str(self.pid), "stat"))
+        self.clock_ticks = float(os.sysconf("SC_CLK_TCK")) if self.use_proc else None
+        self.page_kb = resource.getpagesize() // 1024
+        self.started = time.time()
+        self._stopped = threading.Event()
+        # ticks of the live compressors at the last sample, and the last
+        # ticks seen of the ones that have exited
+        self._compressor_ticks = {}
+        self._reaped_compressor_ticks = 0
+
+    def _add_usage(self, sample, prefix, pid, ticks, rss):
+        sample[prefix + "processes"] += 1
+        sample[prefix + "cpu_seconds"] += ticks / self.clock_ticks
+        sample[prefix + "rss_kb"] += rss * self.page_kb
+        io = read_proc_io(pid)
+        for name in self.IO_FIELDS:
+            sample[prefix + name] += io.get(name, 0)
+
+    def proc_usage(self):
+        sample = {}
+        for prefix in ["", "compressor_"]:
+            sample.update((prefix + name, 0) for name in ["processes", "rss_kb"] + self.IO_FIELDS)
+            sample[prefix + "cpu_seconds"] = 0.0
+
+        compressors = {}
+        for pid in [self.pid] + child_pids(self.pid):
+            stat = read_proc_stat(pid)
+            if stat is None:
+                # the worker exited since it was listed
+                continue
+
+            ppid, utime, stime, cutime, cstime, rss = stat
+            if pid != self.pid and read_proc_name(pid) in COMPRESSOR_NAMES:
+                compressors[pid] = utime + stime
+                self._add_usage(sample, "compressor_", pid, utime + stime, rss)
+            else:
+                ticks = utime + stime + (cutime + cstime if pid == self.pid else 0)
+                self._add_usage(sample, "", pid, ticks, rss)
+
+        # compressors this process has reaped are in its cutime / cstime
+        # along with the workers: move the ticks they were last seen with
+        for pid, ticks in self._compressor_ticks.iteritems():
+            if pid not in compressors:
+                self._reaped_compressor_ticks += ticks
+        self._compressor_ticks = compressors
+
+        reaped = self._reaped_compressor_ticks / self.clock_ticks
+        sample["cpu_seconds"] = round(sample["cpu_seconds"] - reaped, 3)
+        sample["compressor_cpu_seconds"] = round(sample["compressor_cpu_seconds"] + reaped, 3)
+        return sample
+
+    def rusage(self):
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+        return {"cpu_seconds": round(cpu, 3),
+                "max_rss_kb": max(own.ru_maxrss, children.ru_maxrss)}
+
+    def sample(self):
+        now = time.time()
+        sample = self.proc_usage() if self.use_proc else self.rusage()
+        sample["time"] = round(now, 3)
+        sample["elapsed"] = round(now - self.started, 3)
+        sample.update(self.progress())
+        return sample
+
+    def write(self):
+        self.out.write(json.dumps(self.sample(), sort_keys=True) + "\n")
+        self.out.flush()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        self.write()
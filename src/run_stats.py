@@ -0,0 +1,115 @@
+"""
+Cumulative counters and wall-clock timers for an extraction run.
+
+Counters count documents, sentences, candidate stages, rows per label and
+the exceptions collect() swallows, by type and in all (failed_documents).
+Timers add up the seconds spent in each stage; they nest (dep_path runs
+inside the feature families, which run inside extraction), so they do not
+sum to the run time, and with worker processes they are summed over the
+workers.
+
+Workers send what they gathered with every batch (drain()) and the parent
+merges it (update()). StatsReport writes the parent's totals as one JSON
+object per line, every interval seconds and once more at the end.
+"""
+from collections import Counter
+from contextlib import contextmanager
+import functools
+import json
+import time
+
+clock = time.time
+
+
+class RunStats(object):
+
+    def __init__(self):
+        self.counters = Counter()
+        self.timers = Counter()
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def lap(self, name, start):
+        """Add the time since start to a timer and return the current time."""
+        now = clock()
+        self.timers[name] += now - start
+        return now
+
+    @contextmanager
+    def timer(self, name):
+        start = clock()
+        try:
+            yield
+        finally:
+            self.lap(name, start)
+
+    def timed(self, name):
+        """Decorator timing every call of a function."""
+        def decorate(f):
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return f(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def timed_iter(self, name, items):
+        """Iterate over items, timing the work of producing each one."""
+        items = iter(items)
+        while True:
+            start = clock()
+            try:
+                item = next(items)
+            finally:
+                self.lap(name, start)
+            yield item
+
+    def update(self, other):
+        self.counters.update(other.counters)
+        self.timers.update(other.timers)
+
+    def reset(self):
+        self.counters = Counter()
+        self.timers = Counter()
+
+    def drain(self):
+        """A copy of the stats gathered so far; starts over from zero."""
+        drained = RunStats()
+        drained.counters, drained.timers = self.counters, self.timers
+        self.reset()
+        return drained
+
+    def summary(self):
+        return {
+            "counters": dict(self.counters),
+            "timers": dict((name, round(seconds, 6)) for name, seconds in self.timers.iteritems()),
+        }
+
+
+class StatsReport(object):
+    """
+    Writes the summary of stats to out as JSON lines: on tick() once
+    interval seconds have passed (never if interval is 0), and on close().
+    """
+
+    def __init__(self, stats, out, interval):
+        self.stats = stats
+        self.out = out
+        self.interval = interval
+        self.started = self._written = clock()
+
+    def write(self, final=False):
+        summary = self.stats.summary()
+        summary["elapsed"] = round(clock() - self.started, 3)
+        summary["final"] = final
+        self.out.write(json.dumps(summary, sort_keys=True) + "\n")
+        self.out.flush()
+        self._written = clock()
+
+    def tick(self):
+        if self.interval and clock() - self._written >= self.interval:
+            self.write()
+
+    def close(self):
+        self.write(final=True)
@@ -0,0 +1,74 @@
+"""
+Batched between-mention features.
+
+extract() used to rescan sent.words[minindex+1:maxindex] in Python for every
+gene pair to build the word sequence between the mentions and find the verbs
+in it. Here the tokens of interest in a sentence (kept words, verbs, clause
+breaks) are reduced once to sorted position arrays, and the span of every
+pair in the sentence is located in those arrays with one sorted search per
+mark. A pair's counts are then an index difference, and its positions a
+slice.
+
+Sentences with many pairs are searched with numpy.searchsorted when NumPy is
+installed; below NUMPY_MIN_PAIRS the cost of building arrays outweighs the
+batching and bisect is used instead, with identical results.
+"""
+import bisect
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NUMPY_MIN_PAIRS = 32
+
+
+def mask_and(a, b):
+    return [x and y for x, y in zip(a, b)]
+
+
+def mask_not(a):
+    return [not x for x in a]
+
+
+def positions(mask):
+    """Sorted indices of the set entries of a mask."""
+    return [i for i, x in enumerate(mask) if x]
+
+
+class PairSpans(object):
+    """
+    For gene pairs (lo[k], hi[k]) with lo < hi, the marked tokens strictly
+    between the two mentions.
+
+    marks maps a name to a token mask; count(name) gives the number of
+    marked tokens inside every pair's span, and positions(name, k) the
+    marked token indices inside pair k's span, in sentence order.
+    """
+
+    def __init__(self, lo, hi, marks):
+        first = [l + 1 for l in lo]
+        batched = numpy is not None and len(lo) >= NUMPY_MIN_PAIRS
+        if batched:
+            first = numpy.array(first)
+            hi = numpy.array(hi)
+
+        self._positions = {}
+        self._start = {}
+        self._end = {}
+        for name, mask in marks.items():
+            pos = positions(mask)
+            self._positions[name] = pos
+            if batched:
+                pos = numpy.array(pos, dtype=numpy.intp)
+                self._start[name] = numpy.searchsorted(pos, first).tolist()
+                self._end[name] = numpy.searchsorted(pos, hi).tolist()
+            else:
+                self._start[name] = [bisect.bisect_left(pos, k) for k in first]
+                self._end[name] = [bisect.bisect_left(pos, k) for k in hi]
+
+    def count(self, name):
+        return [e - s for s, e in zip(self._start[name], self._end[name])]
+
+    def positions(self, name, k):
+        return self._positions[name][self._start[name][k]:self._end[name][k]]
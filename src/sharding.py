@@ -0,0 +1,115 @@
+#!/usr/bin/python
+
+"""
+Deterministic split of a corpus across nodes, and the merge of their outputs.
+
+A document belongs to shard md5(docid) mod N, so every node running
+gene_relations.py --shard I/N over the same inputs extracts a disjoint
+part of the corpus, whatever order or grouping the inputs come in.
+Negative sampling draws are seeded from each candidate (see
+gene_relations.negative_draw), so the rows of a document do not depend on
+the node that extracts it.
+
+Run as a script, merges the TSV outputs of shards 0..N-1 back into the
+output of a single-node run over the same inputs: the inputs are read
+again for their docid order, and each document's rows are taken from the
+output of its shard. Documents are assumed to have distinct docids.
+
+Usage:
+    python sharding.py [--nlp] --inputs INPUT [INPUT ...] -- SHARD_OUTPUT ... > merged
+"""
+import argparse
+import hashlib
+import struct
+import sys
+
+
+class ShardError(Exception):
+    pass
+
+
+def shard_of(docid, shards):
+    if isinstance(docid, unicode):
+        docid = docid.encode("utf-8")
+
+    return struct.unpack("!Q", hashlib.md5(docid).digest()[:8])[0] % shards
+
+
+def parse_shard(text):
+    """'I/N' -> (I, N)"""
+    try:
+        index, shards = [int(x) for x in text.split("/")]
+    except ValueError:
+        raise ShardError("shard must be given as INDEX/COUNT, not %r" % text)
+
+    if not 0 <= index < shards:
+        raise ShardError("shard index %d is not in 0..%d" % (index, shards - 1))
+
+    return index, shards
+
+
+def iter_groups(lines):
+    """(docid, lines) for each run of TSV rows with the same docid."""
+    docid = None
+    group = []
+    for line in lines:
+        key = line.split("\t", 1)[0]
+        if key != docid and group:
+            yield docid, group
+            group = []
+        docid = key
+        group.append(line)
+
+    if group:
+        yield docid, group
+
+
+def merge(docids, outputs, out):
+    """Write the rows of outputs[shard_of(docid)] in docids order."""
+    shards = len(outputs)
+    streams = [iter_groups(f) for f in outputs]
+    pending = [next(stream, None) for stream in streams]
+
+    for docid in docids:
+        shard = shard_of(docid, shards)
+        group = pending[shard]
+        if group is not None and group[0] == docid:
+            out.writelines(group[1])
+            pending[shard] = next(streams[shard], None)
+
+    for shard, group in enumerate(pending):
+        if group is not None:
+            raise ShardError("rows of %s in shard %d do not follow the inputs' order"
+                             % (group[0], shard))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Merge the outputs of sharded runs")
+    parser.add_argument("--nlp", action="store_true",
+        help="inputs are .nlp documents, directories or glob patterns")
+    parser.add_argument("--inputs", nargs="+", required=True,
+        help="the inputs the shards were extracted from")
+    parser.add_argument("outputs", nargs="+",
+        help="TSV outputs of shards 0, 1, ... N-1, optionally compressed")
+
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+
+    import compression
+    import gene_relations
+    import nlp_reader
+
+    if args.nlp:
+        docids = (nlp_reader.docid_of(path) for path in nlp_reader.find_files(args.inputs))
+    else:
+        docids = (gene_relations.row_docid(row) for row in compression.input_lines(args.inputs))
+
+    outputs = [compression.open_input(path) for path in args.outputs]
+    merge(docids, outputs, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
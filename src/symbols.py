@@ -0,0 +1,445 @@
+"""
+Interned, array-backed storage for the extractor dictionaries.
+
+Most of the extractor dictionaries are string sets ({str: 1}) or sparse
+graphs ({str: {str: 1}}), and as nested Python dicts they cost far more in
+per-object overhead than in data. Here every string is interned once in a
+SymbolTable, whose IDs are the strings' sorted ranks. Sets become sorted
+arrays of IDs and graphs become CSR adjacency, and both answer the same
+`in`, `[]` and iteration queries the dicts do. Callers that test one word
+against several dictionaries look its ID up once and use the *_id methods,
+which first test a bitmap of the dictionary's keys, one bit per symbol.
+
+Interaction graphs whose edges join whole groups of alias names are kept
+as an InteractionGraph over the groups instead of the cross product of
+their names.
+
+The arrays are array.arrays when built and read-only views of the snapshot
+mapping (NumPy arrays, and a buffer for the string blob) when loaded from
+one; see dict_snapshot.py.
+"""
+from array import array
+from bisect import bisect_left
+import zlib
+
+ID_TYPE = "i"
+OFFSET_TYPE = "I"
+
+
+def _find(a, x, lo=0, hi=None):
+    """The index of x in the sorted slice a[lo:hi], or -1."""
+    if hi is None:
+        hi = len(a)
+
+    if isinstance(a, array):
+        k = bisect_left(a, x, lo, hi)
+        return k if k < hi and a[k] == x else -1
+
+    # bisect over a NumPy array boxes every probe; searchsorted() runs in C,
+    # given a scalar of the array's type (or it converts the whole array)
+    k = lo + int(a[lo:hi].searchsorted(a.dtype.type(x)))
+    return k if k < hi and a.item(k) == x else -1
+
+
+def _getter(a):
+    """
+    a's element getter. Indexing a NumPy array returns NumPy scalars, whose
+    comparisons with ints are slow; its item() returns ints.
+    """
+    return getattr(a, "item", a.__getitem__)
+
+
+def _slice(a, lo, hi):
+    """a[lo:hi], as ints."""
+    row = a[lo:hi]
+    return row if isinstance(row, array) else row.tolist()
+
+
+def _bitmap(ids, size):
+    """Bitmap of IDs in [0, size), as a char array."""
+    bits = bytearray((size + 7) >> 3)
+    for i in ids:
+        bits[i >> 3] |= 1 << (i & 7)
+
+    return array("c", str(bits))
+
+
+def _has(bits, i):
+    return i >= 0 and ord(bits[i >> 3]) >> (i & 7) & 1
+
+
+def _hash(s):
+    # CRC-32 is computed in C and, unlike hash(), the same in every process
+    return zlib.crc32(s) & 0xffffffff
+
+
+class SymbolTable(object):
+    """
+    Sorted, deduplicated strings packed into one buffer; ID = sorted rank.
+
+    IDs are found through an open-addressing hash index over the IDs, at
+    most half full, so a lookup is a hash and one or two string compares.
+    """
+
+    def __init__(self, blob, offsets, slots):
+        self._blob = blob
+        self._offsets = offsets
+        self._slots = slots
+        self._offset = _getter(offsets)
+        self._slot = _getter(slots)
+
+    @classmethod
+    def build(cls, strings):
+        strings = sorted(set(strings))
+
+        offsets = array(OFFSET_TYPE, [0])
+        pos = 0
+        for s in strings:
+            pos += len(s)
+            offsets.append(pos)
+
+        size = 1
+        while size < 2 * len(strings):
+            size <<= 1
+        slots = array(ID_TYPE, [-1]) * size
+        mask = size - 1
+        for i, s in enumerate(strings):
+            h = _hash(s) & mask
+            while slots[h] >= 0:
+                h = (h + 1) & mask
+            slots[h] = i
+
+        return cls("".join(strings), offsets, slots)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def string(self, i):
+        return self._blob[self._offset(i):self._offset(i + 1)]
+
+    def id_of(self, s):
+        """Return the ID of s, or -1 if s was never interned."""
+        if isinstance(s, unicode):
+            s = s.encode("utf-8")
+
+        blob = self._blob
+        offset = self._offset
+        slot = self._slot
+        mask = len(self._slots) - 1
+
+        h = _hash(s) & mask
+        while True:
+            i = slot(h)
+            if i < 0:
+                return -1
+            if blob[offset(i):offset(i + 1)] == s:
+                return i
+            h = (h + 1) & mask
+
+    def state(self):
+        return (array("c", self._blob), self._offsets, self._slots)
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(*state)
+
+
+class IdSet(object):
+    """
+    Set of strings stored as a sorted slice [lo, hi) of an array of IDs.
+
+    Also used for the rows of a Relation, which share its target array.
+    """
+
+    def __init__(self, symbols, ids, lo=0, hi=None, bits=None):
+        self._symbols = symbols
+        self._ids = ids
+        self._lo = lo
+        self._hi = len(ids) if hi is None else hi
+        self._bits = bits
+
+    @classmethod
+    def build(cls, symbols, strings):
+        ids = array(ID_TYPE, sorted(symbols.id_of(s) for s in strings))
+        return cls(symbols, ids, bits=_bitmap(ids, len(symbols)))
+
+    def __len__(self):
+        return self._hi - self._lo
+
+    def __iter__(self):
+        for i in _slice(self._ids, self._lo, self._hi):
+            yield self._symbols.string(i)
+
+    def __contains__(self, s):
+        i = self._symbols.id_of(s)
+        if i < 0:
+            return False
+
+        return self.contains_id(i)
+
+    def contains_id(self, i):
+        if self._bits is not None:
+            return bool(_has(self._bits, i))
+
+        return i >= 0 and _find(self._ids, i, self._lo, self._hi) >= 0
+
+    def state(self):
+        return ("set", self._ids[self._lo:self._hi], self._bits)
+
+
+class Relation(object):
+    """{str: {str: 1}} stored as CSR adjacency over symbol IDs."""
+
+    def __init__(self, symbols, keys, offsets, targets, bits):
+        self._symbols = symbols
+        self._keys = keys
+        self._offsets = offsets
+        self._targets = targets
+        self._bits = bits
+        self._offset = _getter(offsets)
+
+    @classmethod
+    def build(cls, symbols, graph):
+        keys = array(ID_TYPE)
+        offsets = array(OFFSET_TYPE, [0])
+        targets = array(ID_TYPE)
+
+        for key_id, key in sorted((symbols.id_of(k), k) for k in graph):
+            keys.append(key_id)
+            targets.extend(sorted(symbols.id_of(t) for t in graph[key]))
+            offsets.append(len(targets))
+
+        return cls(symbols, keys, offsets, targets, _bitmap(keys, len(symbols)))
+
+    def _index(self, s):
+        return self._index_id(self._symbols.id_of(s))
+
+    def _index_id(self, i):
+        return _find(self._keys, i) if _has(self._bits, i) else -1
+
+    def has_id(self, i):
+        """Whether the ID is a key."""
+        return self._index_id(i) >= 0
+
+    def contains_ids(self, i, j):
+        """Whether ID j is in the row of key ID i."""
+        k = self._index_id(i)
+        if k < 0 or j < 0:
+            return False
+
+        return _find(self._targets, j, self._offset(k), self._offset(k + 1)) >= 0
+
+    def row_ids(self, i):
+        """The IDs in the row of key ID i, empty if it is not a key."""
+        k = self._index_id(i)
+        if k < 0:
+            return ()
+
+        return _slice(self._targets, self._offset(k), self._offset(k + 1))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        for i in _slice(self._keys, 0, len(self._keys)):
+            yield self._symbols.string(i)
+
+    def __contains__(self, s):
+        return self._index(s) >= 0
+
+    def __getitem__(self, s):
+        k = self._index(s)
+        if k < 0:
+            raise KeyError(s)
+
+        return IdSet(self._symbols, self._targets, self._offset(k), self._offset(k + 1))
+
+    def get(self, s, default=None):
+        k = self._index(s)
+        if k < 0:
+            return default
+
+        return IdSet(self._symbols, self._targets, self._offset(k), self._offset(k + 1))
+
+    def state(self):
+        return ("relation", self._keys, self._offsets, self._targets, self._bits)
+
+
+class GraphBuilder(object):
+    """
+    The edges of an InteractionGraph, collected while dictionaries are
+    parsed. A node is a group of names, each of which stands for the node;
+    groups with the same names are one node.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self.members = []
+        self.edges = set()
+
+    def node(self, names):
+        names = tuple(sorted(set(names)))
+        n = self._nodes.get(names)
+        if n is None:
+            n = self._nodes[names] = len(self.members)
+            self.members.append(names)
+
+        return n
+
+    def add_edge(self, names1, names2):
+        """Every name of names1 interacts with every name of names2, both ways."""
+        a = self.node(names1)
+        b = self.node(names2)
+        self.edges.add((a, b))
+        self.edges.add((b, a))
+
+    def add_pair(self, name1, name2):
+        self.add_edge((name1,), (name2,))
+
+    def __iter__(self):
+        names = set()
+        for members in self.members:
+            names.update(members)
+
+        return iter(names)
+
+
+def _csr(rows, typecode=ID_TYPE):
+    """Sorted rows of IDs -> (offsets, values) arrays."""
+    offsets = array(OFFSET_TYPE, [0])
+    values = array(typecode)
+    for row in rows:
+        values.extend(sorted(row))
+        offsets.append(len(values))
+
+    return offsets, values
+
+
+class InteractionGraph(object):
+    """
+    Symmetric name graph stored once over alias groups: the names in each
+    node, the nodes each name belongs to, and the edges between nodes, all
+    linear in the number of names and edges. w1 and w2 interact when a node
+    of w1 has an edge to a node of w2.
+    """
+
+    def __init__(self, symbols, keys, name_offsets, name_nodes, member_offsets, members,
+                 edge_offsets, edges, bits):
+        self._symbols = symbols
+        # name ID -> its nodes, for the sorted name IDs in keys
+        self._keys = keys
+        self._bits = bits
+        self._name_offsets = name_offsets
+        self._name_nodes = name_nodes
+        # node -> name IDs and node -> neighbor nodes
+        self._member_offsets = member_offsets
+        self._members = members
+        self._edge_offsets = edge_offsets
+        self._edges = edges
+        self._name_offset = _getter(name_offsets)
+        self._member_offset = _getter(member_offsets)
+        self._edge_offset = _getter(edge_offsets)
+
+    @classmethod
+    def build(cls, symbols, builder):
+        members = [[symbols.id_of(name) for name in names] for names in builder.members]
+
+        name_nodes = {}
+        for n, ids in enumerate(members):
+            for i in ids:
+                name_nodes.setdefault(i, []).append(n)
+
+        neighbors = [[] for _ in members]
+        for a, b in builder.edges:
+            neighbors[a].append(b)
+
+        keys = array(ID_TYPE, sorted(name_nodes))
+        name_offsets, name_node_ids = _csr(name_nodes[i] for i in keys)
+        member_offsets, member_ids = _csr(members)
+        edge_offsets, edges = _csr(neighbors)
+
+        return cls(symbols, keys, name_offsets, name_node_ids, member_offsets, member_ids,
+                   edge_offsets, edges, _bitmap(keys, len(symbols)))
+
+    def _nodes(self, s):
+        return self._nodes_id(self._symbols.id_of(s))
+
+    def _nodes_id(self, i):
+        k = _find(self._keys, i) if _has(self._bits, i) else -1
+        if k < 0:
+            return ()
+
+        return _slice(self._name_nodes, self._name_offset(k), self._name_offset(k + 1))
+
+    def _neighbors(self, n):
+        return _slice(self._edges, self._edge_offset(n), self._edge_offset(n + 1))
+
+    def interacts(self, s1, s2):
+        return self.interacts_ids(self._symbols.id_of(s1), self._symbols.id_of(s2))
+
+    def interacts_ids(self, i1, i2):
+        nodes1 = self._nodes_id(i1)
+        if not nodes1:
+            return False
+
+        nodes2 = set(self._nodes_id(i2))
+        for n in nodes1:
+            if not nodes2.isdisjoint(self._neighbors(n)):
+                return True
+
+        return False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        for i in _slice(self._keys, 0, len(self._keys)):
+            yield self._symbols.string(i)
+
+    def __contains__(self, s):
+        # every node has an edge
+        return len(self._nodes(s)) > 0
+
+    def get(self, s, default=None):
+        """The names s interacts with, as a set of strings."""
+        nodes = self._nodes(s)
+        if not nodes:
+            return default
+
+        names = set()
+        for n in nodes:
+            for m in self._neighbors(n):
+                for i in _slice(self._members, self._member_offset(m), self._member_offset(m + 1)):
+                    names.add(self._symbols.string(i))
+
+        return names
+
+    def __getitem__(self, s):
+        names = self.get(s)
+        if names is None:
+            raise KeyError(s)
+
+        return names
+
+    def state(self):
+        return ("graph", self._keys, self._name_offsets, self._name_nodes, self._member_offsets,
+            self._members, self._edge_offsets, self._edges, self._bits)
+
+
+def collect(d, strings):
+    """Add every string in a set-like or nested dictionary to strings."""
+    for key in d:
+        strings.add(key)
+        if isinstance(d, dict) and isinstance(d[key], dict):
+            strings.update(d[key])
+
+
+def from_state(symbols, state):
+    """Rebuild an IdSet, Relation or InteractionGraph from the tuple its state() returned."""
+    if state[0] == "set":
+        return IdSet(symbols, state[1], bits=state[2])
+
+    if state[0] == "graph":
+        return InteractionGraph(symbols, *state[1:])
+
+    return Relation(symbols, *state[1:])
@@ -0,0 +1,52 @@
+import pytest
+
+import candidate_store
+
+FIELDS = ("docid", "word1", "word2", "features")
+RECORDS = [
+    ("journal.a.pdf", "MDM2", "TP53", ["F1", "F2"]),
+    ("journal.a.pdf", "TP53", "TP53", []),
+    ("journal.b.pdf", "BRCA1", "TP53", [u"F\xe4"]),
+]
+KEYS = [(docid, (word1, word2)) for docid, word1, word2, features in RECORDS]
+
+
+def write(path, fields=FIELDS):
+    writer = candidate_store.CandidateWriter(path, fields)
+    writer.write_records(candidate_store.encode(RECORDS[:1]), KEYS[:1])
+    writer.write_records(candidate_store.encode(RECORDS[1:]), KEYS[1:])
+    writer.close()
+
+
+def test_round_trip(tmpdir):
+    path = str(tmpdir.join("candidates"))
+    write(path)
+    assert tmpdir.listdir(sort=True) == [tmpdir.join("candidates"), tmpdir.join("candidates.idx")]
+    assert list(candidate_store.read_records(path, FIELDS)) == RECORDS
+
+
+def test_index(tmpdir):
+    path = str(tmpdir.join("candidates"))
+    write(path)
+    index = candidate_store.read_index(path, FIELDS)
+
+    def records(offsets):
+        return list(candidate_store.read_records_at(path, FIELDS, offsets))
+
+    assert records(index.symbol_offsets("TP53")) == RECORDS
+    assert records(index.symbol_offsets("BRCA1")) == RECORDS[2:]
+    assert records(index.docid_offsets("journal.a.pdf")) == RECORDS[:2]
+    assert records(index.symbol_offsets("RNF53")) == []
+
+
+def test_other_fields_are_rejected(tmpdir):
+    path = str(tmpdir.join("candidates"))
+    write(path)
+    with pytest.raises(candidate_store.CandidateStoreError):
+        list(candidate_store.read_records(path, FIELDS + ("ner1",)))
+    with pytest.raises(candidate_store.CandidateStoreError):
+        candidate_store.read_index(path, FIELDS[:-1])
+
+    tmpdir.join("plain").write("not a store")
+    with pytest.raises(candidate_store.CandidateStoreError):
+        list(candidate_store.read_records(str(tmpdir.join("plain")), FIELDS))
@@ -0,0 +1,55 @@
+import distutils.spawn
+
+import pytest
+
+import compression
+
+LINES = ["journal.a.pdf\tMDM2 binds TP53\n", u"journal.b.pdf\t\xe4\n".encode("utf-8"), "last\n"]
+
+
+def has_codec(codec):
+    return any(distutils.spawn.find_executable(name) for name in compression.COMMANDS[codec])
+
+
+@pytest.mark.parametrize("codec", compression.CODECS)
+def test_round_trip(tmpdir, codec):
+    if not has_codec(codec):
+        pytest.skip("no %s command" % codec)
+
+    path = tmpdir.join("out")
+    with open(str(path), "wb") as f:
+        out = compression.CompressedOutput(f, codec, threads=1)
+        for line in LINES:
+            out.write(line)
+        out.close()
+
+    assert compression.detect(path.read("rb")) == codec
+    plain = tmpdir.join("plain")
+    plain.write("".join(LINES), mode="wb")
+    assert list(compression.input_lines([str(path), str(plain)])) == LINES * 2
+
+
+def test_failing_compressor_is_an_error(tmpdir, monkeypatch):
+    monkeypatch.setattr(compression, "compress_command",
+                        lambda codec, level, threads: ["sh", "-c", "cat > /dev/null; exit 3"])
+    with open(str(tmpdir.join("out")), "wb") as f:
+        out = compression.CompressedOutput(f, "gzip")
+        out.write("".join(LINES))
+        with pytest.raises(compression.CompressionError) as e:
+            out.close()
+    assert "status 3" in str(e.value)
+
+
+def test_truncated_input_is_an_error(tmpdir):
+    if not has_codec("gzip"):
+        pytest.skip("no gzip command")
+
+    path = tmpdir.join("out")
+    with open(str(path), "wb") as f:
+        out = compression.CompressedOutput(f, "gzip")
+        out.write("".join(LINES) * 1000)
+        out.close()
+    path.write(path.read("rb")[:-20], mode="wb")
+
+    with pytest.raises(compression.CompressionError):
+        list(compression.input_lines([str(path)]))
@@ -0,0 +1,83 @@
+import random
+
+from dep_index import DepIndex
+
+
+def make_index(parents):
+    n = len(parents)
+    return DepIndex(parents, ["l%d" % i for i in xrange(n)], ["W%d" % i for i in xrange(n)])
+
+
+def ancestors(parents, node):
+    chain = [node]
+    while parents[node] != -1:
+        node = parents[node]
+        chain.append(node)
+    return chain
+
+
+def random_forest(rng, n):
+    """Head indices of a random forest over n tokens, in shuffled order."""
+    order = range(n)
+    rng.shuffle(order)
+    parents = [-1] * n
+    for k in xrange(1, n):
+        p = rng.randint(-1, k - 1)
+        parents[order[k]] = -1 if p == -1 else order[p]
+    return parents
+
+
+# 1 is the root; 0 and 2 hang off it, 3 and 4 off 2
+TREE = [1, -1, 1, 2, 2]
+
+
+def test_lca_and_distance():
+    idx = make_index(TREE)
+    assert idx.lca(3, 4) == 2
+    assert idx.lca(0, 4) == 1
+    assert idx.lca(2, 3) == 2
+    assert idx.lca(3, 3) == 3
+    assert idx.distance(0, 3) == 3
+    assert idx.distance(3, 4) == 2
+    assert idx.distance(4, 4) == 0
+
+
+def test_lca_of_separate_trees_is_the_virtual_root():
+    idx = make_index([-1, 0, -1, 2])
+    assert idx.lca(1, 3) == idx.root
+    assert idx.lca(0, 1) == 0
+
+
+def test_dep_path():
+    idx = make_index(TREE)
+    assert idx.path(3, 4) == "--l3->|w2|<-l4--"
+    assert idx.path(0, 4) == "--l0->|w1|<-l2--<-l4--"
+    assert idx.path(2, 3) == "SAMEPATH|<-l3--"
+    assert "NONEROOT" not in idx.path(0, 3)
+
+
+def test_lca_matches_ancestor_chains():
+    rng = random.Random(1)
+    for _ in xrange(50):
+        parents = random_forest(rng, rng.randint(1, 12))
+        idx = make_index(parents)
+        for a in xrange(len(parents)):
+            for b in xrange(len(parents)):
+                up = set(ancestors(parents, a))
+                common = next((x for x in ancestors(parents, b) if x in up), idx.root)
+                assert idx.lca(a, b) == common
+
+
+def test_paths_match_the_chain_walk():
+    rng = random.Random(2)
+    for k in xrange(100):
+        n = rng.randint(1, 10)
+        if k % 2:
+            # heads anywhere in the sentence, cycles included
+            parents = [rng.randint(-1, n - 1) for _ in xrange(n)]
+        else:
+            parents = random_forest(rng, n)
+        idx = make_index(parents)
+        for a in xrange(n):
+            for b in xrange(n):
+                assert idx.path(a, b) == idx._walk_path(a, b)
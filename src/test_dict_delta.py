@@ -0,0 +1,66 @@
+import pytest
+
+pytest.importorskip("helper.easierlife")
+
+import candidate_store
+import dict_delta
+import dict_snapshot
+import gene_relations
+from gene_relations import Candidate
+
+NAMES = list(gene_relations.LABEL_DICTS) + gene_relations.EXTRACT_DICTS
+
+
+def use_dicts(interact=(), gold_standard=()):
+    gene_relations.reset_dict()
+    for symbol in ("MDM2", "TP53", "BRCA1", "RNF53"):
+        gene_relations.dict_gene_symbols_all[symbol] = "symbol"
+        gene_relations.dict_gene_pruned[symbol] = "symbol"
+    for pair in interact:
+        gene_relations.dict_interact.add_edge([pair[0]], [pair[1]])
+    gene_relations.dict_gs_docids.update(gold_standard)
+    gene_relations.compact_dict()
+
+
+def candidate(docid, word1, word2):
+    return Candidate(docid, docid + "_1_0", docid + "_1_2", word1, word2, [], "", "O", "O",
+                     [], 0, 0, 0, False)
+
+
+def test_only_affected_candidates_are_read(tmpdir):
+    store = str(tmpdir.join("candidates"))
+    candidates = [candidate("journal.a.pdf", "MDM2", "TP53"),
+                  candidate("journal.b.pdf", "BRCA1", "RNF53"),
+                  candidate("journal.c.pdf", "BRCA1", "TP53")]
+    writer = candidate_store.CandidateWriter(store, Candidate.FIELDS)
+    writer.write_records(candidate_store.encode([c.record() for c in candidates]),
+                         [(c.docid, (c.word1, c.word2)) for c in candidates])
+    writer.close()
+
+    try:
+        use_dicts()
+        snapshot = str(tmpdir.join("old.snap"))
+        gene_relations.write_dict_snapshot(snapshot, [])
+        snap = dict_snapshot.open_snapshot(snapshot)
+        _, old_dicts = gene_relations.snapshot_dicts(snap, NAMES)
+
+        use_dicts(interact=[("MDM2", "TP53")], gold_standard=["journal.b"])
+        symbols, docids = dict_delta.delta(old_dicts, dict_delta.current_dicts(NAMES))
+        snap.close()
+    finally:
+        gene_relations.reset_dict()
+
+    assert symbols == set(["MDM2", "TP53"])
+    assert docids == set(["journal.b"])
+    assert list(dict_delta.iter_affected([store], symbols, docids)) == \
+        [c.record() for c in candidates]
+    assert list(dict_delta.iter_affected([store], set(["MDM2"]), set())) == [candidates[0].record()]
+
+
+def test_affected():
+    old = {"MDM2": {"TP53": 1}}
+    new = {"MDM2": {"TP53": 1, "BRCA1": 1}, "RNF53": {"TP53": 1}}
+    assert dict_delta.affected("pair", old, new) == (set(["MDM2", "RNF53", "BRCA1", "TP53"]), set())
+    assert dict_delta.affected("symbol_key", old, new) == (set(["MDM2", "RNF53"]), set())
+    assert dict_delta.affected("symbol_value", old, new) == (set(["BRCA1", "TP53"]), set())
+    assert dict_delta.affected("docids", set(["a"]), set(["b"])) == (set(), set(["a", "b"]))
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+pytest.importorskip("helper.easierlife")
+
+import evaluate
+
+
+def pair_hashes(values, run_size):
+    hashes = evaluate.PairHashes(run_size)
+    for h in values:
+        hashes.add(h)
+    hashes.finish()
+    return hashes
+
+
+@pytest.mark.parametrize("run_size", [3, 1000])
+def test_pair_hashes_match_sets(run_size):
+    rng = random.Random(0)
+    a = [rng.randint(-50, 50) for _ in xrange(200)]
+    b = [rng.randint(0, 100) for _ in xrange(150)]
+
+    hashes_a = pair_hashes(a, run_size)
+    hashes_b = pair_hashes(b, run_size)
+    try:
+        assert list(hashes_a) == sorted(set(a))
+        assert len(hashes_b) == len(set(b))
+        assert evaluate.common_count(hashes_a, hashes_b) == len(set(a) & set(b))
+    finally:
+        hashes_a.close()
+        hashes_b.close()
+
+
+def test_pair_hash_is_order_independent():
+    assert evaluate.pair_hash("a_1_2", "b_3_4") == evaluate.pair_hash("b_3_4", "a_1_2")
+
+
+def test_gold_standard_precision_counts_only_dip_mint_documents(tmpdir, monkeypatch):
+    import gene_relations
+
+    tmpdir.join("data", "plos_journals_dip_mint_pmids.txt").write(
+        "journal.gs.pdf\t123\n", ensure=True)
+    monkeypatch.setattr(gene_relations, "BASE_FOLDER", str(tmpdir))
+    gene_relations.reset_dict()
+    gene_relations.dict_interact.add_edge(["MDM2"], ["TP53"])
+    gene_relations.compact_dict()
+    # the 10k sample is held out from training too, but is no gold standard
+    gene_relations.dict_gs_docids.update(["journal.gs", "journal.sample"])
+
+    path = tmpdir.join("inference_bucketed_1k.csv")
+    path.write("docid,word1,word2,is_correct,expectation\n"
+               "journal.gs.pdf,MDM2,TP53,,0.9\n"
+               "journal.sample.pdf,BRCA1,TP53,,0.9\n"
+               "journal.other.pdf,MDM2,TP53,,0.9\n")
+    try:
+        evaluation = evaluate.evaluate_file(str(path), gene_relations.read_dip_mint_docids(),
+                                            [0.5], 0.9)
+    finally:
+        gene_relations.reset_dict()
+
+    try:
+        assert evaluation.summary()["precision"][0]["gold_standard"] == \
+            {"rows": 1, "known": 1, "precision": 1.0}
+    finally:
+        evaluation.pairs.close()
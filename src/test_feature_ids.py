@@ -0,0 +1,57 @@
+import pytest
+
+import feature_ids
+
+FEATURES = ["WINDOW_LEFT_M1_1_with[with]", "DEP_PAR[--nsubj->|bind|<-dobj--]"]
+
+
+def test_ids_are_stable():
+    hasher = feature_ids.FeatureHasher(cache_size=1)
+    ids = hasher.ids(FEATURES)
+    assert ids == [feature_ids.feature_id(f) for f in FEATURES]
+    assert all(0 <= fid < 1 << 63 for fid in ids)
+    assert hasher.ids(list(FEATURES)) == ids
+    assert hasher.drain() == zip(ids, FEATURES)
+    assert feature_ids.feature_id(u"F\xe4") == feature_ids.feature_id("F\xc3\xa4")
+
+    rows = list(hasher.encode_rows([["a", FEATURES], ["b", []]], 1))
+    assert rows == [["a", ids], ["b", []]]
+
+
+def test_table_is_extended_across_runs(tmpdir):
+    path = str(tmpdir.join("features.tsv"))
+    hasher = feature_ids.FeatureHasher()
+    hasher.ids(FEATURES)
+    entries = hasher.drain()
+
+    table = feature_ids.FeatureTable(path)
+    table.add(entries)
+    table.add(entries[:1])
+    table.close()
+
+    table = feature_ids.FeatureTable(path)
+    assert len(table) == 2
+    table.add(entries + [(feature_ids.feature_id("NEW"), "NEW")])
+    table.close()
+    assert tmpdir.join("features.tsv").read().splitlines() == \
+        ["%d\t%s" % entry for entry in entries] + ["%d\tNEW" % feature_ids.feature_id("NEW")]
+
+
+def test_collisions_are_detected(tmpdir, monkeypatch):
+    monkeypatch.setattr(feature_ids, "feature_id", lambda feature: 7)
+    hasher = feature_ids.FeatureHasher()
+    assert hasher.ids(FEATURES[:1]) == [7]
+
+    path = str(tmpdir.join("features.tsv"))
+    table = feature_ids.FeatureTable(path)
+    table.add(hasher.drain())
+    hasher.ids(FEATURES[1:])
+    with pytest.raises(feature_ids.FeatureIdCollision):
+        table.add(hasher.drain())
+    table.close()
+
+    # also against the entries of an earlier run
+    table = feature_ids.FeatureTable(path)
+    with pytest.raises(feature_ids.FeatureIdCollision):
+        table.add([(7, "C")])
+    table.close()
@@ -0,0 +1,127 @@
+import pytest
+
+pytest.importorskip("helper.easierlife")
+
+import extract_cache
+import gene_relations
+import nlp_reader
+
+#ID FORM POSTAG NERTAG LEMMA DEPREL HEAD SENTID PROV
+NLP = """\
+1\tMDM2\tNN\tO\tMDM2\tnsubj\t2\tSENT_1\tx
+2\tbinds\tVBZ\tO\tbind\troot\t0\tSENT_1\tx
+3\tTP53\tNN\tO\tTP53\tdobj\t2\tSENT_1\tx
+4\t.\t.\tO\t.\tpunct\t2\tSENT_1\tx
+
+"""
+
+
+@pytest.fixture
+def genes():
+    gene_relations.reset_dict()
+    for symbol in ("MDM2", "TP53"):
+        gene_relations.dict_gene_symbols_all[symbol] = "symbol"
+        gene_relations.dict_gene_pruned[symbol] = "symbol"
+    gene_relations.compact_dict()
+    yield
+    gene_relations.reset_dict()
+
+
+def test_cached_nlp_files_keep_their_docids(tmpdir, genes):
+    paths = []
+    for name in ("journal.a.pdf.nlp", "journal.b.pdf.nlp"):
+        path = tmpdir.join(name)
+        path.write(NLP)
+        paths.append(str(path))
+
+    cache = extract_cache.ExtractCache(str(tmpdir.join("cache")), "test")
+    loader = gene_relations.CachedLoader(cache, gene_relations.extract_nlp_file,
+                                         gene_relations.file_content)
+
+    for _ in range(2):
+        first, second = [loader(path) for path in paths]
+        assert first and set(c.docid for c in first) == set(["journal.a.pdf"])
+        assert second and set(c.docid for c in second) == set(["journal.b.pdf"])
+        assert [c.mid1 for c in first] == [c.mid1.replace(".b.", ".a.") for c in second]
+
+
+def test_person_mentions_are_negative_examples(tmpdir, genes):
+    path = tmpdir.join("journal.c.pdf.nlp")
+    path.write(NLP.replace("\tMDM2\tNN\tO\t", "\tMDM2\tNN\tPERSON\t"))
+
+    candidates = gene_relations.extract_nlp_file(str(path))
+    assert [c.ner1 for c in candidates] == ["Person"]
+    assert gene_relations.label(candidates[0]) == [False, None]
+
+
+def test_negative_draw_of_unicode_mentions():
+    draw = gene_relations.negative_draw
+    Candidate = gene_relations.Candidate
+
+    assert draw(Candidate("journal.a.pdf", "journal.a.pdf_1_0", "journal.a.pdf_1_2")) == \
+        draw(Candidate(u"journal.a.pdf", u"journal.a.pdf_1_0", u"journal.a.pdf_1_2"))
+    assert 0 <= draw(Candidate(u"journal.\xe4.pdf", u"journal.\xe4.pdf_1_0", u"journal.\xe4.pdf_1_2")) < 1
+
+
+def test_cache_with_a_snapshot_loaded(tmpdir, genes, monkeypatch):
+    snapshot = str(tmpdir.join("dicts.snap"))
+    gene_relations.write_dict_snapshot(snapshot, [])
+    monkeypatch.setattr(gene_relations, "loaded_dict_version", None)
+    gene_relations.load_dict(snapshot)
+
+    path = tmpdir.join("journal.d.pdf.nlp")
+    path.write(NLP.replace("\tbinds\t", "\tspeci\xef\xac\x81cally binds\t"), mode="wb")
+    cache = extract_cache.ExtractCache(str(tmpdir.join("cache")), gene_relations.extractor_version())
+    loader = gene_relations.CachedLoader(cache, gene_relations.extract_nlp_file,
+                                         gene_relations.file_content)
+
+    hits = gene_relations.stats.counters["cache_hits"]
+    cold, warm = [loader(str(path)) for _ in range(2)]
+    assert cold and [c.record() for c in warm] == [c.record() for c in cold]
+    assert gene_relations.stats.counters["cache_hits"] == hits + 1
+
+
+def test_failed_documents_are_not_cached(tmpdir, genes):
+    path = tmpdir.join("journal.e.pdf.nlp")
+    path.write(NLP)
+
+    def failing(path):
+        def candidates():
+            for c in gene_relations.extract_nlp_file(path):
+                yield c
+            raise ValueError("failed partway")
+        return gene_relations.collect(candidates())
+
+    cache = extract_cache.ExtractCache(str(tmpdir.join("cache")), "test")
+    loader = gene_relations.CachedLoader(cache, failing, gene_relations.file_content)
+
+    counters = gene_relations.stats.counters
+    hits, failed = counters["cache_hits"], counters["failed_documents"]
+    for _ in range(2):
+        assert loader(str(path))
+    assert counters["cache_hits"] == hits
+    assert counters["failed_documents"] == failed + 2
+
+
+@pytest.mark.parametrize("shard", ["3/2", "a/b", "1"])
+def test_malformed_shards_are_usage_errors(shard, capsys):
+    with pytest.raises(SystemExit) as e:
+        gene_relations.parse_args(["--shard", shard])
+    assert e.value.code == 2
+    assert "shard" in capsys.readouterr()[1]
+
+
+def test_shard_is_parsed():
+    assert gene_relations.parse_args(["--shard", "1/4"]).shard == (1, 4)
+
+
+def test_rejected_nlp_sentences_build_no_tokens(tmpdir, genes):
+    long_sentence = "".join("%d\tMDM2\tNN\tO\tMDM2\tdep\t1\tSENT_2\tx\n" % i for i in range(1, 60))
+    one_gene = NLP.replace("TP53", "p53").replace("SENT_1", "SENT_3")
+    path = tmpdir.join("journal.f.pdf.nlp")
+    path.write(NLP + long_sentence + "\n" + one_gene)
+
+    doc = nlp_reader.read_document(str(path))
+    candidates = list(gene_relations.extract_candidates(doc))
+    assert [c.mid1 for c in candidates] == ["journal.f.pdf_1_0"]
+    assert [sent._words is None for sent in doc.sents] == [False, True, True]
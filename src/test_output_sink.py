@@ -0,0 +1,133 @@
+import struct
+from StringIO import StringIO
+
+import pytest
+
+import output_sink
+
+ROWS = [
+    ["journal.a.pdf", "journal.a.pdf_1_0", "journal.a.pdf_1_2", "MDM2", "TP53", True,
+     ["WINDOW_LEFT_M1_1_with[with]", "DEP_PAR[--nsubj->|bind|<-dobj--]"], u"MDM2 binds TP53 \xe4", None],
+    ["journal.a.pdf", "journal.a.pdf_1_0", "journal.a.pdf_1_2", "MDM2", "TP53", None,
+     [], "MDM2 binds TP53", None],
+]
+
+#column types of the genegene rows above
+TYPES = ["text"] * 5 + ["bool", "array", "text", "int8"]
+
+
+def write(fmt, rows, buffer_size=16):
+    out = StringIO()
+    sink = output_sink.BufferedSink(out, fmt, buffer_size)
+    sink.write_rows(rows)
+    sink.close()
+    assert sink.rows == len(rows)
+    assert sink.bytes == len(out.getvalue())
+    return out.getvalue()
+
+
+def read_tsv(data):
+    def value(field, kind):
+        if field == "\\N":
+            return None
+        if kind == "bool":
+            return {"true": True, "false": False}[field]
+        if kind == "array":
+            return field[1:-1].split(",") if field != "{}" else []
+        if kind == "int8":
+            return int(field)
+        return field.decode("utf-8")
+
+    return [[value(field, kind) for field, kind in zip(line.split("\t"), TYPES)]
+            for line in data.splitlines()]
+
+
+class PgReader(object):
+    """Decodes PostgreSQL binary COPY data, recording array element OIDs."""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.array_oids = []
+
+    def take(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def element(self, oid, field):
+        if oid == output_sink.INT8_OID:
+            return struct.unpack("!q", field)[0]
+        assert oid == output_sink.TEXT_OID
+        return field.decode("utf-8")
+
+    def value(self, kind, field):
+        if kind == "bool":
+            return field == "\x01"
+        if kind == "int8":
+            return struct.unpack("!q", field)[0]
+        if kind == "text":
+            return field.decode("utf-8")
+
+        ndim, has_null, oid = struct.unpack_from("!iii", field)
+        self.array_oids.append(oid)
+        if ndim == 0:
+            return []
+        assert (ndim, has_null) == (1, 0)
+        count, lower = struct.unpack_from("!ii", field, 12)
+        assert lower == 1
+        values = []
+        pos = 20
+        for _ in xrange(count):
+            size = struct.unpack_from("!i", field, pos)[0]
+            values.append(self.element(oid, field[pos + 4:pos + 4 + size]))
+            pos += 4 + size
+        return values
+
+    def rows(self):
+        assert self.data.startswith(output_sink.PGCOPY_SIGNATURE)
+        self.pos = len(output_sink.PGCOPY_SIGNATURE)
+        assert self.take("!ii") == (0, 0)
+
+        rows = []
+        while True:
+            nfields = self.take("!h")[0]
+            if nfields == -1:
+                break
+            assert nfields == len(TYPES)
+            row = []
+            for kind in TYPES:
+                size = self.take("!i")[0]
+                if size == -1:
+                    row.append(None)
+                else:
+                    row.append(self.value(kind, self.data[self.pos:self.pos + size]))
+                    self.pos += size
+            rows.append(row)
+
+        assert self.pos == len(self.data)
+        return rows
+
+
+def test_tsv_round_trip():
+    assert read_tsv(write(output_sink.TSVFormat(), ROWS)) == ROWS
+
+
+def test_pgbinary_round_trip():
+    reader = PgReader(write(output_sink.PgBinaryFormat(), ROWS))
+    assert reader.rows() == ROWS
+    assert reader.array_oids == [output_sink.TEXT_OID] * 2
+
+
+@pytest.mark.parametrize("name", sorted(output_sink.FORMATS))
+def test_feature_id_arrays(name):
+    rows = [row[:6] + [ids] + row[7:] for row, ids in zip(ROWS, [[7, -3, 1 << 40], []])]
+    data = write(output_sink.FORMATS[name](int_arrays=True), rows)
+
+    if name == "tsv":
+        assert [[int(x) for x in row[6]] for row in read_tsv(data)] == [[7, -3, 1 << 40], []]
+    else:
+        reader = PgReader(data)
+        assert reader.rows() == rows
+        # bigint[] also when empty, to match the column type
+        assert reader.array_oids == [output_sink.INT8_OID] * 2
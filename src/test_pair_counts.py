@@ -0,0 +1,44 @@
+from StringIO import StringIO
+
+import pair_counts
+
+ROWS = [
+    # docid, mid1, mid2, word1, word2, is_correct
+    ["journal.a.pdf", "m1", "m2", "MDM2", "TP53", None],
+    ["journal.a.pdf", "m1", "m2", "MDM2", "TP53", True],
+    ["journal.a.pdf", "m3", "m4", "TP_53", "MDM2", None],
+    ["journal.b.pdf", "m5", "m6", u"TP53", u"MDM_2", None],
+    ["journal.b.pdf", "m5", "m6", u"TP53", u"MDM_2", False],
+    ["journal.b.pdf", "m7", "m8", "BRCA1", "TP53", None],
+]
+
+
+def counts(rows_per_document):
+    table = pair_counts.PairCounts()
+    for rows in rows_per_document:
+        table.add_rows(rows)
+    return table
+
+
+def test_pairs_of_aliases_are_counted_together():
+    table = counts([ROWS[:3], ROWS[3:]])
+    assert table.counts == {
+        ("MDM2", "TP53"): [3, 2, 1, 1],
+        ("BRCA1", "TP53"): [1, 1, 0, 0],
+    }
+
+
+def test_tables_merge_by_adding_up():
+    whole = counts([ROWS[:3], ROWS[3:]])
+    parts = [counts([ROWS[:3]]), counts([ROWS[3:]])]
+
+    merged = pair_counts.PairCounts()
+    for part in parts:
+        out = StringIO()
+        part.write(out)
+        merged.read(StringIO(out.getvalue()))
+    assert merged.counts == whole.counts
+
+    out = StringIO()
+    merged.write(out)
+    assert out.getvalue() == "BRCA1\tTP53\t1\t1\t0\t0\nMDM2\tTP53\t3\t2\t1\t1\n"
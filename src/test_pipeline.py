@@ -0,0 +1,80 @@
+from multiprocessing.pool import ThreadPool
+
+import pytest
+
+import pipeline
+
+
+class Result(object):
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class CountingPool(object):
+    """Runs tasks at once, counting how many are submitted."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def apply_async(self, func, args):
+        self.submitted += 1
+        return Result(func(*args))
+
+
+def square(x):
+    if x < 0:
+        raise ValueError("negative input %d" % x)
+    return x * x
+
+
+def test_ordered_map_keeps_order_and_bounds_in_flight():
+    pool = CountingPool()
+    for consumed, result in enumerate(pipeline.ordered_map(pool, square, iter(range(20)), 4), 1):
+        assert result == (consumed - 1) ** 2
+        # pending results, besides the one just handed out
+        assert pool.submitted - consumed < 4
+    assert consumed == pool.submitted == 20
+
+    pool = ThreadPool(3)
+    try:
+        assert list(pipeline.ordered_map(pool, square, range(50), 5)) == [x * x for x in range(50)]
+    finally:
+        pool.close()
+
+
+def test_worker_exceptions_propagate():
+    pool = ThreadPool(2)
+    try:
+        with pytest.raises(ValueError):
+            list(pipeline.ordered_map(pool, square, [1, 2, -3, 4], 2))
+    finally:
+        pool.close()
+
+
+def test_read_ahead_reraises_reader_failures():
+    def items():
+        yield 1
+        raise IOError("read failed")
+
+    results = pipeline.read_ahead(items(), 1)
+    assert next(results) == 1
+    with pytest.raises(IOError):
+        next(results)
+
+
+def test_writer_writes_in_order_and_reraises():
+    written = []
+    writer = pipeline.Writer(written.append, 2)
+    for x in range(10):
+        writer.put(x)
+    writer.close()
+    assert written == range(10)
+
+    writer = pipeline.Writer(square, 2)
+    writer.put(-1)
+    with pytest.raises(ValueError):
+        writer.close()
@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("helper.easierlife")
+
+import candidate_store
+import gene_relations
+import relabel
+from test_gene_relations import NLP
+
+
+def use_dicts(interact):
+    gene_relations.reset_dict()
+    for symbol in ("MDM2", "TP53"):
+        gene_relations.dict_gene_symbols_all[symbol] = "symbol"
+        gene_relations.dict_gene_pruned[symbol] = "symbol"
+    if interact:
+        gene_relations.dict_interact.add_edge(["MDM2"], ["TP53"])
+    gene_relations.compact_dict()
+
+
+def rows(candidates):
+    return [row for c in candidates for row in gene_relations.candidate_rows(c)]
+
+
+def relabeled_rows(paths):
+    batches = gene_relations.batched_records(relabel.iter_records(paths), 1)
+    return rows(c for batch in batches for c in gene_relations.read_candidates(batch))
+
+
+def test_relabel_reproduces_the_labels(tmpdir):
+    nlp = tmpdir.join("journal.a.pdf.nlp")
+    nlp.write(NLP)
+    store = str(tmpdir.join("candidates"))
+
+    try:
+        use_dicts(interact=False)
+        candidates = gene_relations.extract_nlp_file(str(nlp))
+        assert candidates
+
+        writer = candidate_store.CandidateWriter(store, gene_relations.Candidate.FIELDS)
+        writer.write_records(candidate_store.encode([c.record() for c in candidates]),
+                             [(c.docid, (c.word1, c.word2)) for c in candidates])
+        writer.close()
+        assert relabeled_rows([store]) == rows(candidates)
+
+        # a knowledge base update takes effect without re-extraction
+        use_dicts(interact=True)
+        relabeled = relabeled_rows([store])
+        assert relabeled == rows(gene_relations.extract_nlp_file(str(nlp)))
+        assert True in [row[5] for row in relabeled]
+    finally:
+        gene_relations.reset_dict()
@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+from StringIO import StringIO
+
+import pytest
+
+import compression
+import resource_sampler
+
+pytestmark = pytest.mark.skipif(not os.path.isdir(resource_sampler.PROC), reason="no /proc")
+
+
+def test_compressors_are_not_counted_as_workers(tmpdir):
+    sampler = resource_sampler.ResourceSampler(StringIO(), progress=lambda: {"rows": 3})
+    sleeper = subprocess.Popen(["sleep", "30"])
+    try:
+        with open(str(tmpdir.join("out.gz")), "wb") as f:
+            out = compression.CompressedOutput(f, "gzip", threads=1)
+            out.write("x" * 1000)
+            sample = sampler.sample()
+            out.close()
+        after = sampler.sample()
+    finally:
+        sleeper.kill()
+        sleeper.wait()
+
+    assert sample["processes"] == 2
+    assert sample["compressor_processes"] == 1
+    assert sample["compressor_rss_kb"] > 0
+    assert after["processes"] == 2
+    assert after["compressor_processes"] == 0
+    assert after["compressor_cpu_seconds"] >= sample["compressor_cpu_seconds"]
+    assert after["rows"] == 3
+
+    sampler.write()
+    assert json.loads(sampler.out.getvalue())["compressor_processes"] == 0
@@ -0,0 +1,86 @@
+import pytest
+
+import dict_snapshot
+import symbols
+
+
+def build():
+    graph = symbols.GraphBuilder()
+    graph.add_edge(["MDM2", "HDM2"], ["TP53"])
+    relation = {"MDM2": {"TP53": 1, "BRCA1": 1}, "TP53": {"MDM2": 1}}
+    genes = {"MDM2": 1, "TP53": 1, "RNF53": 1}
+
+    strings = set(["unused"])
+    for d in (relation, genes):
+        symbols.collect(d, strings)
+    for names in graph.members:
+        strings.update(names)
+
+    table = symbols.SymbolTable.build(strings)
+    return (table, symbols.IdSet.build(table, genes), symbols.Relation.build(table, relation),
+            symbols.InteractionGraph.build(table, graph))
+
+
+def check(table, genes, relation, graph):
+    assert len(table) == 6
+    assert [table.string(i) for i in xrange(len(table))] == \
+        ["BRCA1", "HDM2", "MDM2", "RNF53", "TP53", "unused"]
+    assert table.id_of("MDM2") == 2
+    assert table.id_of(u"MDM2") == 2
+    assert table.id_of("MDM") == -1
+
+    assert len(genes) == 3
+    assert list(genes) == ["MDM2", "RNF53", "TP53"]
+    assert "RNF53" in genes and "BRCA1" not in genes and "nothing" not in genes
+    assert genes.contains_id(table.id_of("TP53"))
+    assert not genes.contains_id(-1)
+
+    mdm2 = table.id_of("MDM2")
+    tp53 = table.id_of("TP53")
+    assert len(relation) == 2
+    assert list(relation) == ["MDM2", "TP53"]
+    assert set(relation["MDM2"]) == set(["TP53", "BRCA1"])
+    assert "BRCA1" in relation["MDM2"] and "MDM2" not in relation["MDM2"]
+    assert relation.get("BRCA1") is None
+    with pytest.raises(KeyError):
+        relation["BRCA1"]
+    assert relation.has_id(tp53) and not relation.has_id(table.id_of("BRCA1"))
+    assert relation.contains_ids(mdm2, tp53) and not relation.contains_ids(tp53, tp53)
+    assert not relation.contains_ids(-1, tp53)
+    assert list(relation.row_ids(tp53)) == [mdm2]
+    assert list(relation.row_ids(-1)) == []
+
+    assert graph.interacts("HDM2", "TP53") and graph.interacts("TP53", "MDM2")
+    assert not graph.interacts("MDM2", "HDM2") and not graph.interacts("RNF53", "TP53")
+    assert graph.get("TP53") == set(["MDM2", "HDM2"])
+    assert "HDM2" in graph and "RNF53" not in graph
+
+
+def test_built():
+    check(*build())
+
+
+def test_unicode_symbols():
+    table = symbols.SymbolTable.build([u"\xe4".encode("utf-8"), "a"])
+    assert table.id_of(u"\xe4") == 1
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_snapshot_round_trip(tmpdir, monkeypatch, numpy):
+    if not numpy:
+        monkeypatch.setattr(dict_snapshot, "numpy", None)
+    elif dict_snapshot.numpy is None:
+        pytest.skip("NumPy is not installed")
+
+    table, genes, relation, graph = build()
+    path = str(tmpdir.join("test.snap"))
+    dict_snapshot.write_snapshot(path, [
+        ("symbols", table.state()), ("genes", genes.state()), ("relation", relation.state()),
+        ("graph", graph.state()), ("plain", {"key": "value"})], [])
+
+    snap = dict_snapshot.open_snapshot(path)
+    table = symbols.SymbolTable.from_state(snap.section("symbols"))
+    check(table, symbols.from_state(table, snap.section("genes")),
+          symbols.from_state(table, snap.section("relation")),
+          symbols.from_state(table, snap.section("graph")))
+    assert snap.section("plain") == {"key": "value"}
@@ -0,0 +1,39 @@
+import random
+
+import textnorm
+from textnorm import Normalizer, UTF_SUBSTITUTIONS
+
+
+def sequential(text):
+    """The old re.sub chain: one pass per table entry."""
+    for pattern, replacement in UTF_SUBSTITUTIONS:
+        text = text.replace(pattern, replacement)
+    return text
+
+
+def test_substitutions():
+    normalize = Normalizer(UTF_SUBSTITUTIONS)
+    assert normalize("a\xe2\x80\x94b") == "a-b"
+    assert normalize("\xc2\xbd \xc2\xb0C") == "1/2 DEGREEC"
+    assert normalize("x\xcc\xa8y") == "xy"
+
+
+def test_plain_text_is_returned_as_is():
+    text = "MDM2 binds TP53"
+    assert textnorm.utf_normalizer(text) is text
+
+
+def test_deletion_joining_neighbours_matches_the_chain():
+    # deleting the modifier leaves \xc2\xb0, which the chain has already passed
+    text = "\xc2\xcc\xa8\xb0"
+    assert Normalizer(UTF_SUBSTITUTIONS)(text) == sequential(text) == "\xc2\xb0"
+
+
+def test_matches_the_chain():
+    rng = random.Random(0)
+    pieces = [p for p, r in UTF_SUBSTITUTIONS] + ["a", " ", "\xc2", "\xe2\x80", "\xb0"]
+    normalize = Normalizer(UTF_SUBSTITUTIONS, cache_size=16)
+    for _ in xrange(2000):
+        text = "".join(rng.choice(pieces) for _ in xrange(rng.randint(0, 8)))
+        assert normalize(text) == sequential(text)
+        assert normalize.normalize(text) == sequential(text)